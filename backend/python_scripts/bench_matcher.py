@@ -0,0 +1,320 @@
+# bench_matcher.py
+"""
+Microbenchmarks for SkillMatcher and the extraction helpers.
+- Deterministic synthetic resumes / JDs drawn from skills_config.json
+- Times _canonicalize_token, match_resume_to_jd (with/without semantic),
+  tokenize_skills, extract_skills_section_text, extract_phone_numbers,
+  extract_name_by_proximity
+- Stores results as a JSON baseline; `compare` flags regressions beyond a threshold
+- `threads` screens the same resumes with one shared SkillMatcher on 1, 2, 4 ...
+  threads and reports throughput and speedup; run it once on a regular and once
+  on a free-threaded interpreter (python3.13t) to see what the GIL costs
+
+Usage:
+    python bench_matcher.py run --out bench_baseline.json
+    python bench_matcher.py compare bench_baseline.json --threshold 0.10
+    python3.13 bench_matcher.py threads --threads 1 2 4 8 --out scaling_gil.json
+    python3.13t bench_matcher.py threads --threads 1 2 4 8 --out scaling_nogil.json
+"""
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from skill_matcher import SkillMatcher
+
+DEFAULT_CONFIG = os.getenv("SKILLS_CONFIG", "skills_config.json")
+
+# share of each token kind in a generated token list
+DEFAULT_DIST = {
+    "canonical": 0.45,   # "react", "postgresql"
+    "alias": 0.20,       # "reactjs", "postgres"
+    "family": 0.05,      # "mern", "devops"
+    "variant": 0.15,     # "React 18", "node-js", "PYTHON3"
+    "noise": 0.15,       # out of vocabulary words
+}
+
+NOISE_WORDS = [
+    "communication", "leadership", "teamwork", "agile", "scrum", "jira",
+    "problem solving", "ms office", "excel", "presentation", "mentoring",
+    "stakeholder management", "documentation", "time management", "figma",
+]
+
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Sneha", "Ankit", "Ravi", "Neha", "Arjun"]
+LAST_NAMES = ["Sharma", "Mehra", "Verma", "Iyer", "Kumar", "Gupta", "Singh", "Rao"]
+
+
+# ---------------------------
+# synthetic data
+# ---------------------------
+class Vocab:
+    """Skill vocabulary pulled from skills_config.json."""
+
+    def __init__(self, config_path: str):
+        with open(config_path, "r", encoding="utf-8") as fh:
+            cfg = json.load(fh)
+        aliases = {k.lower(): v.lower() for k, v in cfg.get("aliases", {}).items()}
+        self.canonicals: List[str] = sorted(set(aliases.values()))
+        self.aliases: List[str] = sorted(k for k, v in aliases.items() if k != v)
+        self.families: List[str] = sorted(k.lower() for k in cfg.get("families", {}))
+
+
+def _variant(rng: random.Random, tok: str) -> str:
+    kind = rng.randrange(4)
+    if kind == 0:
+        return f"{tok} {rng.randint(2, 18)}"
+    if kind == 1:
+        return tok.upper()
+    if kind == 2:
+        return tok.replace(" ", "-").title()
+    # single-character typo (drop one letter)
+    if len(tok) > 4:
+        i = rng.randrange(1, len(tok) - 1)
+        return tok[:i] + tok[i + 1:]
+    return tok.title()
+
+
+def generate_tokens(rng: random.Random, vocab: Vocab, size: int, dist: Optional[Dict[str, float]] = None) -> List[str]:
+    """Generate `size` skill tokens following `dist` (kind -> weight)."""
+    dist = dist or DEFAULT_DIST
+    kinds = list(dist.keys())
+    weights = [dist[k] for k in kinds]
+    out = []
+    for _ in range(size):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "alias" and vocab.aliases:
+            out.append(rng.choice(vocab.aliases))
+        elif kind == "family" and vocab.families:
+            out.append(rng.choice(vocab.families))
+        elif kind == "variant":
+            out.append(_variant(rng, rng.choice(vocab.canonicals)))
+        elif kind == "noise":
+            out.append(rng.choice(NOISE_WORDS))
+        else:
+            out.append(rng.choice(vocab.canonicals))
+    return out
+
+
+def generate_resume_text(rng: random.Random, skills: List[str], filler_lines: int = 40) -> str:
+    """Build a plain-text resume with a header, contact line, skills section and filler."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    email = name.lower().replace(" ", ".") + "@example.com"
+    phone = f"+91 {rng.choice('6789')}{rng.randint(100000000, 999999999)}"
+    lines = [
+        name,
+        "Software Engineer",
+        f"{email} | {phone} | Bengaluru, India",
+        "",
+        "Summary",
+        "Engineer with hands-on delivery experience across the stack.",
+        "",
+        "Technical Skills",
+    ]
+    for i in range(0, len(skills), 6):
+        lines.append(", ".join(skills[i:i + 6]))
+    lines += ["", "Experience"]
+    for i in range(filler_lines):
+        lines.append(f"- Delivered feature {i} for team {rng.randint(1, 20)} in {rng.randint(2015, 2024)}")
+    lines += ["", "Education", "B.Tech Computer Science, 2019"]
+    return "\n".join(lines)
+
+
+# ---------------------------
+# timing
+# ---------------------------
+def time_case(fn: Callable[[], object], number: int, repeat: int) -> Dict[str, float]:
+    """Run fn `number` times per round for `repeat` rounds; report per-call microseconds."""
+    fn()  # warm-up (lazy models, regex caches)
+    rounds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - t0) / number * 1e6)
+    return {
+        "median_us": statistics.median(rounds),
+        "min_us": min(rounds),
+        "max_us": max(rounds),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def build_cases(args) -> List[Tuple[str, Callable[[], object], int]]:
+    """Return (name, callable, calls_per_round) for every benchmark case."""
+    import extract_details as ed
+
+    rng = random.Random(args.seed)
+    vocab = Vocab(args.config)
+    resume_tokens = generate_tokens(rng, vocab, args.resume_size)
+    jd_tokens = generate_tokens(rng, vocab, args.jd_size, {"canonical": 0.7, "alias": 0.1, "family": 0.2})
+    canon_tokens = generate_tokens(rng, vocab, 500)
+    text = generate_resume_text(rng, resume_tokens, filler_lines=args.filler_lines)
+    section = ed.extract_skills_section_text(text)
+    emails = ed.extract_emails(text)
+    phones = ed.extract_phone_numbers(text)
+
+    matcher = SkillMatcher(args.config, use_semantic=False)
+
+    def canon():
+        for t in canon_tokens:
+            matcher._canonicalize_token(t)
+
+    cases = [
+        ("canonicalize_token_x500", canon, 20),
+        ("match_resume_to_jd", lambda: matcher.match_resume_to_jd(resume_tokens, jd_tokens), 5),
+        ("extract_skills_section_text", lambda: ed.extract_skills_section_text(text), 200),
+        ("tokenize_skills", lambda: ed.tokenize_skills(section), 200),
+        ("extract_phone_numbers", lambda: ed.extract_phone_numbers(text), 200),
+        ("extract_name_by_proximity", lambda: ed.extract_name_by_proximity(text, emails, phones), 200),
+    ]
+
+    if not args.no_semantic:
+        sem = SkillMatcher(args.config, use_semantic=True)
+        if sem.semantic_enabled:
+            cases.append(("match_resume_to_jd_semantic", lambda: sem.match_resume_to_jd(resume_tokens, jd_tokens), 1))
+        else:
+            print("Semantic backend unavailable; skipping match_resume_to_jd_semantic.")
+    return cases
+
+
+def _meta(args) -> Dict:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        # sys._is_gil_enabled() exists from 3.13 on; older interpreters always have the GIL
+        "gil_enabled": getattr(sys, "_is_gil_enabled", lambda: True)(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "resume_size": args.resume_size,
+        "jd_size": args.jd_size,
+        "filler_lines": args.filler_lines,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run_benchmarks(args) -> Dict:
+    results = {}
+    for name, fn, number in build_cases(args):
+        if args.only and not any(o in name for o in args.only):
+            continue
+        number = max(1, int(number * args.scale))
+        results[name] = time_case(fn, number, args.repeat)
+        print(f"{name:32s} median {results[name]['median_us']:12.1f} us   min {results[name]['min_us']:12.1f} us")
+    return {"meta": _meta(args), "results": results}
+
+
+def run_scaling(args) -> Dict:
+    """Throughput of match_resume_to_jd over one shared matcher at each thread count."""
+    rng = random.Random(args.seed)
+    vocab = Vocab(args.config)
+    resumes = [generate_tokens(rng, vocab, args.resume_size) for _ in range(args.resumes)]
+    jd_tokens = generate_tokens(rng, vocab, args.jd_size, {"canonical": 0.7, "alias": 0.1, "family": 0.2})
+    matcher = SkillMatcher(args.config, use_semantic=False if args.no_semantic else None)
+
+    def screen(tokens):
+        return matcher.match_resume_to_jd(tokens, jd_tokens)
+
+    for tokens in resumes:   # warm-up: OOV / pair caches, lazy models
+        screen(tokens)
+    results = {}
+    base = None
+    for n in args.threads:
+        rounds = []
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                list(pool.map(screen, resumes, chunksize=max(1, len(resumes) // (4 * n))))
+                rounds.append(time.perf_counter() - t0)
+        best = min(rounds)
+        rate = len(resumes) / best
+        base = base or rate
+        results[str(n)] = {"threads": n, "best_s": best, "median_s": statistics.median(rounds),
+                           "resumes_per_s": rate, "speedup": rate / base, "efficiency": rate / base / n}
+        print(f"{n:3d} threads  {rate:10.1f} resumes/s  speedup {rate / base:5.2f}x  "
+              f"efficiency {rate / base / n:6.1%}")
+    meta = _meta(args)
+    meta.update({"resumes": args.resumes, "semantic": matcher.semantic_enabled})
+    return {"meta": meta, "scaling": results}
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """Return a list of regression messages (empty if none exceed threshold)."""
+    regressions = []
+    base = baseline.get("results", {})
+    for name, cur in current.get("results", {}).items():
+        if name not in base:
+            print(f"{name:32s} (new, no baseline)")
+            continue
+        old = base[name]["median_us"]
+        new = cur["median_us"]
+        delta = (new - old) / old if old else 0.0
+        flag = ""
+        if delta > threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{name}: {old:.1f}us -> {new:.1f}us ({delta:+.1%})")
+        print(f"{name:32s} {old:12.1f} -> {new:12.1f} us  {delta:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("mode", choices=["run", "compare", "threads"])
+    ap.add_argument("baseline", nargs="?", help="baseline JSON to compare against (compare mode)")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--config", default=DEFAULT_CONFIG)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--resume-size", type=int, default=40, help="skill tokens per resume")
+    ap.add_argument("--jd-size", type=int, default=12, help="skill tokens per JD")
+    ap.add_argument("--filler-lines", type=int, default=40, help="non-skill lines per resume text")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply calls per round")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    ap.add_argument("--no-semantic", action="store_true", help="skip the semantic matcher case")
+    ap.add_argument("--only", nargs="*", help="run only cases whose name contains one of these")
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="thread counts (threads mode)")
+    ap.add_argument("--resumes", type=int, default=200, help="resumes per round (threads mode)")
+    args = ap.parse_args(argv)
+
+    if args.mode == "threads":
+        print(f"Python {sys.version.split()[0]}, GIL {'enabled' if _meta(args)['gil_enabled'] else 'disabled'}, "
+              f"{os.cpu_count()} CPUs")
+        result = run_scaling(args)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as fh:
+                json.dump(result, fh, indent=2)
+            print(f"Results written to {args.out}")
+        return 0
+
+    if args.mode == "compare" and not args.baseline:
+        ap.error("compare mode needs a baseline file")
+
+    current = run_benchmarks(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(current, fh, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.mode == "compare":
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare_results(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for r in regressions:
+                print("  " + r)
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
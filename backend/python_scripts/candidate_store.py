@@ -0,0 +1,582 @@
+# candidate_store.py
+"""
+Embedding store of selected candidates for "similar candidates to this JD" search.
+- Each candidate's skill_keys are summarised as one pooled embedding: the mean
+  of the unit embeddings of its skills (semantic backend of the SkillMatcher),
+  re-normalized, so a dot product with a pooled JD is a cosine
+- Rows live in append-only files under CANDIDATE_STORE_DIR, memory-mapped by
+  every reader:
+      vectors.f32   row-major float32, `dim` values per row
+      rows.bin      per row: candidate id, company id, IVF list, skill digest
+      dead.u8       tombstone flag per row (the only bytes written in place)
+  A changed candidate gets a new row and its old row is tombstoned; rows.bin is
+  written last, so a reader never sees a row without its vector. Writers
+  (sync) serialize on a file lock; readers pick up new rows on the next query
+- sync() follows selected_candidates by updated_at (with an overlap window,
+  rows whose skills did not change are skipped); full=True also tombstones
+  candidates deleted from the table (e.g. merged by migrate_tenants dedup)
+- search() scans the store in blocks of matrix-vector products, keeping a
+  running top-k; tenants are filtered by company id. After train_ivf(), pools
+  of IVF_MIN_ROWS or more rows only scan the `nprobe` inverted lists whose
+  centroids are closest to the query (exact=True forces the full scan)
+- A store is bound to the embedding model that built it; switching models
+  needs `sync --rebuild`
+
+Config (env):
+    CANDIDATE_STORE_DIR     store directory (default "candidate_store")
+    STORE_BLOCK_ROWS        rows per matrix-vector block (default 65536)
+    IVF_MIN_ROWS            live rows from which a trained IVF is used (default 200000)
+    IVF_NPROBE              inverted lists scanned per query (default 16)
+
+Usage:
+    python candidate_store.py sync [--full] [--rebuild]
+    python candidate_store.py train-ivf --lists 1024
+    python candidate_store.py query Acme "react, node.js, aws, postgres" -k 20
+    python candidate_store.py bench --rows 1000000
+    python candidate_store.py stats
+    # or POST /similar-candidates on email_api
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg2 import sql
+
+from saving import normalize_skill_keys
+from tenant_store import SELECTED_TABLE, company_id, ensure_tenant_tables
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.getenv("CANDIDATE_STORE_DIR", "candidate_store")
+BLOCK_ROWS = int(os.getenv("STORE_BLOCK_ROWS", 65536))
+IVF_MIN_ROWS = int(os.getenv("IVF_MIN_ROWS", 200000))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 16))
+# updated_at is the transaction start time, so a row can commit behind the watermark
+SYNC_OVERLAP = timedelta(minutes=5)
+
+ROW_DTYPE = np.dtype([("candidate", "<i8"), ("company", "<i4"), ("ivf", "<i4"), ("digest", "<u8")])
+
+
+def skill_digest(keys: Sequence[str]) -> int:
+    """Order-independent fingerprint of a skill key set (a resynced row with the same skills is skipped)."""
+    h = hashlib.sha1("\x1f".join(sorted(set(keys))).encode("utf-8")).digest()
+    return int.from_bytes(h[:8], "little")
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / np.maximum(np.linalg.norm(m, axis=-1, keepdims=True), 1e-12)
+
+
+# ---------------------------
+# pooled skill embeddings
+# ---------------------------
+class SkillPooler:
+    """Pooled embeddings of skill key sets, with the per-skill vectors cached (skills repeat heavily)."""
+
+    def __init__(self, matcher, cache_size: int = 100000):
+        if not matcher.semantic_enabled:
+            raise RuntimeError("candidate embeddings need the semantic backend (skills_config.json 'semantic')")
+        self.matcher = matcher
+        self.scorer = matcher.semantic_scorer
+        self.cache_size = cache_size
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _skill_vectors(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys = set(keys)
+        with self._lock:
+            missing = [k for k in keys if k not in self._vectors]
+        if missing:
+            emb = _normalize(np.asarray(self.matcher._encode(missing), dtype=np.float32))
+            with self._lock:
+                if len(self._vectors) + len(missing) > self.cache_size:
+                    self._vectors.clear()
+                self._vectors.update(zip(missing, emb))
+        with self._lock:
+            return {k: self._vectors[k] for k in keys if k in self._vectors}
+
+    def pool(self, key_lists: Sequence[Sequence[str]]) -> np.ndarray:
+        """(n, dim) unit rows; a row with no skills is all zeros."""
+        vecs = self._skill_vectors(k for keys in key_lists for k in keys)
+        dim = len(next(iter(vecs.values()))) if vecs else 0
+        out = np.zeros((len(key_lists), dim), dtype=np.float32)
+        for i, keys in enumerate(key_lists):
+            rows = [vecs[k] for k in keys if k in vecs]
+            if rows:
+                out[i] = np.mean(rows, axis=0)
+        return _normalize(out) if len(out) else out
+
+
+def query_keys(matcher, jd_text: str) -> List[str]:
+    """
+    Canonical skill keys of a free-text JD: each comma / line separated part that is
+    a known skill, else its known 1-3 word runs, longest first (all parts when none are).
+    """
+    from extract_details import tokenize_skills
+    parts = tokenize_skills(jd_text) or [jd_text]
+
+    def known(text: str) -> List[str]:
+        return [c for c in matcher.canonicalize_list([text]) if c in matcher.vocabulary]
+
+    found: List[str] = []
+    for part in parts:
+        hit = known(part)
+        if hit:
+            found.extend(hit)
+            continue
+        words = re.findall(r"[\w\+#\.\-]+", part)
+        i = 0
+        while i < len(words):
+            n = next((n for n in (3, 2, 1) if i + n <= len(words) and known(" ".join(words[i:i + n]))), 0)
+            if n:
+                found.extend(known(" ".join(words[i:i + n])))
+            i += n or 1
+    return normalize_skill_keys(found or matcher.canonicalize_list(parts))
+
+
+# ---------------------------
+# store
+# ---------------------------
+class CandidateStore:
+    def __init__(self, root: str = STORE_DIR, block_rows: int = BLOCK_ROWS):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.block_rows = block_rows
+        self._lock = threading.RLock()
+        self.meta = self._read_meta()
+        self._n = 0
+        self._vectors = None
+        self._rows = None
+        self._dead = None
+        self._latest: Dict[int, int] = {}        # candidate id -> its newest row
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None   # (rows sorted by list, list offsets)
+        self._lists_n = -1
+        self.queries = 0
+        self.query_ms = 0.0
+        self.refresh()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(self._path("meta.json"), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"dim": 0, "scorer": None, "watermark": None, "ivf_lists": 0}
+
+    def _write_meta(self) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".meta-")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(self.meta, fh, indent=2)
+        os.replace(tmp, self._path("meta.json"))
+
+    @contextmanager
+    def _writer(self):
+        """Exclusive across processes; the store is re-read first so appends see every committed row."""
+        with self._lock, open(self._path("lock"), "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                self.meta = self._read_meta()
+                self.refresh()
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def refresh(self) -> None:
+        """Map rows appended since the last call (by this or another process)."""
+        with self._lock:
+            try:
+                n = os.path.getsize(self._path("rows.bin")) // ROW_DTYPE.itemsize
+            except FileNotFoundError:
+                n = 0
+            if self.meta.get("ivf_lists") and self._centroids is None:
+                dim = self.meta["dim"]
+                self._centroids = np.fromfile(self._path("ivf.f32"), dtype=np.float32).reshape(-1, dim)
+            if n == self._n:
+                return
+            dim = self.meta["dim"]
+            if n < self._n:      # rebuilt by another process
+                self._latest.clear()
+                self._n = 0
+            self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(n, dim))
+            self._rows = np.memmap(self._path("rows.bin"), dtype=ROW_DTYPE, mode="r", shape=(n,))
+            self._dead = np.memmap(self._path("dead.u8"), dtype=np.uint8, mode="r", shape=(n,))
+            for i, cid in enumerate(self._rows["candidate"][self._n:n].tolist(), start=self._n):
+                self._latest[cid] = i
+            self._n = n
+
+    # ---------------------------
+    # writes
+    # ---------------------------
+    def _check_model(self, scorer: str, dim: int) -> None:
+        if self.meta.get("scorer") is None:
+            self.meta.update({"scorer": scorer, "dim": dim})
+            self._write_meta()
+        elif self.meta["scorer"] != scorer or self.meta["dim"] != dim:
+            raise ValueError(f"candidate store {self.root} was built with {self.meta['scorer']} "
+                             f"({self.meta['dim']} dims); rebuild it with `python candidate_store.py sync --rebuild`")
+
+    def _tombstone_rows(self, rows: Iterable[int]) -> None:
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        fd = os.open(self._path("dead.u8"), os.O_WRONLY)
+        try:
+            for r in rows:
+                os.pwrite(fd, b"\x01", r)
+        finally:
+            os.close(fd)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int32)
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def upsert(self, candidates: Sequence[int], companies: Sequence[int], digests: Sequence[int],
+               vectors: np.ndarray, scorer: str) -> int:
+        """Append rows (tombstoning each candidate's previous row); zero vectors only tombstone."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._writer():
+            keep = np.linalg.norm(vectors, axis=1) > 0 if vectors.size else np.zeros(len(vectors), dtype=bool)
+            if keep.any():
+                self._check_model(scorer, vectors.shape[1])
+            old = [self._latest[c] for c in candidates if c in self._latest]
+            rows = np.zeros(int(keep.sum()), dtype=ROW_DTYPE)
+            rows["candidate"] = np.asarray(candidates, dtype=np.int64)[keep]
+            rows["company"] = np.asarray(companies, dtype=np.int32)[keep]
+            rows["digest"] = np.asarray(digests, dtype=np.uint64)[keep]
+            rows["ivf"] = self._assign(vectors[keep])
+            # vectors and tombstone bytes first: rows.bin is the commit point readers go by
+            with open(self._path("vectors.f32"), "ab") as fh:
+                fh.write(vectors[keep].tobytes())
+            with open(self._path("dead.u8"), "ab") as fh:
+                fh.write(bytes(len(rows)))
+            with open(self._path("rows.bin"), "ab") as fh:
+                fh.write(rows.tobytes())
+            self._tombstone_rows(old)
+            self.refresh()
+        return len(rows)
+
+    def remove(self, candidates: Iterable[int]) -> int:
+        with self._writer():
+            rows = [self._latest[c] for c in candidates if c in self._latest]
+            self._tombstone_rows(rows)
+        return len(rows)
+
+    def digest_of(self, candidate: int) -> Optional[int]:
+        """Skill digest of a candidate's live row (None when absent or tombstoned)."""
+        row = self._latest.get(candidate)
+        if row is None or self._dead[row]:
+            return None
+        return int(self._rows["digest"][row])
+
+    def live_candidates(self) -> List[int]:
+        return [c for c, r in self._latest.items() if not self._dead[r]]
+
+    # ---------------------------
+    # IVF
+    # ---------------------------
+    def train_ivf(self, lists: int = 1024, sample: int = 100000, iters: int = 10, seed: int = 0) -> Dict:
+        """Spherical k-means over a sample of live rows; every row is then assigned to its nearest list."""
+        t0 = time.perf_counter()
+        rng = np.random.default_rng(seed)
+        with self._writer():
+            live = np.flatnonzero(np.asarray(self._dead) == 0)
+            if len(live) < lists:
+                raise ValueError(f"{len(live)} live rows cannot train {lists} lists")
+            x = np.asarray(self._vectors[np.sort(rng.choice(live, min(sample, len(live)), replace=False))])
+            cent = x[rng.choice(len(x), lists, replace=False)].copy()
+            for _ in range(iters):
+                assign = np.concatenate([np.argmax(x[i:i + self.block_rows] @ cent.T, axis=1)
+                                         for i in range(0, len(x), self.block_rows)])
+                order = np.argsort(assign, kind="stable")
+                ids, starts = np.unique(assign[order], return_index=True)
+                sums = np.add.reduceat(x[order], starts, axis=0)
+                empty = np.setdiff1d(np.arange(lists), ids)
+                cent[ids] = _normalize(sums)
+                # an empty list restarts from a random sample row
+                cent[empty] = x[rng.choice(len(x), len(empty), replace=False)]
+            cent = np.ascontiguousarray(cent, dtype=np.float32)
+            cent.tofile(self._path("ivf.f32"))
+            self._centroids = cent
+            rows = np.memmap(self._path("rows.bin"), dtype=ROW_DTYPE, mode="r+", shape=(self._n,))
+            for i in range(0, self._n, self.block_rows):
+                rows["ivf"][i:i + self.block_rows] = self._assign(np.asarray(self._vectors[i:i + self.block_rows]))
+            rows.flush()
+            del rows
+            self.meta["ivf_lists"] = lists
+            self._write_meta()
+            self._lists_n = -1
+        return {"lists": lists, "trained_on": len(x), "rows": self._n, "seconds": time.perf_counter() - t0}
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._lists_n != self._n:
+            ivf = np.asarray(self._rows["ivf"])
+            order = np.argsort(ivf, kind="stable")
+            offsets = np.searchsorted(ivf[order], np.arange(len(self._centroids) + 1))
+            self._lists, self._lists_n = (order, offsets), self._n
+        return self._lists
+
+    # ---------------------------
+    # queries
+    # ---------------------------
+    def search(self, query: np.ndarray, k: int = 20, company: Optional[int] = None, exact: bool = False,
+               nprobe: int = IVF_NPROBE) -> List[Tuple[int, float]]:
+        """Top-k (candidate id, cosine) for a unit query vector, best first."""
+        t0 = time.perf_counter()
+        self.refresh()
+        with self._lock:
+            n, vectors, rows, dead = self._n, self._vectors, self._rows, self._dead
+            use_ivf = not exact and self._centroids is not None and n >= IVF_MIN_ROWS
+            lists = self._inverted_lists() if use_ivf else None
+            cent = self._centroids
+        if n == 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        mask = np.asarray(dead) == 0
+        if company is not None:
+            mask &= np.asarray(rows["company"]) == company
+        best_idx = np.zeros(0, dtype=np.int64)
+        best = np.zeros(0, dtype=np.float32)
+
+        def keep(idx: np.ndarray, scores: np.ndarray):
+            nonlocal best_idx, best
+            idx, scores = np.concatenate([best_idx, idx]), np.concatenate([best, scores])
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                idx, scores = idx[top], scores[top]
+            best_idx, best = idx, scores
+
+        if use_ivf:
+            order, offsets = lists
+            probe = np.argsort(-(cent @ q))[:nprobe]
+            sel = np.concatenate([order[offsets[p]:offsets[p + 1]] for p in probe])
+            sel = np.sort(sel[mask[sel]])
+        elif mask.mean() < 0.25:
+            sel = np.flatnonzero(mask)
+        else:
+            sel = None
+        if sel is None:
+            # contiguous blocks straight from the map; filtered rows just score -inf
+            for i in range(0, n, self.block_rows):
+                scores = np.asarray(vectors[i:i + self.block_rows]) @ q
+                scores[~mask[i:i + self.block_rows]] = -np.inf
+                keep(np.arange(i, i + len(scores)), scores)
+        else:
+            for i in range(0, len(sel), self.block_rows):
+                idx = sel[i:i + self.block_rows]
+                keep(idx, vectors[idx] @ q)
+        order = np.argsort(-best)
+        cands = rows["candidate"]
+        out = [(int(cands[best_idx[j]]), float(best[j])) for j in order if np.isfinite(best[j])]
+        with self._lock:
+            self.queries += 1
+            self.query_ms += (time.perf_counter() - t0) * 1000.0
+        return out
+
+    def stats(self) -> Dict:
+        with self._lock:
+            dead = int(np.count_nonzero(np.asarray(self._dead))) if self._n else 0
+            return {"rows": self._n, "live": self._n - dead, "tombstoned": dead, "dim": self.meta.get("dim"),
+                    "scorer": self.meta.get("scorer"), "watermark": self.meta.get("watermark"),
+                    "ivf_lists": self.meta.get("ivf_lists", 0), "ivf_min_rows": IVF_MIN_ROWS,
+                    "queries": self.queries,
+                    "query_ms_mean": self.query_ms / self.queries if self.queries else 0.0}
+
+
+_STORE: Optional[CandidateStore] = None
+_STORE_LOCK = threading.Lock()
+_POOLER: Optional[SkillPooler] = None
+
+def get_candidate_store() -> CandidateStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = CandidateStore()
+    return _STORE
+
+def _get_pooler(matcher) -> SkillPooler:
+    # per-skill vectors stay valid while the model does; a new matcher with the same model keeps them
+    global _POOLER
+    with _STORE_LOCK:
+        if _POOLER is None or _POOLER.scorer != matcher.semantic_scorer:
+            _POOLER = SkillPooler(matcher)
+        else:
+            _POOLER.matcher = matcher
+        return _POOLER
+
+
+# ---------------------------
+# sync with selected_candidates / search API
+# ---------------------------
+def sync(cursor, matcher, store: Optional[CandidateStore] = None, full: bool = False,
+         batch_size: int = 1000) -> Dict:
+    """Index selected candidates changed since the last sync (all of them with full=True)."""
+    store = store or get_candidate_store()
+    pooler = _get_pooler(matcher)
+    ensure_tenant_tables()
+    table = sql.Identifier(SELECTED_TABLE)
+    since = store.meta.get("watermark")
+    if since and not full:
+        cursor.execute(sql.SQL("SELECT id, company_id, skill_keys, updated_at FROM {} WHERE updated_at > %s "
+                               "ORDER BY updated_at, id").format(table),
+                       (datetime.fromisoformat(since) - SYNC_OVERLAP,))
+    else:
+        cursor.execute(sql.SQL("SELECT id, company_id, skill_keys, updated_at FROM {} ORDER BY updated_at, id")
+                       .format(table))
+    scanned = indexed = 0
+    watermark = since
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        scanned += len(batch)
+        todo = []
+        for cand, comp, keys, updated in batch:
+            keys = normalize_skill_keys(keys or [])
+            digest = skill_digest(keys)
+            if store.digest_of(cand) != digest:
+                todo.append((cand, comp, digest, keys))
+            stamp = updated.isoformat() if hasattr(updated, "isoformat") else str(updated)
+            watermark = max(watermark or stamp, stamp)
+        if todo:
+            vecs = pooler.pool([t[3] for t in todo])
+            indexed += store.upsert([t[0] for t in todo], [t[1] for t in todo], [t[2] for t in todo], vecs,
+                                    pooler.scorer)
+    removed = 0
+    if full:
+        cursor.execute(sql.SQL("SELECT id FROM {}").format(table))
+        present = {r[0] for r in cursor.fetchall()}
+        removed = store.remove(c for c in store.live_candidates() if c not in present)
+    if watermark != since:
+        with store._writer():
+            store.meta["watermark"] = watermark
+            store._write_meta()
+    return {"scanned": scanned, "indexed": indexed, "removed": removed, "rows": store._n}
+
+
+def similar_candidates(cursor, matcher, company_name: str, jd_text: str, k: int = 20,
+                       exact: bool = False, store: Optional[CandidateStore] = None) -> Dict:
+    """
+    Selected candidates of `company_name` whose pooled skills are closest to a free-text JD.
+    Returns {"query_skills": [...], "candidates": [{id, name, email, phone_no, skills, file_name, score}]}.
+    """
+    store = store or get_candidate_store()
+    keys = query_keys(matcher, jd_text)
+    cid = company_id(cursor, company_name, create=False)
+    if not keys or cid is None:
+        return {"query_skills": keys, "candidates": []}
+    q = _get_pooler(matcher).pool([keys])[0]
+    hits = store.search(q, k, company=cid, exact=exact)
+    if not hits:
+        return {"query_skills": keys, "candidates": []}
+    cursor.execute(sql.SQL("SELECT id, name, email, phone_no, skills, file_name FROM {} "
+                           "WHERE company_id = %s AND id = ANY(%s)").format(sql.Identifier(SELECTED_TABLE)),
+                   (cid, [c for c, _ in hits]))
+    rows = {r[0]: r for r in cursor.fetchall()}
+    out = []
+    for cand, score in hits:
+        r = rows.get(cand)
+        if r is not None:
+            out.append({"id": r[0], "name": r[1], "email": r[2], "phone_no": r[3], "skills": list(r[4] or []),
+                        "file_name": r[5], "score": score})
+    return {"query_skills": keys, "candidates": out}
+
+
+# ---------------------------
+# benchmark
+# ---------------------------
+def bench(rows: int, dim: int, lists: int, k: int, queries: int, root: Optional[str] = None) -> Dict:
+    """Synthetic clustered pool: exact and IVF query latency, and IVF recall against the exact top-k."""
+    root = root or tempfile.mkdtemp(prefix="candidate_store_bench_")
+    rng = np.random.default_rng(0)
+    store = CandidateStore(root)
+    centres = _normalize(rng.standard_normal((max(lists // 4, 1), dim)).astype(np.float32))
+    t0 = time.perf_counter()
+    for i in range(0, rows, 100000):
+        m = min(100000, rows - i)
+        v = _normalize(centres[rng.integers(0, len(centres), m)]
+                       + 0.35 * rng.standard_normal((m, dim)).astype(np.float32) / np.sqrt(dim) * 4)
+        store.upsert(np.arange(i, i + m), np.ones(m), np.zeros(m, dtype=np.uint64), v, "bench")
+    build_s = time.perf_counter() - t0
+    ivf = store.train_ivf(lists)
+    qs = _normalize(centres[rng.integers(0, len(centres), queries)]
+                    + 0.35 * rng.standard_normal((queries, dim)).astype(np.float32) / np.sqrt(dim) * 4)
+    timings = {"exact": [], "ivf": []}
+    recall = []
+    for q in qs:
+        t = time.perf_counter()
+        exact = store.search(q, k, company=1, exact=True)
+        timings["exact"].append((time.perf_counter() - t) * 1000.0)
+        t = time.perf_counter()
+        approx = store.search(q, k, company=1)
+        timings["ivf"].append((time.perf_counter() - t) * 1000.0)
+        recall.append(len({c for c, _ in exact} & {c for c, _ in approx}) / max(len(exact), 1))
+    shutil.rmtree(root, ignore_errors=True)
+    return {"rows": rows, "dim": dim, "build_s": build_s, "ivf_train_s": ivf["seconds"], "lists": lists,
+            "nprobe": IVF_NPROBE, "exact_ms_p50": float(np.median(timings["exact"])),
+            "ivf_ms_p50": float(np.median(timings["ivf"])), "ivf_ms_max": float(np.max(timings["ivf"])),
+            "recall_at_k": float(np.mean(recall)), "k": k}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Candidate embedding store.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("sync")
+    s.add_argument("--full", action="store_true", help="rescan every row and drop deleted candidates")
+    s.add_argument("--rebuild", action="store_true", help="delete the store and index everything again")
+    t = sub.add_parser("train-ivf")
+    t.add_argument("--lists", type=int, default=1024)
+    t.add_argument("--sample", type=int, default=100000)
+    q = sub.add_parser("query")
+    q.add_argument("company")
+    q.add_argument("jd")
+    q.add_argument("-k", type=int, default=20)
+    q.add_argument("--exact", action="store_true")
+    b = sub.add_parser("bench")
+    b.add_argument("--rows", type=int, default=1000000)
+    b.add_argument("--dim", type=int, default=384)
+    b.add_argument("--lists", type=int, default=1024)
+    b.add_argument("-k", type=int, default=20)
+    b.add_argument("--queries", type=int, default=20)
+    sub.add_parser("stats")
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if a.command == "bench":
+        print(json.dumps(bench(a.rows, a.dim, a.lists, a.k, a.queries), indent=2))
+    elif a.command == "train-ivf":
+        print(json.dumps(get_candidate_store().train_ivf(a.lists, a.sample), indent=2))
+    elif a.command == "stats":
+        print(json.dumps(get_candidate_store().stats(), indent=2))
+    else:
+        from extract_details import _get_db_connection, get_matcher
+        if a.command == "sync" and a.rebuild:
+            shutil.rmtree(STORE_DIR, ignore_errors=True)
+        conn = _get_db_connection()
+        try:
+            cursor = conn.cursor()
+            if a.command == "sync":
+                result = sync(cursor, get_matcher(), full=a.full or a.rebuild)
+            else:
+                result = similar_candidates(cursor, get_matcher(), a.company, a.jd, a.k, a.exact)
+            conn.commit()
+        finally:
+            conn.close()
+        print(json.dumps(result, indent=2, default=str))
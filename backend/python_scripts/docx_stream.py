@@ -0,0 +1,110 @@
+# docx_stream.py
+"""
+Streaming DOCX text extraction.
+- Reads word/header*.xml and word/document.xml straight from the zip with
+  iterparse (lxml when installed, xml.etree otherwise)
+- Emits paragraphs in reading order, including table cells and text boxes,
+  which python-docx's `doc.paragraphs` skips
+- Elements are cleared as soon as they are consumed, so memory stays bounded,
+  and callers can stop early (max_chars) without reading the rest of the part
+"""
+
+import re
+import zipfile
+from typing import Iterator, List, Optional
+
+try:
+    from lxml import etree
+    _HAS_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as etree
+    _HAS_LXML = False
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+_P, _T, _TAB, _BR, _CR, _TBL, _BODY = (W + "p", W + "t", W + "tab", W + "br", W + "cr", W + "tbl", W + "body")
+_HEADER_RE = re.compile(r"^word/header\d*\.xml$")
+
+
+def _iter_part_paragraphs(fh) -> Iterator[str]:
+    """Yield the text of every paragraph in one WordprocessingML part, in document order."""
+    stack: List[List[str]] = []   # open paragraphs (text boxes nest inside runs of an outer paragraph)
+    fallback_depth = 0            # mc:Fallback repeats the mc:Choice content (e.g. VML text boxes)
+    for event, elem in etree.iterparse(fh, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == _P:
+                stack.append([])
+            elif tag == MC_FALLBACK:
+                fallback_depth += 1
+            continue
+
+        if tag == MC_FALLBACK:
+            fallback_depth -= 1
+            elem.clear()
+        elif fallback_depth:
+            if tag == _P and stack:
+                stack.pop()
+        elif tag == _T:
+            if stack and elem.text:
+                stack[-1].append(elem.text)
+        elif tag == _TAB:
+            if stack:
+                stack[-1].append("\t")
+        elif tag in (_BR, _CR):
+            if stack:
+                stack[-1].append("\n")
+        elif tag == _P:
+            text = "".join(stack.pop()).strip() if stack else ""
+            if not stack:
+                _release(elem)
+            if text:
+                yield text
+        elif tag == _TBL and not stack:
+            _release(elem)
+
+
+def _release(elem) -> None:
+    """Drop a consumed top-level element (and, with lxml, its already-processed siblings)."""
+    elem.clear()
+    if _HAS_LXML:
+        parent = elem.getparent()
+        if parent is not None and parent.tag == _BODY:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+def iter_docx_lines(path: str, include_headers: bool = True) -> Iterator[str]:
+    """Yield non-empty paragraph lines: headers first, then the document body."""
+    with zipfile.ZipFile(path) as zf:
+        names = zf.namelist()
+        parts = []
+        if include_headers:
+            parts += sorted(n for n in names if _HEADER_RE.match(n))
+        parts.append("word/document.xml")
+        seen_header_lines = set()
+        for part in parts:
+            if part not in names:
+                continue
+            is_header = part != "word/document.xml"
+            with zf.open(part) as fh:
+                for line in _iter_part_paragraphs(fh):
+                    # first-page / even-page headers usually repeat the default one
+                    if is_header:
+                        if line in seen_header_lines:
+                            continue
+                        seen_header_lines.add(line)
+                    yield line
+
+
+def extract_docx_text(path: str, max_chars: Optional[int] = None) -> str:
+    """Join streamed lines with newlines, stopping once `max_chars` have been collected."""
+    out: List[str] = []
+    total = 0
+    for line in iter_docx_lines(path):
+        out.append(line)
+        total += len(line) + 1
+        if max_chars is not None and total >= max_chars:
+            break
+    return "\n".join(out)
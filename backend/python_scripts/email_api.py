@@ -1,22 +1,52 @@
 import sys
 sys.path.insert(0, 'path/to/my/custom/folder')
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 import threading
 import time
 import imaplib
 import email
 import os
 import re
+import json
+import uuid
+import hashlib
+import logging
 from email.header import decode_header
 import psycopg2
-from extract_details import extract_resume_details
+from extract_details import extract_resume_details, _get_db_connection, get_matcher, reload_matcher
+from rescreen import rescreen_job
+from rematch import rematch_vocabulary
+from screening_pipeline import get_pipeline, invalidate_jobs
+from fair_scheduler import get_scheduler
+from mailbox_leases import MailboxShard
+from parse_sandbox import get_parser_pool
+from screen_daemon import ScreenDaemonClient
+from candidate_store import get_candidate_store, similar_candidates, sync as sync_candidate_store
+from werkzeug.utils import secure_filename
 from email.header import decode_header
 from flask_cors import CORS
 
 
-# Resume folder (Auto-create if not exists)
+logger = logging.getLogger(__name__)
+
+# Resume folder (Auto-create if not exists). Every queued resume is spooled here under a
+# unique name with a "<file>.job.json" sidecar, removed once it has been screened
 RESUME_FOLDER = "resumes"
 os.makedirs(RESUME_FOLDER, exist_ok=True)
+JOB_SUFFIX = ".job.json"
+
+# IMAP endpoint (overridable for local testing / load tests)
+IMAP_HOST = os.getenv("IMAP_HOST", "imap.gmail.com")
+IMAP_PORT = int(os.getenv("IMAP_PORT", 993))
+IMAP_SSL = os.getenv("IMAP_SSL", "1") != "0"
+# Seconds between mailbox sweeps
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", 10))
+# A sweep finding more unseen mails than this for one company queues them in the bulk lane
+BULK_THRESHOLD = int(os.getenv("BULK_THRESHOLD", 200))
+# Several listener nodes share the mailboxes through leases (see mailbox_leases.py)
+LISTENER_SHARDING = os.getenv("LISTENER_SHARDING", "0") == "1"
+# Screen in the pre-fork daemon (screen_daemon.py) listening on this socket instead of in-process
+SCREEN_DAEMON_SOCKET = os.getenv("SCREEN_DAEMON_SOCKET")
 
 # Flask app
 app = Flask(__name__)
@@ -24,9 +54,15 @@ CORS(app) #Allow all origins
 # Thread control
 email_thread = None
 stop_event = threading.Event()
+# resolved at call time, so a patched _get_db_connection is honoured
+shard = MailboxShard(connect=lambda: _get_db_connection()) if LISTENER_SHARDING else None
+daemon = ScreenDaemonClient(SCREEN_DAEMON_SOCKET) if SCREEN_DAEMON_SOCKET else None
 
 def connect_email(EMAIL_USER, EMAIL_PASS):
-    mail = imaplib.IMAP4_SSL("imap.gmail.com")
+    if IMAP_SSL:
+        mail = imaplib.IMAP4_SSL(IMAP_HOST, IMAP_PORT)
+    else:
+        mail = imaplib.IMAP4(IMAP_HOST, IMAP_PORT)
     mail.login(EMAIL_USER, EMAIL_PASS)
     return mail
 
@@ -40,7 +76,73 @@ def fetch_new_emails(mail):
 def mark_as_read(mail, mail_id):
     mail.store(mail_id, "+FLAGS", "\\Seen")
 
-def process_email(mail, mail_id, company_name):
+# spooled resumes handed to the scheduler by this process (a restarted listener must not queue them twice)
+_queued = set()
+_queued_lock = threading.Lock()
+
+def spool_resume(company_name, filename, data, lane, key=None):
+    # Save an attachment / upload under a name of its own ("Resume.pdf" arrives from many senders)
+    # and persist the job next to it, so a crash after the mail is marked Seen does not lose it.
+    # A key derived from the message makes re-fetching the same mail land on the same spool file.
+    prefix = (key or uuid.uuid4().hex)[:16]
+    file_path = os.path.join(RESUME_FOLDER, f"{prefix}_{secure_filename(filename) or 'resume'}")
+    job_path = file_path + JOB_SUFFIX
+    if os.path.exists(job_path):
+        return file_path
+    with open(file_path, "wb") as f:
+        f.write(data)
+    tmp = job_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"filename": filename, "company": company_name, "lane": lane}, f)
+    os.replace(tmp, job_path)
+    return file_path
+
+def queue_spooled(file_path):
+    # Hand a spooled resume to the fair scheduler (once per process)
+    with _queued_lock:
+        if file_path in _queued:
+            return False
+        _queued.add(file_path)
+    with open(file_path + JOB_SUFFIX, "r", encoding="utf-8") as f:
+        job = json.load(f)
+    get_scheduler().submit(job["company"], screen_resume, (job["filename"], file_path, job["company"]),
+                           lane=job["lane"])
+    return True
+
+def requeue_spooled():
+    # Queue resumes spooled by an earlier run that never finished screening
+    names = sorted(n for n in os.listdir(RESUME_FOLDER) if n.endswith(JOB_SUFFIX))
+    requeued = sum(queue_spooled(os.path.join(RESUME_FOLDER, n[:-len(JOB_SUFFIX)])) for n in names)
+    if requeued:
+        logger.info("Re-queued %d spooled resumes", requeued)
+
+def screen_resume(filename, file_path, company_name):
+    # Runs on a scheduler worker; the daemon's warm workers do the screening when one is configured
+    selected = None
+    if daemon is not None:
+        try:
+            selected = daemon.screen(filename, file_path, company_name)["selected"]
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            # nothing reached the daemon: screen here instead
+            logger.warning("Screening daemon unavailable (%s); screening %s in-process", e, filename)
+        except OSError as e:
+            # sent, but no reply (e.g. a timeout): the daemon may still screen it, so screening here too
+            # could select it twice - the job stays spooled for the next start instead
+            logger.error("Screening daemon failed on %s (%s); leaving it spooled", filename, e)
+            raise
+    if selected is None:
+        selected = extract_resume_details(filename, file_path, company_name)
+    logger.info("Resume %s: %s", "selected" if selected else "rejected", filename)
+    # screened: the job is done (a failure above leaves it spooled for the next start)
+    try:
+        os.remove(file_path + JOB_SUFFIX)
+    except FileNotFoundError:
+        pass
+    with _queued_lock:
+        _queued.discard(file_path)
+    return selected
+
+def process_email(mail, mail_id, company_name, lane="mail"):
     status, msg_data = mail.fetch(mail_id, "(RFC822)")
     for response_part in msg_data:
         if isinstance(response_part, tuple):
@@ -55,56 +157,99 @@ def process_email(mail, mail_id, company_name):
             sender = msg.get("From")
             email_match = re.search(r"<([^>]+)>", sender)
             sender_email = email_match.group(1) if email_match else sender
+            message_id = msg.get("Message-ID")
 
             if msg.is_multipart():
-                for part in msg.walk():
+                for index, part in enumerate(msg.walk()):
                     content_disposition = str(part.get("Content-Disposition"))
                     if "attachment" in content_disposition:
                         filename = part.get_filename()
                         if filename and ("resume" in filename.lower()):
                             if filename.endswith(".pdf") or filename.endswith(".docx"):
-                                file_path = os.path.join(RESUME_FOLDER, filename)
-                                with open(file_path, "wb") as f:
-                                    f.write(part.get_payload(decode=True))
-                                print(f"✅ Resume Found: {filename}")
+                                key = None
+                                if message_id:
+                                    key = hashlib.sha1(f"{company_name}\0{message_id}\0{index}"
+                                                       .encode("utf-8")).hexdigest()
+                                file_path = spool_resume(company_name, filename, part.get_payload(decode=True),
+                                                         lane, key)
+                                logger.info("Resume found: %s (%s)", filename, company_name)
+                                # Seen only once the job is on disk; screening runs on the fair
+                                # scheduler's workers, not in the sweep
                                 mark_as_read(mail, mail_id)
-                                                              
-                                if extract_resume_details(filename, file_path, company_name):
-                                    print(f"Resume Selected.")
-                                else:
-                                    print(f"Resume Rejected.")                       
+                                queue_spooled(file_path)
                                         
 
 def fetch_all_users():
     # Connects to the PostgreSQL database and retrieves all users.
     # Returns a list of tuples containing (company_name, work_email, email_app_key).
-    connection = psycopg2.connect(
-        host="localhost",
-        user="postgres",
-        password="Ayush123",
-        dbname="jobs"
-    )
-    cursor = connection.cursor()
-    cursor.execute("SELECT company, work_email, email_app_key FROM users")
-    users = cursor.fetchall()
-    return users, cursor
-
-def email_listener():
-    
-    # Continuously fetches all users from the database and checks for new emails for each user.
-    while not stop_event.is_set():
-        users, cursor = fetch_all_users()
-        for user in users:
-            company_name, work_email, email_app_key = user
-            if not email_app_key:
-                continue
-            # Connect using the user's email and app key
-            mail = connect_email(work_email, email_app_key)
-            print(f"🔍 Checking for new emails for {company_name}...")
+    connection = _get_db_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT company, work_email, email_app_key FROM users")
+        users = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return users
+
+def poll_all_mailboxes(stop=None, shard=None):
+    # One sweep: check every user's mailbox once and process unseen mail.
+    # With a shard, only the mailboxes this node currently holds leases for.
+    stop = stop or stop_event
+    users = fetch_all_users()
+    owned = shard.sync(u[1] for u in users) if shard is not None else None
+
+    def holds(work_email):
+        # long sweep: renew before the leases can lapse under us; a lost lease stops its mailbox
+        nonlocal owned
+        if shard is None:
+            return True
+        if shard.expiring():
+            owned = shard.sync(u[1] for u in users)
+        return work_email in owned
+
+    for user in users:
+        if stop.is_set():
+            break
+        company_name, work_email, email_app_key = user
+        if not email_app_key:
+            continue
+        if not holds(work_email):
+            continue
+        # Connect using the user's email and app key
+        mail = connect_email(work_email, email_app_key)
+        try:
+            logger.debug("Checking for new emails for %s", company_name)
             mail_ids = fetch_new_emails(mail)
+            lane = "bulk" if len(mail_ids) > BULK_THRESHOLD else "mail"
             for mail_id in mail_ids:
-                process_email(mail, mail_id, company_name)
-        time.sleep(10)
+                if stop.is_set():
+                    break
+                if not holds(work_email):
+                    logger.info("Lease on %s lost mid-sweep; leaving its mail to the new holder", work_email)
+                    break
+                process_email(mail, mail_id, company_name, lane)
+        finally:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
+def email_listener(stop=None, node_shard=None):
+    
+    # Continuously fetches all users from the database and checks for new emails for each user.
+    # Sweeps only download and enqueue; the scheduler's workers screen.
+    stop = stop or stop_event
+    node_shard = node_shard or shard
+    get_scheduler().start()
+    requeue_spooled()
+    try:
+        while not stop.is_set():
+            poll_all_mailboxes(stop, node_shard)
+            stop.wait(POLL_INTERVAL)
+    finally:
+        if node_shard is not None:
+            node_shard.leave()
 
 @app.route("/start", methods=["GET"])
 def start_listener():
@@ -113,7 +258,7 @@ def start_listener():
         stop_event.clear()
         email_thread = threading.Thread(target=email_listener, daemon=True)
         email_thread.start()
-        print("📩 Email listener started")
+        logger.info("Email listener started")
         return jsonify({"message": "📩 Email listener started"}), 200
     else:
         return jsonify({"message": "⏳ Listener is already running"}), 200
@@ -130,5 +275,130 @@ def status_listener():
     status = "Running" if email_thread and email_thread.is_alive() else "Stopped"
     return jsonify({"status": status}), 200
 
+@app.route("/leases", methods=["GET"])
+def leases():
+    # This node's view of the listener cluster and the mailboxes it holds
+    if shard is None:
+        return jsonify({"sharding": False}), 200
+    return jsonify(dict(shard.report(), sharding=True)), 200
+
+@app.route("/rescreen", methods=["POST"])
+def rescreen_route():
+    # Re-screen previously processed resumes against a newly added job (runs in background)
+    data = request.get_json(silent=True) or {}
+    company = data.get("company")
+    job_title = data.get("job_title") or data.get("jobTitle")
+    if not company or not job_title:
+        return jsonify({"error": "company and job_title are required"}), 400
+    invalidate_jobs(company)
+    threading.Thread(target=rescreen_job, args=(company, job_title), daemon=True).start()
+    return jsonify({"message": f"Re-screening stored resumes for '{job_title}'"}), 202
+
+@app.route("/rematch", methods=["POST"])
+def rematch_route():
+    # Re-match the stored resumes a skills_config.json alias / family change can affect (runs in background)
+    data = request.get_json(silent=True) or {}
+    companies = [data["company"]] if data.get("company") else None
+    threading.Thread(target=rematch_vocabulary, args=(companies,), kwargs={"full": bool(data.get("full"))},
+                     daemon=True).start()
+    return jsonify({"message": "Re-matching resumes affected by the skills config change"}), 202
+
+@app.route("/screen", methods=["POST"])
+def screen_upload():
+    # Interactive upload (multipart: company, file); queued ahead of mailbox and bulk work
+    company = request.form.get("company")
+    upload = request.files.get("file")
+    if not company or upload is None or not upload.filename:
+        return jsonify({"error": "company and file are required"}), 400
+    filename = secure_filename(upload.filename)
+    if not filename.lower().endswith((".pdf", ".docx")):
+        return jsonify({"error": "only .pdf and .docx resumes are supported"}), 400
+    file_path = spool_resume(company, filename, upload.read(), "interactive")
+    get_scheduler().start()
+    queue_spooled(file_path)
+    return jsonify({"message": f"Queued '{filename}' for screening"}), 202
+
+@app.route("/scheduler-stats", methods=["GET"])
+def scheduler_stats():
+    # Per-company queue depth, in-flight work and wait-time percentiles
+    return jsonify(get_scheduler().report()), 200
+
+@app.route("/scheduler/tenant", methods=["POST"])
+def scheduler_tenant():
+    # Adjust a company's DRR weight and/or concurrency cap at runtime
+    data = request.get_json(silent=True) or {}
+    company = data.get("company")
+    if not company:
+        return jsonify({"error": "company is required"}), 400
+    try:
+        get_scheduler().set_tenant(company, data.get("weight"), data.get("max_concurrency"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(get_scheduler().report()["tenants"].get(company, {})), 200
+
+@app.route("/parser-stats", methods=["GET"])
+def parser_stats():
+    # Sandboxed parser workers: files parsed, timeouts, memory kills, crashes and recycles
+    return jsonify(get_parser_pool().stats()), 200
+
+@app.route("/daemon-stats", methods=["GET"])
+def daemon_stats():
+    # Screening daemon workers: requests served and per-process RSS / PSS (shared pages split)
+    if daemon is None:
+        return jsonify({"error": "SCREEN_DAEMON_SOCKET is not set"}), 404
+    try:
+        return jsonify(daemon.stats()), 200
+    except (OSError, ConnectionError, RuntimeError) as e:
+        return jsonify({"error": str(e)}), 503
+
+@app.route("/pipeline-stats", methods=["GET"])
+def pipeline_stats():
+    # Per-stage runs, rejects, timings and estimated time saved by early rejects
+    return jsonify(get_pipeline().report()), 200
+
+@app.route("/match-stats", methods=["GET"])
+def match_stats():
+    # Semantic gate: pairs compared vs gated out (token filters, fuzzy band, no overlap, budget);
+    # pair cache: LRU / shared-tier hits and misses per method
+    matcher = get_matcher()
+    return jsonify({"config_version": matcher.config_version, "semantic_gate": matcher.gate_stats(),
+                    "pair_cache": matcher.pair_cache.stats() if matcher.pair_cache is not None else None}), 200
+
+@app.route("/similar-candidates", methods=["POST"])
+def similar_candidates_route():
+    # Top-k selected candidates of a company by pooled skill embedding vs a free-text JD
+    data = request.get_json(silent=True) or {}
+    company = data.get("company")
+    jd = data.get("jd") or data.get("job_description")
+    if not company or not jd:
+        return jsonify({"error": "company and jd are required"}), 400
+    conn = _get_db_connection()
+    try:
+        cursor = conn.cursor()
+        matcher = get_matcher()
+        # pick up candidates selected since the last query before searching
+        sync_candidate_store(cursor, matcher)
+        result = similar_candidates(cursor, matcher, company, jd, k=int(data.get("k", 20)),
+                                    exact=bool(data.get("exact")))
+        conn.commit()
+    except (RuntimeError, ValueError) as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 409
+    finally:
+        conn.close()
+    return jsonify(dict(result, store=get_candidate_store().stats())), 200
+
+@app.route("/reload-config", methods=["POST"])
+def reload_config():
+    # Recompile skills_config.json now instead of waiting for the periodic mtime check
+    data = request.get_json(silent=True) or {}
+    try:
+        version, swapped = reload_matcher(force=bool(data.get("force")))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"config_version": version, "reloaded": swapped}), 200
+
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     app.run(port=5001)
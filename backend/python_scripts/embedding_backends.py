@@ -0,0 +1,183 @@
+# embedding_backends.py
+"""
+Pluggable sentence-embedding backends for the semantic matcher.
+- "torch":      sentence-transformers, float32 (reference)
+- "torch_int8": same model with nn.Linear layers dynamically quantized to int8
+- "onnx":       ONNX export run by onnxruntime + tokenizers (no torch import)
+- "onnx_int8":  int8-quantized ONNX export
+
+Every backend returns L2-normalized float32 rows, so cosine similarity is a dot
+product. Loaded backends are cached per process by (kind, model, options), so
+a skills_config.json reload reuses them.
+
+Config (skills_config.json "semantic" section):
+    "backend": "onnx_int8", "model_name": "sentence-transformers/all-MiniLM-L6-v2",
+    "onnx_file": "onnx/model_quint8_avx2.onnx", "batch_size": 64, "threads": 0
+
+`model_name` is a Hugging Face repo id or a local directory; ONNX files and
+tokenizer.json are read from it (the sentence-transformers repos ship both).
+"""
+
+import importlib.util
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BACKENDS = ("torch", "torch_int8", "onnx", "onnx_int8")
+
+DEFAULT_ONNX_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx_int8": "onnx/model_quint8_avx2.onnx",
+}
+
+_REQUIRES = {
+    "torch": ("torch", "sentence_transformers"),
+    "torch_int8": ("torch", "sentence_transformers"),
+    "onnx": ("onnxruntime", "tokenizers"),
+    "onnx_int8": ("onnxruntime", "tokenizers"),
+}
+
+
+def missing_modules(kind: str) -> List[str]:
+    """Modules a backend needs that are not installed (checked without importing them)."""
+    if kind not in _REQUIRES:
+        raise ValueError(f"unknown embedding backend: {kind!r} (expected one of {', '.join(BACKENDS)})")
+    return [m for m in _REQUIRES[kind] if importlib.util.find_spec(m) is None]
+
+
+def _normalize(emb: np.ndarray) -> np.ndarray:
+    emb = np.asarray(emb, dtype=np.float32)
+    return emb / np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+
+
+class EmbeddingBackend:
+    kind = ""
+
+    def __init__(self, model_name: str, batch_size: int = 64):
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), dim) float32, rows L2-normalized."""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return f"{self.kind}:{self.model_name}"
+
+
+class TorchBackend(EmbeddingBackend):
+    kind = "torch"
+
+    def __init__(self, model_name: str, batch_size: int = 64, threads: int = 0, quantize: bool = False):
+        super().__init__(model_name, batch_size)
+        import torch
+        from sentence_transformers import SentenceTransformer
+        self.threads = threads
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+        if quantize:
+            # dynamic int8: weights quantized once, activations per batch
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.eval()
+        self._model = model
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return _normalize(self._model.encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True,
+                                             normalize_embeddings=True, show_progress_bar=False))
+
+
+class OnnxBackend(EmbeddingBackend):
+    kind = "onnx"
+
+    def __init__(self, model_name: str, onnx_file: str, batch_size: int = 64, threads: int = 0,
+                 max_length: int = 128):
+        super().__init__(model_name, batch_size)
+        from tokenizers import Tokenizer
+
+        self.onnx_file = onnx_file
+        self.threads = threads
+        self._tokenizer = Tokenizer.from_file(_model_file(model_name, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+        self._open_session()
+        self._inputs = {i.name for i in self._session.get_inputs()}
+
+    def _open_session(self) -> None:
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        if self.threads:
+            opts.intra_op_num_threads = self.threads
+        self._session = ort.InferenceSession(_model_file(self.model_name, self.onnx_file), sess_options=opts,
+                                             providers=["CPUExecutionProvider"])
+        self._pid = os.getpid()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if self._pid != os.getpid():
+            # an onnxruntime session's thread pool does not survive fork; forked workers open their own
+            self._open_session()
+        out = []
+        texts = list(texts)
+        for start in range(0, len(texts), self.batch_size):
+            enc = self._tokenizer.encode_batch(texts[start:start + self.batch_size])
+            ids = np.array([e.ids for e in enc], dtype=np.int64)
+            mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+            feed = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self._inputs:
+                feed["token_type_ids"] = np.zeros_like(ids)
+            hidden = self._session.run(None, feed)[0]
+            # mean pooling over real tokens, as sentence-transformers does for MiniLM
+            m = mask[:, :, None].astype(np.float32)
+            out.append((hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9))
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        return _normalize(np.vstack(out))
+
+    def describe(self) -> str:
+        return f"{self.kind}:{self.model_name}/{self.onnx_file}"
+
+
+def _model_file(model_name: str, filename: str) -> str:
+    """Path of `filename` inside a local model directory, or downloaded from the Hugging Face hub."""
+    if os.path.isdir(model_name):
+        return os.path.join(model_name, filename)
+    from huggingface_hub import hf_hub_download
+    return hf_hub_download(repo_id=model_name, filename=filename)
+
+
+def _build(kind: str, model_name: str, onnx_file: Optional[str], batch_size: int, threads: int) -> EmbeddingBackend:
+    if kind in ("torch", "torch_int8"):
+        backend = TorchBackend(model_name, batch_size, threads, quantize=(kind == "torch_int8"))
+    else:
+        backend = OnnxBackend(model_name, onnx_file or DEFAULT_ONNX_FILES[kind], batch_size, threads)
+    backend.kind = kind
+    return backend
+
+
+# (kind, model, onnx_file, batch_size, threads) -> backend, shared by every SkillMatcher in the process
+_CACHE: Dict[Tuple, EmbeddingBackend] = {}
+_CACHE_LOCK = threading.Lock()
+
+def get_backend(kind: str = "torch", model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+                onnx_file: Optional[str] = None, batch_size: int = 64, threads: int = 0) -> EmbeddingBackend:
+    key = (kind, model_name, onnx_file, batch_size, threads)
+    backend = _CACHE.get(key)
+    if backend is None:
+        with _CACHE_LOCK:
+            backend = _CACHE.get(key)
+            if backend is None:
+                backend = _CACHE[key] = _build(kind, model_name, onnx_file, batch_size, threads)
+    return backend
+
+
+def backend_options(sem_cfg: Dict) -> Dict:
+    """get_backend() keyword arguments from the "semantic" config section."""
+    return {
+        "kind": sem_cfg.get("backend", "torch"),
+        "model_name": sem_cfg.get("model_name", "sentence-transformers/all-MiniLM-L6-v2"),
+        "onnx_file": sem_cfg.get("onnx_file"),
+        "batch_size": int(sem_cfg.get("batch_size", 64)),
+        "threads": int(sem_cfg.get("threads", 0)),
+    }
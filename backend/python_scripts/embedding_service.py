@@ -0,0 +1,338 @@
+# embedding_service.py
+"""
+Micro-batching front end for the embedding backends.
+- BatchingEmbedder queues encode() calls from every screening thread and runs
+  them through the backend together: a batch closes at max_batch strings, after
+  max_wait_ms, or as soon as every recently active caller thread is already in
+  it (so a lone caller never sits out the wait). Strings repeated across
+  callers are encoded once; rows are fanned back out to each caller
+- EmbeddingServer exposes one BatchingEmbedder on a Unix socket, so every
+  screening process on a host shares a single copy of the model;
+  RemoteEmbedder is its client (one connection per thread)
+- get_embedder() picks the mode from the "semantic" config section and caches
+  the result per process, like embedding_backends.get_backend()
+
+Wire format (both directions): 4-byte big-endian length + JSON header;
+responses are followed by rows * dim float32 values.
+
+Config (skills_config.json "semantic" section):
+    "service": "local" | "socket" | "none", "socket_path": "/tmp/resumexpert-embed.sock",
+    "max_batch": 64, "max_wait_ms": 5
+
+Usage:
+    python embedding_service.py serve [--socket /tmp/resumexpert-embed.sock]
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embedding_backends import EmbeddingBackend, backend_options, get_backend
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ("local", "socket", "none")
+DEFAULT_SOCKET = "/tmp/resumexpert-embed.sock"
+
+
+class _Request:
+    __slots__ = ("texts", "caller", "done", "result", "error")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.caller = threading.get_ident()
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+
+class BatchingEmbedder:
+    def __init__(self, backend: EmbeddingBackend, max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.backend = backend
+        self.kind = backend.kind
+        self.model_name = backend.model_name
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._cond = threading.Condition()
+        self._queue: Deque[_Request] = deque()
+        # caller thread -> last encode() time; a batch only waits for callers seen within the window
+        self._callers: Dict[int, float] = {}
+        self.active_window = max(0.05, 50 * self.max_wait)
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0              # strings requested
+        self.encoded = 0            # strings actually encoded (after de-duplication)
+        self.encode_s = 0.0
+        self._start()
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def _after_fork(self) -> None:
+        # threads do not survive fork (screen_daemon workers): a child starts its own dispatcher
+        with _EMBEDDERS_LOCK:
+            if self._pid != os.getpid():
+                self._cond = threading.Condition()
+                self._queue = deque()
+                self._callers = {}
+                self._start()
+
+    def describe(self) -> str:
+        return f"batched:{self.backend.describe()}"
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Same contract as EmbeddingBackend.encode; blocks until the batch holding `texts` ran."""
+        req = _Request(list(texts))
+        if not req.texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self._pid != os.getpid():
+            self._after_fork()
+        with self._cond:
+            self._queue.append(req)
+            self._callers[req.caller] = time.monotonic()
+            self._cond.notify_all()
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def _take_batch(self) -> List[_Request]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            now = time.monotonic()
+            deadline = now + self.max_wait
+            for caller, seen in list(self._callers.items()):
+                if now - seen > self.active_window:
+                    del self._callers[caller]
+            while True:
+                size = sum(len(r.texts) for r in self._queue)
+                # full, or every caller likely to send more is already in
+                if size >= self.max_batch or len(self._callers) <= len({r.caller for r in self._queue}):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, size = [], 0
+            while self._queue and (not batch or size + len(self._queue[0].texts) <= self.max_batch):
+                req = self._queue.popleft()
+                batch.append(req)
+                size += len(req.texts)
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            index: Dict[str, int] = {}
+            for req in batch:
+                for t in req.texts:
+                    index.setdefault(t, len(index))
+            t0 = time.perf_counter()
+            try:
+                emb = self.backend.encode(list(index))
+                results = [emb[[index[t] for t in req.texts]] for req in batch]
+            except BaseException as e:
+                # whatever goes wrong, every waiter of the batch is released and the dispatcher lives on
+                for req in batch:
+                    req.error = e
+                    req.done.set()
+                continue
+            self.encode_s += time.perf_counter() - t0
+            self.batches += 1
+            self.requests += len(batch)
+            self.encoded += len(index)
+            for req, result in zip(batch, results):
+                self.texts += len(req.texts)
+                req.result = result
+                req.done.set()
+
+    def stats(self) -> Dict:
+        return {"requests": self.requests, "batches": self.batches, "texts": self.texts, "encoded": self.encoded,
+                "mean_batch": self.encoded / self.batches if self.batches else 0.0,
+                "encode_s": self.encode_s}
+
+
+# ---------------------------
+# Unix socket service
+# ---------------------------
+def _send(sock: socket.socket, header: Dict, payload: bytes = b"") -> None:
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data + payload)
+
+def _recv_exact(sock: socket.socket, n: int) -> bytearray:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("embedding service closed the connection")
+        buf += chunk
+    return buf
+
+def _recv(sock: socket.socket) -> Dict:
+    (n,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, n))
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        embedder: BatchingEmbedder = self.server.embedder
+        while True:
+            try:
+                req = _recv(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                emb = np.ascontiguousarray(embedder.encode(req.get("texts", [])), dtype=np.float32)
+                _send(self.request, {"rows": emb.shape[0], "dim": emb.shape[1] if emb.ndim == 2 else 0},
+                      emb.tobytes())
+            except Exception as e:
+                _send(self.request, {"error": str(e)})
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, embedder: BatchingEmbedder):
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, _Handler)
+        self.embedder = embedder
+
+
+class RemoteEmbedder:
+    """Client of an EmbeddingServer; one connection per calling thread, reconnected once on failure."""
+
+    def __init__(self, path: str, model_name: str = "", timeout: float = 30.0):
+        self.kind = "socket"
+        self.path = path
+        self.model_name = model_name
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def describe(self) -> str:
+        return f"socket:{self.path}"
+
+    def _conn(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None and self._local.pid != os.getpid():
+            # inherited through fork: the connection belongs to the parent
+            self._drop()
+            sock = None
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+            self._local.pid = os.getpid()
+        return sock
+
+    def _drop(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        for attempt in (0, 1):
+            try:
+                sock = self._conn()
+                _send(sock, {"texts": texts})
+                head = _recv(sock)
+                if head.get("error"):
+                    break
+                # a bytearray keeps the array writable, like the in-process backends' output;
+                # a half-read payload leaves the connection out of step, so it is dropped like any failure
+                data = _recv_exact(sock, head["rows"] * head["dim"] * 4)
+                break
+            except (ConnectionError, OSError):
+                self._drop()
+                if attempt:
+                    raise
+        if head.get("error"):
+            raise RuntimeError(f"embedding service: {head['error']}")
+        return np.frombuffer(data, dtype=np.float32).reshape(head["rows"], head["dim"])
+
+
+# ---------------------------
+# selection
+# ---------------------------
+def service_options(sem_cfg: Dict) -> Dict:
+    """get_embedder() service keyword arguments from the "semantic" config section."""
+    service = sem_cfg.get("service", "local")
+    if service not in SERVICES:
+        raise ValueError(f"unknown embedding service: {service!r} (expected one of {', '.join(SERVICES)})")
+    return {
+        "service": service,
+        "socket_path": sem_cfg.get("socket_path", DEFAULT_SOCKET),
+        "max_batch": int(sem_cfg.get("max_batch", 64)),
+        "max_wait_ms": float(sem_cfg.get("max_wait_ms", 5)),
+    }
+
+
+_EMBEDDERS: Dict[Tuple, object] = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+def get_embedder(backend_opts: Dict, service: str = "local", socket_path: str = DEFAULT_SOCKET,
+                 max_batch: int = 64, max_wait_ms: float = 5.0):
+    """An object with encode()/describe() for the configured service, shared per process."""
+    if service == "none":
+        return get_backend(**backend_opts)
+    if service == "socket":
+        key = ("socket", socket_path)
+    else:
+        key = ("local", max_batch, max_wait_ms) + tuple(sorted(backend_opts.items()))
+    embedder = _EMBEDDERS.get(key)
+    if embedder is None:
+        with _EMBEDDERS_LOCK:
+            embedder = _EMBEDDERS.get(key)
+            if embedder is None:
+                if service == "socket":
+                    embedder = RemoteEmbedder(socket_path, backend_opts.get("model_name", ""))
+                else:
+                    embedder = BatchingEmbedder(get_backend(**backend_opts), max_batch, max_wait_ms)
+                _EMBEDDERS[key] = embedder
+    return embedder
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve batched embeddings on a Unix socket.")
+    ap.add_argument("command", choices=["serve"])
+    ap.add_argument("--config", default=os.getenv("SKILLS_CONFIG", "skills_config.json"))
+    ap.add_argument("--socket", help="socket path (default: semantic.socket_path of the config)")
+    ap.add_argument("--log-level", default="INFO")
+    a = ap.parse_args()
+    logging.basicConfig(level=a.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    with open(a.config, "r", encoding="utf-8") as fh:
+        sem = json.load(fh).get("semantic", {})
+    opts = service_options(sem)
+    path = a.socket or opts["socket_path"]
+    embedder = BatchingEmbedder(get_backend(**backend_options(sem)), opts["max_batch"], opts["max_wait_ms"])
+    server = EmbeddingServer(path, embedder)
+    logger.info("Serving %s on %s (batches of <= %d, <= %.1f ms wait)", embedder.describe(), path,
+                opts["max_batch"], opts["max_wait_ms"])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+        logger.info("Stopped: %s", embedder.stats())
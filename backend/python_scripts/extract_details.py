@@ -537,19 +537,31 @@
 # extract_details.py
 """
 Final resume processing using skill_matcher.SkillMatcher and skills_config.json.
+- The matcher is immutable and shared by every thread; process_resumes can
+  screen a batch on a thread pool (SCREEN_THREADS), which scales with cores on
+  free-threaded interpreters
+
+Config (env):
+    SCREEN_THREADS      threads process_resumes uses by default (default 1: one file at a time)
 
 Usage:
     from extract_details import extract_resume_details, process_resumes
     extract_resume_details("file.pdf", "file.pdf", "MyCompany")  # will store if JD matched
+    process_resumes([("a.pdf", "resumes/a.pdf"), ("b.docx", "resumes/b.docx")], "MyCompany", threads=4)
 """
 
+import logging
 import os
 import re
-from typing import List, Tuple
-import pdfplumber
-from docx import Document
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 import psycopg2
-from psycopg2 import sql
+
+import parse_sandbox
+from skill_matcher import SkillMatcher
 
 # at top of file (near other imports)
 try:
@@ -557,92 +569,201 @@ try:
 except ImportError:
     psycopg2 = None
 
-# spaCy (NER fallback)
-try:
-    import spacy
-    nlp = spacy.load(os.getenv("SPACY_MODEL", "en_core_web_sm"))
-except Exception:
-    nlp = None
-
-from skill_matcher import SkillMatcher
-from saving import store_files_in_db  # your existing helper
-
-# load matcher (singleton)
+logger = logging.getLogger(__name__)
+
+# spaCy (NER fallback), loaded on first use: processes that never reach the name stage
+# skip it, and screen_daemon loads it once in the parent before forking its workers
+_NLP = None
+_NLP_LOADED = False
+_NLP_LOCK = threading.Lock()
+# a spaCy pipeline adds unseen strings to its shared vocab while it runs: one caller at a time
+_NLP_CALL_LOCK = threading.Lock()
+
+def get_nlp():
+    """The spaCy pipeline for NER, or None when spaCy / the model is unavailable."""
+    global _NLP, _NLP_LOADED
+    if not _NLP_LOADED:
+        with _NLP_LOCK:
+            if not _NLP_LOADED:
+                try:
+                    import spacy
+                    _NLP = spacy.load(os.getenv("SPACY_MODEL", "en_core_web_sm"))
+                except Exception as e:
+                    logger.warning("spaCy NER unavailable: %s", e)
+                    _NLP = None
+                _NLP_LOADED = True
+    return _NLP
+
+# load matcher (singleton, hot-reloaded)
+# get_matcher() stats skills_config.json at most every SKILLS_CONFIG_CHECK seconds
+# (0 disables the check); a changed file is compiled into a new SkillMatcher on a
+# background thread and swapped in with a single assignment, so callers that
+# already hold the old matcher (in-flight resumes) finish on it.
+CONFIG_CHECK_INTERVAL = float(os.getenv("SKILLS_CONFIG_CHECK", 5))
 _SKILL_MATCHER = None
-def get_matcher():
-    global _SKILL_MATCHER
-    if _SKILL_MATCHER is None:
-        cfg_path = os.getenv("SKILLS_CONFIG", "skills_config.json")
-        _SKILL_MATCHER = SkillMatcher(cfg_path)
-    return _SKILL_MATCHER
+_CONFIG_STAT = None
+_NEXT_CONFIG_CHECK = 0.0
+_RELOAD_PENDING = False
+_MATCHER_LOCK = threading.Lock()
+_RELOAD_LOCK = threading.Lock()
 
-# text extraction helpers
-def extract_text_from_pdf(path: str) -> str:
+def _config_path() -> str:
+    return os.getenv("SKILLS_CONFIG", "skills_config.json")
+
+def _config_stat(path: str):
     try:
-        text = ""
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        print (text) 
-        return text
-    except Exception as e:
-        print("PDF text extraction error:", e)
-        return ""
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
 
-def extract_text_from_docx(path: str) -> str:
+def reload_matcher(force: bool = False) -> Tuple[Optional[str], bool]:
+    """
+    Rebuild the matcher if skills_config.json changed since the last build (or when forced).
+    A config that fails to load keeps the current matcher. Returns (active config_version, swapped).
+    """
+    global _SKILL_MATCHER, _CONFIG_STAT
+    with _RELOAD_LOCK:
+        path = _config_path()
+        stat = _config_stat(path)
+        old = _SKILL_MATCHER
+        if old is not None and not force and stat == _CONFIG_STAT:
+            return old.config_version, False
+        try:
+            # models come from the process-wide cache; only the lexicon is rebuilt
+            new = SkillMatcher(path).prepare()
+        except Exception as e:
+            if old is None:
+                raise
+            logger.error("skills config reload failed, keeping version %s: %s", old.config_version, e)
+            _CONFIG_STAT = stat   # don't retry the same broken file on every check
+            return old.config_version, False
+        _CONFIG_STAT = stat
+        if old is not None and new.config_version == old.config_version:
+            return old.config_version, False
+        _SKILL_MATCHER = new
+        if old is not None:
+            logger.info("skills config reloaded: %s -> %s", old.config_version, new.config_version)
+        return new.config_version, True
+
+def _background_reload():
+    global _RELOAD_PENDING
     try:
-        doc = Document(path)
-        text = "\n".join([p.text for p in doc.paragraphs if p.text])
-        print(text)
-        return text
+        reload_matcher()
     except Exception as e:
-        print("DOCX extraction error:", e)
-        return ""
+        logger.error("skills config reload failed: %s", e)
+    finally:
+        _RELOAD_PENDING = False
 
-def extract_text_from_file(path: str) -> str:
-    p = path.lower()
-    if p.endswith(".pdf"):
-        return extract_text_from_pdf(path)
-    if p.endswith(".docx") or p.endswith(".doc"):
-        return extract_text_from_docx(path)
-    return ""
+def get_matcher() -> SkillMatcher:
+    global _NEXT_CONFIG_CHECK, _RELOAD_PENDING
+    if _SKILL_MATCHER is None:
+        reload_matcher()
+    elif CONFIG_CHECK_INTERVAL > 0 and time.monotonic() >= _NEXT_CONFIG_CHECK:
+        with _MATCHER_LOCK:
+            if time.monotonic() >= _NEXT_CONFIG_CHECK and not _RELOAD_PENDING:
+                _NEXT_CONFIG_CHECK = time.monotonic() + CONFIG_CHECK_INTERVAL
+                if _config_stat(_config_path()) != _CONFIG_STAT:
+                    _RELOAD_PENDING = True
+                    threading.Thread(target=_background_reload, name="skills-config-reload", daemon=True).start()
+    return _SKILL_MATCHER
+
+# text extraction helpers
+# the parsers themselves live in text_extraction; extract_text_from_file runs them
+# in parse_sandbox workers and raises a ParseError when a document has to be killed
+def extract_text_from_file(path: str, max_chars: Optional[int] = None) -> str:
+    return parse_sandbox.extract_text(path, max_chars)
 
 # contact extraction
-def extract_emails(text: str) -> List[str]:
+# One precompiled alternation finds emails and phone candidates in a single pass.
+# Both alternatives only start at the beginning of a run (lookbehind), so long
+# words / digit tables are not re-scanned from every offset, and the phone part
+# only allows separators *between* digits, so it never backtracks.
+_EMAIL_PAT = r"(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
+_PHONE_PAT = r"(?<!\d)\+?\d(?:[\-\s\(\)]*\d)*"
+CONTACT_RE = re.compile(f"(?P<email>{_EMAIL_PAT})|(?P<phone>{_PHONE_PAT})")
+
+# name detection only looks at contact lines within the first N non-empty lines,
+# and the spaCy fallback only sees the first N characters
+NAME_SEARCH_LINES = int(os.getenv("NAME_SEARCH_LINES", 200))
+NER_MAX_CHARS = int(os.getenv("NER_MAX_CHARS", 5000))
+
+def _normalize_phone(raw: str) -> Optional[str]:
+    # same acceptance as before: >= 10 chars from the first digit, last 10 digits form an Indian mobile
+    if len(raw.lstrip("+")) < 10:
+        return None
+    digits = re.sub(r'\D', '', raw)
+    if len(digits) >= 10:
+        mobile = digits[-10:]
+        if mobile[0] in "6789":
+            return "+91" + mobile
+    return None
+
+class ContactScan:
+    """Result of scan_contacts: unique emails/phones in order, and the non-empty lines they occur on."""
+    __slots__ = ("lines", "emails", "phones", "contact_lines")
+
+    def __init__(self):
+        self.lines: List[str] = []                      # stripped non-empty lines
+        self.emails: List[str] = []
+        self.phones: List[str] = []
+        self.contact_lines: Dict[str, List[int]] = {}   # email / phone -> indices into lines
+
+def scan_contacts(text: str) -> ContactScan:
+    """Single pass over text; callers needing emails, phones and the name pass the result to each extractor."""
+    scan = ContactScan()
+    starts: List[int] = []
+    line_map: List[int] = []     # raw line -> index into scan.lines (-1 for blank lines)
+    pos = 0
+    for ln in text.splitlines(keepends=True):
+        starts.append(pos)
+        pos += len(ln)
+        stripped = ln.strip()
+        if stripped:
+            line_map.append(len(scan.lines))
+            scan.lines.append(stripped)
+        else:
+            line_map.append(-1)
+
+    seen = set()
+    for m in CONTACT_RE.finditer(text):
+        if m.lastgroup == "email":
+            val = m.group().lower()
+            target = scan.emails
+        else:
+            val = _normalize_phone(m.group())
+            if val is None:
+                continue
+            target = scan.phones
+        if val not in seen:
+            seen.add(val)
+            target.append(val)
+        li = line_map[bisect_right(starts, m.start()) - 1] if starts else -1
+        if li >= 0:
+            scan.contact_lines.setdefault(val, []).append(li)
+
+    return scan
+
+def extract_emails(text: str, scan: Optional[ContactScan] = None) -> List[str]:
     if not text:
         return []
-    emails = re.findall(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}", text)
-    return list(dict.fromkeys([e.lower() for e in emails]))
+    return list((scan or scan_contacts(text)).emails)
 
-def extract_phone_numbers(text: str) -> List[str]:
+def extract_phone_numbers(text: str, scan: Optional[ContactScan] = None) -> List[str]:
     if not text:
         return []
-    # match runs with digits and separators
-    candidates = re.findall(r'(\+?\d[\d\-\s\(\)]{8,}\d)', text)
-    cleaned = []
-    seen = set()
-    for raw in candidates:
-        digits = re.sub(r'\D', '', raw)
-        if len(digits) >= 10:
-            mobile = digits[-10:]
-            if mobile and mobile[0] in "6789":
-                val = "+91" + mobile
-                if val not in seen:
-                    seen.add(val)
-                    cleaned.append(val)
-    return cleaned
-
-def extract_name_by_proximity(text: str, emails: List[str], phones: List[str]) -> str:
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    return list((scan or scan_contacts(text)).phones)
+
+def extract_name_by_proximity(text: str, emails: List[str], phones: List[str], use_ner: bool = True,
+                              scan: Optional[ContactScan] = None) -> str:
+    if not text:
+        return None
+    scan = scan or scan_contacts(text)
+    lines = scan.lines
     contact_indices = set()
-    for i, ln in enumerate(lines):
-        for e in emails:
-            if e in ln:
-                contact_indices.add(i)
-        for p in phones:
-            if p.replace("+91", "") in re.sub(r'\D', '', ln):
+    for val in list(emails or []) + list(phones or []):
+        for i in scan.contact_lines.get(val.lower(), ()):
+            if i < NAME_SEARCH_LINES:
                 contact_indices.add(i)
     for idx in sorted(contact_indices):
         for j in range(max(0, idx-3), idx):
@@ -651,8 +772,10 @@ def extract_name_by_proximity(text: str, emails: List[str], phones: List[str]) -
             if 1 < len(words) <= 4 and all(w[0].isupper() for w in words if w):
                 return cand
     # spaCy fallback
+    nlp = get_nlp() if use_ner else None
     if nlp:
-        doc = nlp(text)
+        with _NLP_CALL_LOCK:
+            doc = nlp(text[:NER_MAX_CHARS])
         persons = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
         if persons:
             return persons[0]
@@ -778,103 +901,33 @@ def _get_db_connection():
 
 def extract_resume_details(file_name: str, file_path: str, company_name: str, require_jd_match: bool = True) -> bool:
     """
-    Extract and store resume only if matches JD skills stored in DB table company_name.
+    Extract and store resume only if matches the JD skills of company_name's jobs.
     Returns True if stored, False otherwise.
+    Runs the cost-ordered stages of screening_pipeline (cheap rejects first);
+    the outcome is recorded by screening_records.
     """
-    text = extract_text_from_file(file_path)
-    if not text:
-        print("Text extraction failed.")
-        return False
-
-    emails = extract_emails(text)
-    phones = extract_phone_numbers(text)
-    name = extract_name_by_proximity(text, emails, phones)
-
-    print("DEBUG: extracted emails:", emails)
-    print("DEBUG: extracted phones:", phones)
-    print("DEBUG: extracted name:", name)
-
-    if not name or not emails or not phones:
-        print("Name, email, or phone missing. Rejecting.")
-        return False
-
-    # Extract skill tokens
-    sec = extract_skills_section_text(text)
-    if sec:
-        resume_tokens = tokenize_skills(sec)
-        if not resume_tokens:
-            resume_tokens = fallback_extract_from_whole_text(text)
-    else:
-        resume_tokens = fallback_extract_from_whole_text(text)
-
-    if not resume_tokens:
-        print("No skill tokens detected.")
-        if require_jd_match:
-            return False
-
-    matcher = get_matcher()
-    # Connect DB and fetch JDs
-    conn = None
-    cursor = None
-    try:
-        conn = _get_db_connection()
-        cursor = conn.cursor()
-        query = sql.SQL("SELECT job_title, job_description FROM {}").format(sql.Identifier(company_name))
-        cursor.execute(query)
-        jobs = cursor.fetchall()
-        if not jobs:
-            print("No jobs found for company:", company_name)
-            return False
-
-        best_job = None
-        best_matches = {}
-        best_count = 0
-
-        for job_title, job_description in jobs:
-            # JD parse: split on comma
-            jd_raw = [s.strip() for s in job_description.split(",") if s.strip()]
-            matches = matcher.match_resume_to_jd(resume_tokens, jd_raw)
-            matched = [jd for jd,info in matches.items() if info[0]]
-            print(f"Matched {len(matched)} JD skills for job '{job_title}': {matched}")
-            if len(matched) > best_count:
-                best_count = len(matched)
-                best_job = (job_title, jd_raw, matches)
-                best_matches = matches
-
-        if not best_job:
-            print("No JD-matched skills found. Resume Rejected.")
-            return False
-
-        # Prepare matched canonical list for storing: use JD items that matched (canonicalized)
-        matched_jd_skills = [jd for jd, info in best_matches.items() if info[0]]
-        if not matched_jd_skills:
-            print("No matched JD skills after evaluation.")
-            return False
-
-        print(f"Matched {len(matched_jd_skills)} JD skills for job '{best_job[0]}': {matched_jd_skills}")
-
-        # Store matched_jd_skills in DB using your helper
-        store_files_in_db(cursor, company_name, name, emails[0], phones[0], matched_jd_skills, file_name, file_path)
-        conn.commit()
-        print(f"File '{file_name}' stored in table '{company_name}' (matched job: {best_job[0]}).")
-        return True
-
-    except Exception as e:
-        print("Error processing resume:", e)
-        if conn:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
-        return False
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
-def process_resumes(resume_files: List[Tuple[str,str]], company_name: str):
-    for file_name, file_path in resume_files:
-        print("Processing:", file_name)
-        ok = extract_resume_details(file_name, file_path, company_name, require_jd_match=True)
-        print("Selected" if ok else "Rejected:", file_name)
+    from screening_pipeline import get_pipeline
+    from screening_records import record_screening
+    ctx = get_pipeline().run(file_name, file_path, company_name, require_jd_match)
+    if ctx.reject_reason:
+        logger.info("%s rejected at stage '%s': %s", file_name, ctx.rejected_at, ctx.reject_reason)
+    record_screening(ctx)
+    return ctx.selected
+
+SCREEN_THREADS = int(os.getenv("SCREEN_THREADS", 1))
+
+def _process_one(file_name: str, file_path: str, company_name: str) -> bool:
+    logger.info("Processing: %s", file_name)
+    ok = extract_resume_details(file_name, file_path, company_name, require_jd_match=True)
+    logger.info("%s: %s", "Selected" if ok else "Rejected", file_name)
+    return ok
+
+def process_resumes(resume_files: List[Tuple[str,str]], company_name: str,
+                    threads: Optional[int] = None) -> Dict[str, bool]:
+    """Screen a batch of files; threads > 1 screens them concurrently. Returns file name -> selected."""
+    threads = SCREEN_THREADS if threads is None else threads
+    if threads <= 1 or len(resume_files) <= 1:
+        return {fn: _process_one(fn, fp, company_name) for fn, fp in resume_files}
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="screen") as pool:
+        futures = [(fn, pool.submit(_process_one, fn, fp, company_name)) for fn, fp in resume_files]
+        return {fn: f.result() for fn, f in futures}
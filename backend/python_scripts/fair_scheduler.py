@@ -0,0 +1,307 @@
+# fair_scheduler.py
+"""
+Weighted fair dispatch of screening work across companies (tenants).
+- Per-lane, per-tenant FIFO queues; lanes are served in strict priority order:
+  "interactive" (uploads) > "mail" (mailbox sweeps) > "bulk" (large backfills)
+- Inside a lane, tenants are served by deficit round-robin: each turn a tenant
+  earns quantum * weight credits and spends a task's cost per dispatch, so a
+  2,000-resume campaign only gets its weighted share while others have work
+- A per-tenant concurrency cap bounds how many of its tasks run at once
+  (capped tenants are skipped without earning credit)
+- Per-tenant queue depth, in-flight count, wait-time percentiles and run time
+  are kept for /scheduler-stats
+
+Config (env):
+    SCREEN_WORKERS             worker threads (default 4)
+    TENANT_WEIGHTS             "acme=3,globex=1" (default weight 1)
+    TENANT_MAX_CONCURRENCY     default per-tenant cap (default 2)
+    TENANT_CAPS                per-tenant caps, "acme=4"
+
+Usage:
+    sched = get_scheduler()
+    sched.submit("Acme", extract_resume_details, (name, path, "Acme"), lane="mail")
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LANES = ("interactive", "mail", "bulk")
+
+SCREEN_WORKERS = int(os.getenv("SCREEN_WORKERS", 4))
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", 2))
+
+
+def _parse_map(value: str, cast) -> Dict[str, object]:
+    out = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            k, v = item.split("=", 1)
+            out[k.strip()] = cast(v.strip())
+    return out
+
+
+class Task:
+    __slots__ = ("tenant", "lane", "fn", "args", "cost", "enqueued_at", "started_at")
+
+    def __init__(self, tenant: str, lane: str, fn: Callable, args: Tuple, cost: float):
+        self.tenant = tenant
+        self.lane = lane
+        self.fn = fn
+        self.args = args
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+        self.started_at = 0.0
+
+
+class TenantStats:
+    def __init__(self, window: int = 1000):
+        self.submitted = 0
+        self.dispatched = 0
+        self.completed = 0
+        self.failed = 0
+        self.inflight = 0
+        self.run_s = 0.0
+        self.waits: Deque[float] = deque(maxlen=window)   # recent queue waits (seconds)
+        self.max_wait = 0.0
+
+    def as_dict(self) -> Dict:
+        waits = sorted(self.waits)
+
+        def pct(p):
+            return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000.0 if waits else 0.0
+        return {
+            "submitted": self.submitted,
+            "dispatched": self.dispatched,
+            "completed": self.completed,
+            "failed": self.failed,
+            "inflight": self.inflight,
+            "wait_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": self.max_wait * 1000.0,
+                        "mean": sum(waits) / len(waits) * 1000.0 if waits else 0.0},
+            "run_ms_mean": self.run_s / self.completed * 1000.0 if self.completed else 0.0,
+        }
+
+
+class FairScheduler:
+    def __init__(self, quantum: float = 1.0, default_weight: float = 1.0,
+                 default_max_concurrency: int = TENANT_MAX_CONCURRENCY,
+                 weights: Optional[Dict[str, float]] = None, caps: Optional[Dict[str, int]] = None):
+        self.quantum = quantum
+        self.default_weight = default_weight
+        self.default_max_concurrency = default_max_concurrency
+        self.weights: Dict[str, float] = {}
+        self.caps: Dict[str, int] = {}
+        for tenant, weight in (weights or {}).items():
+            self.weights[tenant] = self._check_weight(weight)
+        for tenant, cap in (caps or {}).items():
+            self.caps[tenant] = self._check_cap(cap)
+        self._check_weight(default_weight)
+        self._check_cap(default_max_concurrency)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Dict[str, Deque[Task]]] = {lane: {} for lane in LANES}
+        self._active: Dict[str, Deque[str]] = {lane: deque() for lane in LANES}   # DRR ring per lane
+        self._deficit: Dict[str, Dict[str, float]] = {lane: {} for lane in LANES}
+        self._stats: Dict[str, TenantStats] = {}
+        self._queued = 0
+        self._inflight = 0
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    # ---------------------------
+    # configuration
+    # ---------------------------
+    @staticmethod
+    def _check_weight(weight) -> float:
+        # a tenant that never earns credit would never be served
+        weight = float(weight)
+        if not weight > 0:
+            raise ValueError(f"tenant weight must be > 0, got {weight}")
+        return weight
+
+    @staticmethod
+    def _check_cap(cap) -> int:
+        cap = int(cap)
+        if cap < 1:
+            raise ValueError(f"tenant max_concurrency must be >= 1, got {cap}")
+        return cap
+
+    def set_tenant(self, tenant: str, weight: Optional[float] = None, max_concurrency: Optional[int] = None):
+        # validate both before changing either
+        weight = None if weight is None else self._check_weight(weight)
+        max_concurrency = None if max_concurrency is None else self._check_cap(max_concurrency)
+        with self._cond:
+            if weight is not None:
+                self.weights[tenant] = weight
+            if max_concurrency is not None:
+                self.caps[tenant] = max_concurrency
+            self._cond.notify_all()
+
+    def _weight(self, tenant: str) -> float:
+        return self.weights.get(tenant, self.default_weight)
+
+    def _cap(self, tenant: str) -> int:
+        return self.caps.get(tenant, self.default_max_concurrency)
+
+    # ---------------------------
+    # queueing
+    # ---------------------------
+    def submit(self, tenant: str, fn: Callable, args: Tuple = (), lane: str = "mail", cost: float = 1.0) -> None:
+        if lane not in self._queues:
+            raise ValueError(f"unknown lane: {lane!r} (expected one of {', '.join(LANES)})")
+        task = Task(tenant, lane, fn, tuple(args), cost)
+        with self._cond:
+            q = self._queues[lane].get(tenant)
+            if q is None:
+                q = self._queues[lane][tenant] = deque()
+            if not q:
+                # joins the ring with one turn's credit
+                self._active[lane].append(tenant)
+                self._deficit[lane][tenant] = self.quantum * self._weight(tenant)
+            q.append(task)
+            self._queued += 1
+            self._stats.setdefault(tenant, TenantStats()).submitted += 1
+            self._cond.notify()
+
+    def _pick_lane(self, lane: str) -> Optional[Task]:
+        ring = self._active[lane]
+        queues = self._queues[lane]
+        deficit = self._deficit[lane]
+        # go round until a tenant can spend (every uncapped visit earns credit, so a task
+        # costing more than one turn's credit still goes out); stop when all are capped
+        capped = 0
+        while ring and capped < len(ring):
+            tenant = ring[0]
+            q = queues[tenant]
+            if self._stats[tenant].inflight >= self._cap(tenant):
+                capped += 1
+                ring.rotate(-1)
+                continue
+            capped = 0
+            if deficit[tenant] >= q[0].cost:
+                task = q.popleft()
+                deficit[tenant] -= task.cost
+                if not q:
+                    ring.popleft()
+                    deficit[tenant] = 0.0
+                elif deficit[tenant] < q[0].cost:
+                    # turn over; credit for its next turn
+                    deficit[tenant] += self.quantum * self._weight(tenant)
+                    ring.rotate(-1)
+                return task
+            deficit[tenant] += self.quantum * self._weight(tenant)
+            ring.rotate(-1)
+        return None
+
+    def next_task(self, timeout: Optional[float] = None) -> Optional[Task]:
+        """Block until a task is dispatchable (or timeout); marks it in flight."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._queued:
+                    for lane in LANES:
+                        task = self._pick_lane(lane)
+                        if task is not None:
+                            now = time.monotonic()
+                            task.started_at = now
+                            st = self._stats[task.tenant]
+                            wait = now - task.enqueued_at
+                            st.waits.append(wait)
+                            st.max_wait = max(st.max_wait, wait)
+                            st.dispatched += 1
+                            st.inflight += 1
+                            self._queued -= 1
+                            self._inflight += 1
+                            return task
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def task_done(self, task: Task, ok: bool = True) -> None:
+        with self._cond:
+            st = self._stats[task.tenant]
+            st.inflight -= 1
+            st.run_s += time.monotonic() - task.started_at
+            if ok:
+                st.completed += 1
+            else:
+                st.failed += 1
+            self._inflight -= 1
+            # a capped tenant may be dispatchable again; idle waiters may be done
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is queued or running."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queued or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    # ---------------------------
+    # workers
+    # ---------------------------
+    def start(self, workers: int = SCREEN_WORKERS) -> None:
+        """Start worker threads (idempotent)."""
+        with self._cond:
+            self._workers = [t for t in self._workers if t.is_alive()]
+            self._stop.clear()
+            for i in range(len(self._workers), workers):
+                t = threading.Thread(target=self._work, name=f"screen-worker-{i}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def stop(self) -> None:
+        """Workers exit after their current task; queued tasks stay queued."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            task = self.next_task(timeout=0.5)
+            if task is None:
+                continue
+            ok = True
+            try:
+                task.fn(*task.args)
+            except Exception:
+                ok = False
+                logger.exception("Screening task for %s failed", task.tenant)
+            finally:
+                self.task_done(task, ok)
+
+    def report(self) -> Dict:
+        with self._cond:
+            tenants = {}
+            for tenant, st in self._stats.items():
+                d = st.as_dict()
+                d["queued"] = {lane: len(self._queues[lane].get(tenant, ())) for lane in LANES}
+                d["weight"] = self._weight(tenant)
+                d["max_concurrency"] = self._cap(tenant)
+                tenants[tenant] = d
+            return {"queued": self._queued, "inflight": self._inflight,
+                    "workers": sum(1 for t in self._workers if t.is_alive()), "tenants": tenants}
+
+
+_SCHEDULER: Optional[FairScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+def get_scheduler() -> FairScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = FairScheduler(
+                    weights=_parse_map(os.getenv("TENANT_WEIGHTS", ""), float),
+                    caps=_parse_map(os.getenv("TENANT_CAPS", ""), int),
+                )
+    return _SCHEDULER
@@ -0,0 +1,560 @@
+# load_test.py
+"""
+End-to-end load test for the email -> screening -> selection path.
+- Spins up a local fake IMAP server seeded with synthetic mails that carry the
+  sample PDFs/DOCX from resumes/
+- Replaces Postgres with a SQLite stand-in (users, plus the shared tenant tables
+  of tenant_store.py for jobs and selections)
+- Points email_api's listener and extract_resume_details at both
+- Runs a scenario of N companies x M mails per minute and reports end-to-end
+  latency (mail arrival -> selection row), throughput, CPU and peak RSS; both
+  include the parse_sandbox worker processes (CPU from RUSAGE_CHILDREN once the
+  pool is closed, memory by sampling their RSS alongside this process)
+- --nodes runs several sharded listeners against the same stand-in database
+  (mailbox_leases.py); --kill-node-after crashes one of them mid-run, and the
+  report counts mails screened more than once
+
+Usage:
+    python load_test.py --companies 4 --rate 30 --duration 60
+    python load_test.py --companies 8 --nodes 3 --kill-node-after 10
+"""
+
+import argparse
+import email.utils
+import json
+import logging
+import os
+import random
+import re
+import resource
+import shutil
+import socketserver
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional, Tuple
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resumes")
+DEFAULT_JD = "python, java, javascript, react, nodejs, sql, aws, docker, kubernetes, html, css, machine learning"
+
+
+# ---------------------------
+# fake IMAP server
+# ---------------------------
+class Mailbox:
+    """In-memory mailbox: messages are never expunged so sequence numbers stay stable."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages: List[Dict] = []
+
+    def append(self, raw: bytes, key: str) -> None:
+        with self.lock:
+            self.messages.append({"raw": raw, "seen": False, "key": key, "arrived": time.time(), "seen_at": None})
+
+    def unseen(self) -> List[int]:
+        with self.lock:
+            return [i + 1 for i, m in enumerate(self.messages) if not m["seen"]]
+
+
+class FakeIMAPHandler(socketserver.StreamRequestHandler):
+    """Just enough IMAP4rev1 for imaplib: LOGIN, SELECT, SEARCH, FETCH RFC822, STORE, LOGOUT."""
+
+    def _send(self, line: str) -> None:
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+
+    def handle(self):
+        mailboxes: Dict[str, Mailbox] = self.server.mailboxes
+        box: Optional[Mailbox] = None
+        self._send("* OK fake IMAP ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode("utf-8", "replace").strip().split(" ", 2)
+            if len(parts) < 2:
+                continue
+            tag, cmd = parts[0], parts[1].upper()
+            arg = parts[2] if len(parts) > 2 else ""
+            if cmd == "CAPABILITY":
+                self._send("* CAPABILITY IMAP4rev1")
+                self._send(f"{tag} OK CAPABILITY completed")
+            elif cmd == "LOGIN":
+                user = arg.split(" ", 1)[0].strip('"')
+                box = mailboxes.get(user)
+                if box is None:
+                    self._send(f"{tag} NO [AUTHENTICATIONFAILED] unknown user")
+                else:
+                    self._send(f"{tag} OK LOGIN completed")
+            elif cmd in ("SELECT", "EXAMINE"):
+                count = len(box.messages) if box else 0
+                self._send(f"* {count} EXISTS")
+                self._send("* 0 RECENT")
+                self._send(f"{tag} OK [READ-WRITE] SELECT completed")
+            elif cmd == "SEARCH":
+                ids = box.unseen() if box else []
+                self._send("* SEARCH " + " ".join(str(i) for i in ids))
+                self._send(f"{tag} OK SEARCH completed")
+            elif cmd == "FETCH":
+                seq = int(arg.split(" ", 1)[0])
+                raw = box.messages[seq - 1]["raw"]
+                self.wfile.write(f"* {seq} FETCH (RFC822 {{{len(raw)}}}\r\n".encode("ascii") + raw + b")\r\n")
+                self._send(f"{tag} OK FETCH completed")
+            elif cmd == "STORE":
+                seq = int(arg.split(" ", 1)[0])
+                with box.lock:
+                    msg = box.messages[seq - 1]
+                    if "\\SEEN" in arg.upper() and not msg["seen"]:
+                        msg["seen"] = True
+                        msg["seen_at"] = time.time()
+                self._send(f"* {seq} FETCH (FLAGS (\\Seen))")
+                self._send(f"{tag} OK STORE completed")
+            elif cmd == "LOGOUT":
+                self._send("* BYE logging out")
+                self._send(f"{tag} OK LOGOUT completed")
+                return
+            else:
+                self._send(f"{tag} OK {cmd} completed")
+
+
+class FakeIMAPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, mailboxes: Dict[str, Mailbox]):
+        super().__init__(("127.0.0.1", 0), FakeIMAPHandler)
+        self.mailboxes = mailboxes
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+# ---------------------------
+# SQLite stand-in for psycopg2
+# ---------------------------
+def _render_sql(q) -> str:
+    """Render a psycopg2.sql composable (or plain string) to SQL text."""
+    if isinstance(q, str):
+        return q
+    if hasattr(q, "seq"):          # sql.Composed
+        return "".join(_render_sql(x) for x in q.seq)
+    if hasattr(q, "strings"):      # sql.Identifier
+        return ".".join('"' + s.replace('"', '""') + '"' for s in q.strings)
+    if hasattr(q, "string"):       # sql.SQL
+        return q.string
+    if hasattr(q, "wrapped"):      # sql.Literal
+        return repr(q.wrapped)
+    return str(q)
+
+
+_PG_TO_SQLITE = [
+    (re.compile(r"\bSERIAL PRIMARY KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bBIGSERIAL\b|\bSERIAL\b", re.I), "INTEGER"),
+    (re.compile(r"\bBYTEA\b", re.I), "BLOB"),
+    (re.compile(r"\bTEXT\[\]", re.I), "TEXT"),
+    (re.compile(r"\bnow\(\)\s*([+-])\s*%s\s*\*\s*interval\s*'1 second'", re.I), r"datetime('now', \1%s || ' seconds')"),
+    (re.compile(r"\bnow\(\)", re.I), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\s+FOR UPDATE\b", re.I), ""),
+    (re.compile(r"%s"), "?"),
+]
+# Postgres-only DDL / catalog lookups the stand-in treats as no-ops
+_PG_ONLY = re.compile(r"^\s*(ALTER TABLE|CREATE INDEX)|information_schema", re.I)
+
+
+class StandInCursor:
+    def __init__(self, conn: "StandInConnection"):
+        self.connection = conn
+        self._cur = conn.db.cursor()
+
+    def execute(self, query, params=None):
+        text = _render_sql(query)
+        if _PG_ONLY.search(text):
+            text, params = "SELECT 1 WHERE 0", None
+        for pat, repl in _PG_TO_SQLITE:
+            text = pat.sub(repl, text)
+        args = []
+        for p in params or ():
+            if isinstance(p, (list, tuple)):
+                p = json.dumps(list(p))
+            elif isinstance(p, memoryview):
+                p = bytes(p)
+            if isinstance(p, str) and p in self.connection.watch:
+                self.connection.pending.append(p)
+            args.append(p)
+        self._cur.execute(text, args)
+
+    @staticmethod
+    def _row(row):
+        # TEXT[] columns are stored as JSON; hand them back as lists like psycopg2 does
+        if row is None:
+            return None
+        return tuple(json.loads(v) if isinstance(v, str) and v.startswith("[") else v for v in row)
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchmany(self, size=None):
+        return [self._row(r) for r in self._cur.fetchmany(size or 1)]
+
+    def close(self):
+        self._cur.close()
+
+
+class StandInConnection:
+    """Looks enough like a psycopg2 connection for extract_details / saving / email_api."""
+
+    def __init__(self, path: str, watch: Dict[str, float], on_commit):
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.watch = watch
+        self.pending: List[str] = []
+        self._on_commit = on_commit
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def commit(self):
+        self.db.commit()
+        now = time.time()
+        for key in self.pending:
+            self._on_commit(key, now)
+        self.pending = []
+
+    def rollback(self):
+        self.db.rollback()
+        self.pending = []
+
+    def close(self):
+        self.db.close()
+
+
+def seed_database(path: str, companies: List[Tuple[str, str, str]], jd: str) -> None:
+    import tenant_store
+
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, company TEXT, work_email TEXT, email_app_key TEXT)")
+    for company, user, key in companies:
+        db.execute("INSERT INTO users (company, work_email, email_app_key) VALUES (?, ?, ?)", (company, user, key))
+    db.commit()
+    db.close()
+    # jobs go through the same data-access layer the app uses
+    tenant_store._TABLES_READY = False
+    tenant_store._COMPANY_IDS.clear()
+    conn = StandInConnection(path, {}, lambda key, ts: None)
+    cursor = conn.cursor()
+    for company, _, _ in companies:
+        tenant_store.add_job(cursor, company, "Engineer", jd)
+    conn.commit()
+    conn.close()
+
+
+# ---------------------------
+# synthetic mail
+# ---------------------------
+def load_samples(sample_dir: str) -> List[Tuple[str, bytes]]:
+    out = []
+    for fn in sorted(os.listdir(sample_dir)):
+        if fn.lower().endswith((".pdf", ".docx")):
+            with open(os.path.join(sample_dir, fn), "rb") as fh:
+                out.append((os.path.splitext(fn)[1].lower(), fh.read()))
+    if not out:
+        raise RuntimeError(f"no sample resumes found in {sample_dir}")
+    return out
+
+
+def build_message(to_addr: str, attachment_name: str, payload: bytes) -> bytes:
+    msg = MIMEMultipart()
+    msg["From"] = "Applicant <applicant@example.com>"
+    msg["To"] = to_addr
+    msg["Subject"] = "Job application"
+    msg["Date"] = email.utils.formatdate()
+    msg.attach(MIMEText("Please find my resume attached.", "plain"))
+    part = MIMEApplication(payload, Name=attachment_name)
+    part["Content-Disposition"] = f'attachment; filename="{attachment_name}"'
+    msg.attach(part)
+    return msg.as_bytes()
+
+
+# ---------------------------
+# scenario
+# ---------------------------
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+
+def _rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * _PAGE_MB
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+class RssSampler(threading.Thread):
+    """Peak of this process's RSS plus its parser workers', sampled (ru_maxrss is per process)."""
+
+    def __init__(self, worker_pids: Callable[[], List[int]], interval: float = 0.2):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.worker_pids = worker_pids
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.peak_parsers_mb = 0.0
+        self._done = threading.Event()
+
+    def sample(self) -> None:
+        parsers = sum(_rss_mb(pid) for pid in self.worker_pids())
+        self.peak_parsers_mb = max(self.peak_parsers_mb, parsers)
+        self.peak_mb = max(self.peak_mb, _rss_mb(os.getpid()) + parsers)
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+def run_scenario(args) -> Dict:
+    import email_api
+    import extract_details
+    import fair_scheduler
+    import mailbox_leases
+    import parse_sandbox
+    import screening_records
+
+    rng = random.Random(args.seed)
+    samples = load_samples(args.samples)
+    workdir = tempfile.mkdtemp(prefix="resumexpert_lt_")
+    db_path = os.path.join(workdir, "standin.sqlite3")
+
+    companies = [(f"ltco{i}", f"ltco{i}@example.com", "app-key") for i in range(args.companies)]
+    mailboxes = {user: Mailbox() for _, user, _ in companies}
+
+    arrivals: Dict[str, float] = {}
+    selected: Dict[str, float] = {}
+
+    def on_commit(key, ts):
+        selected.setdefault(key, ts)
+
+    def connect():
+        return StandInConnection(db_path, arrivals, on_commit)
+
+    # the shared tables are created on a connection of their own, so seed through the stand-in too
+    extract_details._get_db_connection = connect
+    seed_database(db_path, companies, args.jd)
+
+    server = FakeIMAPServer(mailboxes)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # point the listener and the screening path at the stand-ins
+    email_api.IMAP_HOST, email_api.IMAP_PORT, email_api.IMAP_SSL = "127.0.0.1", server.port, False
+    email_api.POLL_INTERVAL = args.poll_interval
+    email_api.RESUME_FOLDER = os.path.join(workdir, "resumes")
+    os.makedirs(email_api.RESUME_FOLDER, exist_ok=True)
+    email_api._get_db_connection = connect
+    fair_scheduler._SCHEDULER = None   # fresh queues / tenant stats for this run
+    scheduler = fair_scheduler.get_scheduler()
+    records = None
+    if screening_records.get_writer() is not None:
+        records = screening_records._WRITER = screening_records.ScreeningRecordWriter(
+            os.path.join(workdir, "screening_records"))
+
+    # injector: every company receives `rate` mails per minute for `duration` seconds
+    stop_inject = threading.Event()
+
+    def inject(company: str, user: str):
+        seq = 0
+        interval = 60.0 / args.rate
+        deadline = time.time() + args.duration
+        while time.time() < deadline and not stop_inject.is_set():
+            ext, payload = rng.choice(samples)
+            name = f"{company}_{seq:06d}_resume{ext}"
+            arrivals[name] = time.time()
+            mailboxes[user].append(build_message(user, name, payload), name)
+            seq += 1
+            stop_inject.wait(rng.expovariate(1.0 / interval) if args.poisson else interval)
+
+    rusage0 = resource.getrusage(resource.RUSAGE_SELF)
+    children0 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    sampler = RssSampler(parse_sandbox.get_parser_pool().worker_pids if parse_sandbox.PARSE_SANDBOX else list)
+    sampler.start()
+    wall0 = time.time()
+    injectors = [threading.Thread(target=inject, args=(c, u), daemon=True) for c, u, _ in companies]
+    for t in injectors:
+        t.start()
+
+    # listener nodes: (stop event, shard); a single node polls every mailbox unsharded
+    if args.nodes > 1:
+        mailbox_leases._TABLES_READY = False
+        ttl = max(1.0, 3 * args.poll_interval)
+        nodes = [(threading.Event(), mailbox_leases.MailboxShard(connect, node_id=f"lt-node-{i}",
+                                                                 node_ttl=ttl, lease_ttl=2 * ttl))
+                 for i in range(args.nodes)]
+    else:
+        email_api.stop_event.clear()
+        nodes = [(email_api.stop_event, None)]
+    listeners = [threading.Thread(target=email_api.email_listener, args=node, daemon=True) for node in nodes]
+    for t in listeners:
+        t.start()
+    if args.kill_node_after and len(nodes) > 1:
+        def crash():
+            # stop without releasing leases, as a dead host would
+            victim_stop, victim = nodes[0]
+            victim.leave = lambda: None
+            victim_stop.set()
+        threading.Timer(args.kill_node_after, crash).start()
+
+    for t in injectors:
+        t.join()
+    # drain: wait until every injected mail was picked up, bounded by --drain-timeout
+    drain_deadline = time.time() + args.drain_timeout
+    while time.time() < drain_deadline:
+        if all(not box.unseen() for box in mailboxes.values()):
+            break
+        time.sleep(0.2)
+    # picked-up mails may still be queued for screening
+    scheduler.wait_idle(max(0.0, drain_deadline - time.time()))
+    for stop, _ in nodes:
+        stop.set()
+    for t in listeners:
+        t.join(timeout=args.drain_timeout)
+    wall = time.time() - wall0
+    sampler.stop()
+    parser_stats = parse_sandbox.get_parser_pool().stats() if parse_sandbox.PARSE_SANDBOX else None
+    # parse workers are only counted in RUSAGE_CHILDREN once reaped: retire the (now idle) pool
+    if parse_sandbox.PARSE_SANDBOX:
+        parse_sandbox.get_parser_pool().close()
+    rusage1 = resource.getrusage(resource.RUSAGE_SELF)
+    children1 = resource.getrusage(resource.RUSAGE_CHILDREN)
+    server.shutdown()
+    scheduler.stop()
+    tenants = scheduler.report()["tenants"]
+    tenant_waits = {t: d["wait_ms"] for t, d in tenants.items()}
+    screened = sum(d["submitted"] for d in tenants.values())
+    if records is not None:
+        records.close()
+
+    processed = []
+    for box in mailboxes.values():
+        processed += [m["seen_at"] - m["arrived"] for m in box.messages if m["seen"]]
+    latencies = [selected[k] - arrivals[k] for k in selected if k in arrivals]
+    db = sqlite3.connect(db_path)
+    candidate_rows = db.execute("SELECT count(*) FROM selected_candidates").fetchone()[0]
+    db.close()
+    cpu_self = (rusage1.ru_utime - rusage0.ru_utime) + (rusage1.ru_stime - rusage0.ru_stime)
+    cpu_parsers = (children1.ru_utime - children0.ru_utime) + (children1.ru_stime - children0.ru_stime)
+    cpu = cpu_self + cpu_parsers
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_div = 1024 * 1024 if sys.platform == "darwin" else 1024
+
+    report = {
+        "scenario": {"companies": args.companies, "mails_per_minute_per_company": args.rate,
+                     "duration_s": args.duration, "poll_interval_s": args.poll_interval},
+        "injected": len(arrivals),
+        "picked_up": len(processed),
+        "screened": screened,
+        "duplicates": max(0, screened - len(processed)),
+        "selected": len(selected),
+        "candidate_rows": candidate_rows,
+        "wall_s": wall,
+        "throughput_per_s": len(processed) / wall if wall else 0.0,
+        "selected_per_s": len(selected) / wall if wall else 0.0,
+        "pickup_latency_s": {"p50": _pct(processed, 0.5), "p95": _pct(processed, 0.95), "max": max(processed, default=0.0)},
+        "e2e_latency_s": {
+            "mean": statistics.mean(latencies) if latencies else 0.0,
+            "p50": _pct(latencies, 0.5), "p95": _pct(latencies, 0.95),
+            "p99": _pct(latencies, 0.99), "max": max(latencies, default=0.0),
+        },
+        "cpu_s": cpu,
+        "cpu_breakdown_s": {"api": cpu_self, "parsers": cpu_parsers},
+        "cpu_utilisation": cpu / wall if wall else 0.0,
+        "peak_rss_mb": max(sampler.peak_mb, rusage1.ru_maxrss / rss_div),
+        "peak_rss_breakdown_mb": {"api": rusage1.ru_maxrss / rss_div, "parsers": sampler.peak_parsers_mb},
+        "tenant_wait_ms": tenant_waits,
+        "parser": parser_stats,
+        "nodes": [{"node_id": sh.node_id, "moves": sh.moves} for _, sh in nodes if sh is not None],
+        "records": {"written": records.written, "files": records.files, "dropped": records.dropped}
+                   if records is not None else None,
+    }
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    else:
+        report["workdir"] = workdir
+    return report
+
+
+def print_report(r: Dict) -> None:
+    sc = r["scenario"]
+    print("\n=== load test report ===")
+    print(f"scenario        : {sc['companies']} companies x {sc['mails_per_minute_per_company']} mails/min for {sc['duration_s']}s")
+    print(f"mails           : injected {r['injected']}, picked up {r['picked_up']}, selected {r['selected']} "
+          f"({r['candidate_rows']} unique candidate rows)")
+    print(f"wall time       : {r['wall_s']:.1f}s")
+    if r.get("nodes"):
+        print(f"listener nodes  : {len(r['nodes'])}, {sum(n['moves'] for n in r['nodes'])} mailbox moves, "
+              f"{r['duplicates']} mails screened twice")
+    print(f"throughput      : {r['throughput_per_s']:.2f} mails/s ({r['selected_per_s']:.2f} selections/s)")
+    pl = r["pickup_latency_s"]
+    print(f"pickup latency  : p50 {pl['p50']:.2f}s  p95 {pl['p95']:.2f}s  max {pl['max']:.2f}s")
+    el = r["e2e_latency_s"]
+    print(f"e2e latency     : mean {el['mean']:.2f}s  p50 {el['p50']:.2f}s  p95 {el['p95']:.2f}s  p99 {el['p99']:.2f}s  max {el['max']:.2f}s")
+    cb, rb = r["cpu_breakdown_s"], r["peak_rss_breakdown_mb"]
+    print(f"cpu             : {r['cpu_s']:.1f}s ({r['cpu_utilisation']:.0%} of one core; "
+          f"api {cb['api']:.1f}s, parsers {cb['parsers']:.1f}s)")
+    print(f"peak RSS        : {r['peak_rss_mb']:.0f} MB (api {rb['api']:.0f} MB, parsers {rb['parsers']:.0f} MB)")
+    if r.get("parser"):
+        ps = r["parser"]
+        print(f"parser workers  : {ps['tasks']} files, mean {ps['parse_ms_mean']:.0f}ms, peak {ps['peak_rss_mb']:.0f} MB, "
+              f"{ps['timeouts']} timeouts, {ps['memory_kills']} memory kills, {ps['crashes']} crashes")
+    for tenant, w in sorted(r.get("tenant_wait_ms", {}).items()):
+        print(f"queue wait      : {tenant:12s} p50 {w['p50']:.0f}ms  p95 {w['p95']:.0f}ms  max {w['max']:.0f}ms")
+    if r.get("records"):
+        rc = r["records"]
+        print(f"records         : {rc['written']} rows in {rc['files']} Parquet files ({rc['dropped']} dropped)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--companies", type=int, default=2)
+    ap.add_argument("--rate", type=float, default=12, help="mails per minute per company")
+    ap.add_argument("--duration", type=float, default=30, help="injection window in seconds")
+    ap.add_argument("--poisson", action="store_true", help="exponential inter-arrival times instead of fixed")
+    ap.add_argument("--poll-interval", type=float, default=1.0, help="listener sweep interval in seconds")
+    ap.add_argument("--drain-timeout", type=float, default=120.0)
+    ap.add_argument("--jd", default=DEFAULT_JD, help="comma-separated JD skills seeded for every company")
+    ap.add_argument("--samples", default=SAMPLE_DIR)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--json", help="also write the report to this file")
+    ap.add_argument("--keep", action="store_true", help="keep the temp work dir (SQLite db, saved attachments)")
+    ap.add_argument("--nodes", type=int, default=1, help="sharded listener nodes sharing the mailboxes")
+    ap.add_argument("--kill-node-after", type=float, default=0.0,
+                    help="crash the first node this many seconds in (its leases must expire)")
+    ap.add_argument("--log-level", default="WARNING", help="log level of the screening path")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    report = run_scenario(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# mailbox_leases.py
+"""
+Sharded mailbox ownership across listener nodes (processes / hosts).
+- Every node heartbeats into listener_nodes on each sweep; a node silent for
+  LISTENER_NODE_TTL seconds counts as dead
+- Each mailbox's owner is picked by rendezvous (highest-random-weight) hashing
+  over the live nodes, so a node joining or dying only moves its own share
+- A node polls a mailbox only while it holds that mailbox's row in
+  mailbox_leases. Leases are renewed every sweep (and between messages once half
+  the TTL has passed; a mailbox whose lease is lost is dropped mid-sweep),
+  released as soon as another live node wins the mailbox, and expire after
+  MAILBOX_LEASE_TTL when their node dies - a mailbox is never polled by two
+  nodes at once
+- Timestamps come from the database (now()), never from node clocks
+
+Config (env):
+    LISTENER_SHARDING       "1" enables sharding in email_api (default off: one node polls everything)
+    LISTENER_NODE_ID        node id (default "<hostname>:<pid>")
+    LISTENER_NODE_TTL       heartbeat expiry in seconds (default 30)
+    MAILBOX_LEASE_TTL       lease expiry in seconds (default 60, must exceed handling one message)
+
+Usage:
+    shard = MailboxShard(connect=_get_db_connection)
+    owned = shard.sync([work_email for _, work_email, _ in users])
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+NODES_TABLE = "listener_nodes"
+LEASES_TABLE = "mailbox_leases"
+
+LISTENER_NODE_TTL = float(os.getenv("LISTENER_NODE_TTL", 30))
+MAILBOX_LEASE_TTL = float(os.getenv("MAILBOX_LEASE_TTL", 60))
+
+_TABLES_READY = False
+
+def ensure_lease_tables(cursor):
+    global _TABLES_READY
+    if _TABLES_READY:
+        return
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            node_id VARCHAR(255) PRIMARY KEY,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """).format(sql.Identifier(NODES_TABLE)))
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            work_email VARCHAR(255) PRIMARY KEY,
+            node_id VARCHAR(255) NOT NULL,
+            lease_until TIMESTAMPTZ NOT NULL
+        );
+    """).format(sql.Identifier(LEASES_TABLE)))
+    _TABLES_READY = True
+
+
+def rendezvous_owner(key: str, nodes: Iterable[str]) -> Optional[str]:
+    """Node with the highest hash weight for key (stable while both stay alive)."""
+    best, best_w = None, b""
+    for node in nodes:
+        w = hashlib.sha1(f"{node}|{key}".encode("utf-8")).digest()
+        if best is None or w > best_w:
+            best, best_w = node, w
+    return best
+
+
+class MailboxShard:
+    def __init__(self, connect: Callable, node_id: Optional[str] = None,
+                 node_ttl: float = LISTENER_NODE_TTL, lease_ttl: float = MAILBOX_LEASE_TTL):
+        self.node_id = node_id or os.getenv("LISTENER_NODE_ID") or f"{socket.gethostname()}:{os.getpid()}"
+        self.node_ttl = node_ttl
+        self.lease_ttl = lease_ttl
+        self._connect = connect
+        self._lock = threading.Lock()
+        self.live_nodes: List[str] = []
+        self.owned: Set[str] = set()
+        self.synced_at = 0.0      # monotonic time of the last successful sync
+        self.moves = 0            # mailboxes acquired or released since start
+
+    def expiring(self) -> bool:
+        """True once a sweep has run long enough that the leases may lapse before it ends."""
+        return time.monotonic() - self.synced_at > self.lease_ttl * 0.5
+
+    def sync(self, mailboxes: Iterable[str]) -> Set[str]:
+        """
+        Heartbeat, work out this node's share of `mailboxes` and take / renew /
+        release leases accordingly. Returns the mailboxes this node may poll now
+        (empty when the database is unreachable, so a partitioned node stops polling).
+        """
+        mailboxes = sorted(set(mailboxes))
+        with self._lock:
+            conn = None
+            try:
+                conn = self._connect()
+                cur = conn.cursor()
+                ensure_lease_tables(cur)
+                cur.execute(sql.SQL("""
+                    INSERT INTO {} (node_id) VALUES (%s)
+                    ON CONFLICT (node_id) DO UPDATE SET heartbeat_at = now();
+                """).format(sql.Identifier(NODES_TABLE)), (self.node_id,))
+                cur.execute(sql.SQL("SELECT node_id FROM {} WHERE heartbeat_at > now() - %s * interval '1 second'")
+                            .format(sql.Identifier(NODES_TABLE)), (self.node_ttl,))
+                live = sorted({r[0] for r in cur.fetchall()} | {self.node_id})
+                wanted = {m for m in mailboxes if rendezvous_owner(m, live) == self.node_id}
+
+                # hand back what another live node now wins (or what no longer exists)
+                cur.execute(sql.SQL("SELECT work_email FROM {} WHERE node_id = %s")
+                            .format(sql.Identifier(LEASES_TABLE)), (self.node_id,))
+                for (work_email,) in cur.fetchall():
+                    if work_email not in wanted:
+                        cur.execute(sql.SQL("DELETE FROM {} WHERE work_email = %s AND node_id = %s")
+                                    .format(sql.Identifier(LEASES_TABLE)), (work_email, self.node_id))
+
+                # take free / expired leases, renew our own; a live foreign lease is left alone
+                owned = set()
+                for work_email in sorted(wanted):
+                    cur.execute(sql.SQL("""
+                        INSERT INTO {0} (work_email, node_id, lease_until)
+                        VALUES (%s, %s, now() + %s * interval '1 second')
+                        ON CONFLICT (work_email) DO UPDATE SET
+                            node_id = EXCLUDED.node_id, lease_until = EXCLUDED.lease_until
+                        WHERE {0}.node_id = EXCLUDED.node_id OR {0}.lease_until < now()
+                        RETURNING work_email;
+                    """).format(sql.Identifier(LEASES_TABLE)), (work_email, self.node_id, self.lease_ttl))
+                    if cur.fetchone():
+                        owned.add(work_email)
+
+                # forget nodes that have been gone for a long time
+                cur.execute(sql.SQL("DELETE FROM {} WHERE heartbeat_at < now() - %s * interval '1 second'")
+                            .format(sql.Identifier(NODES_TABLE)), (self.node_ttl * 10,))
+                conn.commit()
+                cur.close()
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                logger.error("Mailbox lease sync failed on %s: %s", self.node_id, e)
+                self.owned = set()
+                return set()
+            finally:
+                if conn is not None:
+                    conn.close()
+
+            if live != self.live_nodes:
+                logger.info("Listener nodes: %s", ", ".join(live))
+            gained, lost = owned - self.owned, self.owned - owned
+            if gained or lost:
+                self.moves += len(gained) + len(lost)
+                logger.info("Node %s now holds %d mailboxes (+%d / -%d)", self.node_id, len(owned),
+                            len(gained), len(lost))
+            self.live_nodes, self.owned = live, owned
+            self.synced_at = time.monotonic()
+            return set(owned)
+
+    def leave(self) -> None:
+        """Drop this node's heartbeat and leases so the others take over on their next sweep."""
+        with self._lock:
+            conn = None
+            try:
+                conn = self._connect()
+                cur = conn.cursor()
+                ensure_lease_tables(cur)
+                cur.execute(sql.SQL("DELETE FROM {} WHERE node_id = %s").format(sql.Identifier(LEASES_TABLE)),
+                            (self.node_id,))
+                cur.execute(sql.SQL("DELETE FROM {} WHERE node_id = %s").format(sql.Identifier(NODES_TABLE)),
+                            (self.node_id,))
+                conn.commit()
+                cur.close()
+            except Exception as e:
+                if conn is not None:
+                    conn.rollback()
+                logger.warning("Could not release leases of %s: %s", self.node_id, e)
+            finally:
+                if conn is not None:
+                    conn.close()
+            self.owned = set()
+            self.live_nodes = []
+
+    def report(self) -> Dict:
+        return {"node_id": self.node_id, "live_nodes": list(self.live_nodes), "owned": sorted(self.owned),
+                "moves": self.moves, "node_ttl_s": self.node_ttl, "lease_ttl_s": self.lease_ttl}
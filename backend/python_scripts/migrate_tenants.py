@@ -0,0 +1,248 @@
+# migrate_tenants.py
+"""
+Move per-company tables into the shared tenant tables (see tenant_store.py).
+- "<company>"           -> jobs (company_id, job_title, job_description)
+- "<company>_selected"  -> selected_candidates, including legacy tables whose
+                           `skills` column is free-form TEXT or that predate skill_keys
+- Companies are taken from users (or --company); each one is copied in its own
+  transaction and the copy is idempotent, so an interrupted run can simply be re-run
+- Legacy tables are only dropped with --drop-legacy, after the row counts check out
+- A candidate selected several times is copied once (their latest row)
+
+`partition` moves one tenant out of the default partition into its own
+(requires the tables to have been created with TENANT_PARTITIONED=1).
+
+`dedup` fills the identity keys of rows selected before candidate
+de-duplication, merges rows sharing a company and email into the newest one
+(skills unioned, submissions summed) and creates the unique index.
+
+Usage:
+    python migrate_tenants.py migrate [--company Acme ...] [--dry-run] [--drop-legacy]
+    python migrate_tenants.py partition Acme
+    python migrate_tenants.py dedup [--dry-run]
+"""
+
+import argparse
+import logging
+import sys
+from typing import Dict, List, Optional
+
+from psycopg2 import sql
+
+from tenant_store import (COMPANIES_TABLE, JOBS_TABLE, SELECTED_TABLE, company_id, create_identity_index,
+                          ensure_tenant_tables)
+
+logger = logging.getLogger(__name__)
+
+# a company named like one of these never had a table of its own that we could tell apart
+_RESERVED = {"users", COMPANIES_TABLE, JOBS_TABLE, SELECTED_TABLE}
+
+
+def _columns(cursor, table_name: str) -> Dict[str, str]:
+    """column name -> data_type of a table in the current schema ({} if it does not exist)."""
+    cursor.execute("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+    """, (table_name,))
+    return dict(cursor.fetchall())
+
+def _count(cursor, query: sql.Composable, params=()) -> int:
+    cursor.execute(query, params)
+    return int(cursor.fetchone()[0])
+
+
+def migrate_company(cursor, company_name: str) -> Dict[str, int]:
+    """Copy one company's legacy tables; returns row counts (caller commits)."""
+    out = {"jobs_legacy": 0, "jobs_copied": 0, "jobs_now": 0,
+           "selected_legacy": 0, "selected_copied": 0, "selected_now": 0}
+    cid = company_id(cursor, company_name)
+
+    job_cols = _columns(cursor, company_name)
+    if {"job_title", "job_description"} <= set(job_cols):
+        legacy = sql.Identifier(company_name)
+        out["jobs_legacy"] = _count(cursor, sql.SQL("SELECT count(*) FROM {}").format(legacy))
+        cursor.execute(sql.SQL("""
+            INSERT INTO {} (company_id, job_title, job_description)
+            SELECT %s, job_title, job_description FROM {} ORDER BY id
+            ON CONFLICT (company_id, job_title) DO NOTHING;
+        """).format(sql.Identifier(JOBS_TABLE), legacy), (cid,))
+        out["jobs_copied"] = cursor.rowcount
+        out["jobs_now"] = _count(cursor, sql.SQL("SELECT count(*) FROM {} WHERE company_id = %s").format(
+            sql.Identifier(JOBS_TABLE)), (cid,))
+
+    sel_cols = _columns(cursor, company_name + "_selected")
+    if sel_cols:
+        legacy = sql.Identifier(company_name + "_selected")
+        # legacy tables stored the psycopg2 list adaptation ('{a,b}') in a TEXT column
+        if sel_cols.get("skills") == "text":
+            # composed into the INSERT below as-is: single braces, '%%' since it takes parameters
+            skills = sql.SQL("(CASE WHEN l.skills LIKE '{%%}' THEN l.skills::TEXT[] "
+                             "ELSE string_to_array(l.skills, ',') END)")
+        else:
+            skills = sql.SQL("l.skills")
+        if "skill_keys" in sel_cols:
+            keys = sql.SQL("l.skill_keys")
+        else:
+            keys = sql.SQL("ARRAY(SELECT DISTINCT lower(btrim(s)) FROM unnest({}) AS s WHERE btrim(s) <> '')"
+                           ).format(skills)
+        # one row per candidate (their latest); (company, email_key) identifies a row already copied
+        out["selected_legacy"] = _count(cursor, sql.SQL("SELECT count(DISTINCT btrim(lower(email))) FROM {}")
+                                        .format(legacy))
+        cursor.execute(sql.SQL("""
+            INSERT INTO {0} (company_id, name, email, phone_no, skills, skill_keys, file_name, file_data,
+                             email_key, phone_key)
+            SELECT %s, l.name, l.email, l.phone_no, {2}, {3}, l.file_name, l.file_data, l.email_key, l.phone_key
+            FROM (
+                SELECT DISTINCT ON (btrim(lower(email))) *, btrim(lower(email)) AS email_key,
+                       regexp_replace(phone_no, '[^0-9+]', '', 'g') AS phone_key
+                FROM {1} ORDER BY btrim(lower(email)), id DESC
+            ) AS l
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {0} AS s WHERE s.company_id = %s AND s.email_key = l.email_key
+            )
+            ORDER BY l.id;
+        """).format(sql.Identifier(SELECTED_TABLE), legacy, skills, keys), (cid, cid))
+        out["selected_copied"] = cursor.rowcount
+        out["selected_now"] = _count(cursor, sql.SQL("SELECT count(*) FROM {} WHERE company_id = %s").format(
+            sql.Identifier(SELECTED_TABLE)), (cid,))
+    return out
+
+def migrate(conn, companies: Optional[List[str]] = None, dry_run: bool = False,
+            drop_legacy: bool = False) -> int:
+    """Migrate every company (or the given ones); returns the number of failures."""
+    cursor = conn.cursor()
+    ensure_tenant_tables()
+    if not companies:
+        cursor.execute("SELECT DISTINCT company FROM users ORDER BY company")
+        companies = [r[0] for r in cursor.fetchall()]
+    failures = 0
+    for company in companies:
+        if company in _RESERVED:
+            logger.warning("Skipping company '%s': its name collides with a shared table.", company)
+            continue
+        try:
+            c = migrate_company(cursor, company)
+            short = c["jobs_now"] < c["jobs_legacy"] or c["selected_now"] < c["selected_legacy"]
+            logger.info("%s: jobs %d copied (%d/%d stored), selected %d copied (%d/%d stored)%s", company,
+                        c["jobs_copied"], c["jobs_now"], c["jobs_legacy"], c["selected_copied"],
+                        c["selected_now"], c["selected_legacy"], " - rows missing" if short else "")
+            if dry_run:
+                conn.rollback()
+                continue
+            if drop_legacy and not short:
+                for table in (company, company + "_selected"):
+                    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+                logger.info("%s: legacy tables dropped", company)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            failures += 1
+            logger.error("Migration of '%s' failed: %s", company, e)
+    cursor.close()
+    return failures
+
+
+def dedup_selected(conn, dry_run: bool = False) -> Dict[str, int]:
+    """Merge duplicate candidates of selected_candidates and add the unique identity index."""
+    table = sql.Identifier(SELECTED_TABLE)
+    # rows of (company, email_key) that occur more than once, merged into the newest
+    dup = sql.SQL("""
+        SELECT company_id, email_key, max(id) AS keep_id, min(selected_at) AS first_at, sum(submissions) AS n
+        FROM {} GROUP BY company_id, email_key HAVING count(*) > 1
+    """).format(table)
+    cursor = conn.cursor()
+    try:
+        ensure_tenant_tables()
+        cursor.execute(sql.SQL("""
+            UPDATE {} SET email_key = btrim(lower(email)), phone_key = regexp_replace(phone_no, '[^0-9+]', '', 'g')
+            WHERE email_key = '';
+        """).format(table))
+        out = {"backfilled": cursor.rowcount}
+        merged = []
+        for col in ("skills", "skill_keys"):
+            merged.append(sql.SQL("""{0} = ARRAY(
+                SELECT s FROM {1} AS x, unnest(x.{0}) WITH ORDINALITY AS u(s, i)
+                WHERE x.company_id = dup.company_id AND x.email_key = dup.email_key
+                GROUP BY s ORDER BY min(x.id), min(u.i))""").format(sql.Identifier(col), table))
+        cursor.execute(sql.SQL("""
+            UPDATE {0} AS t SET {1}, selected_at = dup.first_at, submissions = dup.n, updated_at = now()
+            FROM ({2}) AS dup WHERE t.id = dup.keep_id;
+        """).format(table, sql.SQL(", ").join(merged), dup))
+        out["candidates_merged"] = cursor.rowcount
+        cursor.execute(sql.SQL("""
+            DELETE FROM {0} AS t USING ({1}) AS dup
+            WHERE t.company_id = dup.company_id AND t.email_key = dup.email_key AND t.id <> dup.keep_id;
+        """).format(table, dup))
+        out["rows_removed"] = cursor.rowcount
+        create_identity_index(cursor)
+        logger.info("%d rows keyed, %d candidates merged, %d duplicate rows removed%s", out["backfilled"],
+                    out["candidates_merged"], out["rows_removed"], " (dry run)" if dry_run else "")
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+        return out
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def partition_company(conn, company_name: str) -> None:
+    """Move one company's rows from the default partitions into dedicated ones."""
+    cursor = conn.cursor()
+    try:
+        cid = company_id(cursor, company_name, create=False)
+        if cid is None:
+            raise ValueError(f"unknown company: {company_name!r}")
+        for table in (JOBS_TABLE, SELECTED_TABLE):
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", (table,))
+            if cursor.fetchone() is None:
+                raise ValueError(f"'{table}' is not partitioned (create it with TENANT_PARTITIONED=1)")
+            part = sql.Identifier(f"{table}_c{cid}")
+            default = sql.Identifier(table + "_default")
+            # a new partition cannot be attached while the default one still holds its rows
+            cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+                part, sql.Identifier(table)))
+            cursor.execute(sql.SQL("INSERT INTO {} SELECT * FROM {} WHERE company_id = %s").format(part, default),
+                           (cid,))
+            moved = cursor.rowcount
+            cursor.execute(sql.SQL("DELETE FROM {} WHERE company_id = %s").format(default), (cid,))
+            cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES IN (%s)").format(
+                sql.Identifier(table), part), (cid,))
+            logger.info("%s: %d rows moved to %s_c%d", company_name, moved, table, cid)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    from extract_details import _get_db_connection
+
+    ap = argparse.ArgumentParser(description="Move per-company tables into the shared tenant tables.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate")
+    m.add_argument("--company", action="append", help="only this company (repeatable)")
+    m.add_argument("--dry-run", action="store_true", help="copy and count, then roll back")
+    m.add_argument("--drop-legacy", action="store_true", help="drop the per-company tables once copied")
+    p = sub.add_parser("partition")
+    p.add_argument("company")
+    d = sub.add_parser("dedup")
+    d.add_argument("--dry-run", action="store_true", help="merge and count, then roll back")
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    connection = _get_db_connection()
+    try:
+        if a.command == "migrate":
+            sys.exit(1 if migrate(connection, a.company, a.dry_run, a.drop_legacy) else 0)
+        if a.command == "dedup":
+            dedup_selected(connection, a.dry_run)
+        else:
+            partition_company(connection, a.company)
+    finally:
+        connection.close()
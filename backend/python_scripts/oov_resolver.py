@@ -0,0 +1,130 @@
+# oov_resolver.py
+"""
+Nearest-canonical lookup for out-of-vocabulary skill tokens.
+- The vocabulary is every canonical engine / family name of a SkillMatcher,
+  plus alias spellings pointing at them
+- Fuzzy candidates come from a character-trigram inverted index and are
+  verified with the same SequenceMatcher ratio the matcher's fuzzy stage uses
+- Semantic candidates (optional) are a brute-force NumPy top-k over the
+  precomputed, L2-normalized embeddings of the vocabulary
+- Resolutions are memoized per resolver (LRU), so each unknown token is looked
+  up once; a config reload builds a new resolver and starts a fresh cache
+
+Config (skills_config.json, all optional):
+    "oov": {"enabled": true, "cache_size": 50000, "fuzzy_candidates": 8,
+            "semantic": true, "semantic_cosine": 0.85}
+"""
+
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+Resolution = Tuple[str, str, float]   # (canonical, "fuzzy" | "semantic", score)
+
+
+def trigrams(s: str) -> List[str]:
+    padded = f"  {s} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class OOVResolver:
+    def __init__(self, surfaces: Dict[str, str], fuzzy_ratio: float = 0.85, fuzzy_candidates: int = 8,
+                 encode: Optional[Callable[[List[str]], np.ndarray]] = None, semantic_cosine: float = 0.85,
+                 cache_size: int = 50000, skip: Iterable[str] = ()):
+        """
+        surfaces: normalized spelling -> canonical it stands for (canonicals map to themselves).
+        encode:   list of strings -> (n, d) float array; enables semantic candidates when given.
+        """
+        self.surface_list: List[str] = list(surfaces)
+        self.surface_canon: List[str] = [surfaces[s] for s in self.surface_list]
+        self.fuzzy_ratio = fuzzy_ratio
+        self.fuzzy_candidates = fuzzy_candidates
+        self.semantic_cosine = semantic_cosine
+        self.skip = set(skip)
+        self._encode = encode
+        self._emb: Optional[np.ndarray] = None
+        self._emb_canon: List[str] = []
+        self._prepare_lock = threading.Lock()
+
+        # trigram -> surface ids (a surface is listed once per distinct trigram)
+        self._index: Dict[str, List[int]] = {}
+        self._sizes: List[int] = []
+        for i, s in enumerate(self.surface_list):
+            grams = set(trigrams(s))
+            self._sizes.append(len(grams))
+            for g in grams:
+                self._index.setdefault(g, []).append(i)
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    # ---------------------------
+    # semantic table
+    # ---------------------------
+    def prepare(self) -> "OOVResolver":
+        """Embed the canonical vocabulary once (no-op without an encoder)."""
+        if self._encode is not None and self._emb is None:
+            with self._prepare_lock:
+                if self._emb is None:
+                    canon = sorted(set(self.surface_canon))
+                    emb = np.asarray(self._encode(canon), dtype=np.float32)
+                    emb /= np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+                    # _emb last: readers check it without the lock
+                    self._emb_canon, self._emb = canon, emb
+        return self
+
+    # ---------------------------
+    # lookups
+    # ---------------------------
+    def fuzzy_nearest(self, tok: str, k: int = 1) -> List[Tuple[str, float]]:
+        """Best (canonical, ratio) pairs among the surfaces sharing the most trigrams with tok."""
+        grams = set(trigrams(tok))
+        shared = Counter()
+        for g in grams:
+            for i in self._index.get(g, ()):
+                shared[i] += 1
+        if not shared:
+            return []
+        # rank by Dice coefficient, verify only the top few with SequenceMatcher
+        n = len(grams)
+        ranked = sorted(shared, key=lambda i: -2.0 * shared[i] / (n + self._sizes[i]))[:self.fuzzy_candidates]
+        best: Dict[str, float] = {}
+        for i in ranked:
+            sm = SequenceMatcher(None, tok, self.surface_list[i])
+            if sm.real_quick_ratio() < self.fuzzy_ratio or sm.quick_ratio() < self.fuzzy_ratio:
+                continue
+            r = sm.ratio()
+            canon = self.surface_canon[i]
+            if r > best.get(canon, 0.0):
+                best[canon] = r
+        return sorted(best.items(), key=lambda x: -x[1])[:k]
+
+    def semantic_nearest(self, tok: str, k: int = 1) -> List[Tuple[str, float]]:
+        """Top-k (canonical, cosine) by brute force over the vocabulary embeddings."""
+        if self._encode is None:
+            return []
+        self.prepare()
+        q = np.asarray(self._encode([tok]), dtype=np.float32)[0]
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        sims = self._emb @ q
+        k = min(k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self._emb_canon[i], float(sims[i])) for i in top]
+
+    def _resolve(self, tok: str) -> Optional[Resolution]:
+        if not tok or tok in self.skip:
+            return None
+        fz = self.fuzzy_nearest(tok)
+        if fz and fz[0][1] >= self.fuzzy_ratio:
+            return (fz[0][0], "fuzzy", fz[0][1])
+        sem = self.semantic_nearest(tok)
+        if sem and sem[0][1] >= self.semantic_cosine:
+            return (sem[0][0], "semantic", sem[0][1])
+        return None
+
+    def cache_info(self):
+        return self.resolve.cache_info()
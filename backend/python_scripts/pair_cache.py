@@ -0,0 +1,214 @@
+# pair_cache.py
+"""
+Two-tier cache of skill pair scores (fuzzy ratios, semantic cosines).
+- Skill tokens are heavy-tailed: the same ("reactjs", "react") pairs come up in
+  almost every resume, so their scores are computed once and looked up after
+- Keys are (method, scorer, a, b). The scorer identifies what produced the
+  score, not the skills config: "difflib" for fuzzy ratios, the embedding
+  backend / model for cosines. Editing aliases or thresholds therefore keeps
+  the cache; switching models starts a fresh key space
+- Tier 1: an in-process LRU (one per process, shared by every matcher and
+  thread). Tier 2 (optional): a SQLite file in WAL mode shared by every worker
+  process on the host; new scores are written behind in batches
+- Lookups are batched: one LRU pass, then one SQLite query for the misses
+
+Config (skills_config.json, all optional):
+    "pair_cache": {"enabled": true, "lru_size": 200000, "path": "/tmp/resumexpert-pairs.sqlite3",
+                   "flush_every": 512}
+    PAIR_CACHE_PATH (env) overrides "path"; an empty path keeps the cache in-process only
+"""
+
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+# SQLite's default limit on host parameters is 999
+_CHUNK = 400
+
+
+def cache_options(cfg: Dict) -> Optional[Dict]:
+    """get_pair_cache() keyword arguments from the "pair_cache" config section (None when disabled)."""
+    if not cfg.get("enabled", False):
+        return None
+    return {
+        "lru_size": int(cfg.get("lru_size", 200000)),
+        "path": os.getenv("PAIR_CACHE_PATH", cfg.get("path", "")) or None,
+        "flush_every": int(cfg.get("flush_every", 512)),
+    }
+
+
+class PairScoreCache:
+    def __init__(self, lru_size: int = 200000, path: Optional[str] = None, flush_every: int = 512):
+        self.lru_size = lru_size
+        self.path = path
+        self.flush_every = flush_every
+        self._lru: "OrderedDict[Tuple[str, str, str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # scores computed here and not yet written to the shared tier
+        self._pending: List[Tuple[str, str, str, float]] = []
+        self._local = threading.local()
+        self._shared_ok = path is not None
+        self.lru_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.written = 0
+        self.by_method: Dict[str, Dict[str, int]] = {}
+
+    # ---------------------------
+    # shared tier
+    # ---------------------------
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if not self._shared_ok:
+            return None
+        db = getattr(self._local, "db", None)
+        if db is not None and self._local.pid == os.getpid():
+            return db
+        # one connection per thread; a forked child opens its own
+        try:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS pair_scores (method TEXT NOT NULL, scorer TEXT NOT NULL, "
+                       "k TEXT NOT NULL, score REAL NOT NULL, PRIMARY KEY (method, scorer, k)) WITHOUT ROWID")
+        except sqlite3.Error as e:
+            logger.warning("Pair score cache %s unavailable, keeping scores in-process only: %s", self.path, e)
+            self._shared_ok = False
+            return None
+        self._local.db = db
+        self._local.pid = os.getpid()
+        return db
+
+    @staticmethod
+    def _key(a: str, b: str) -> str:
+        return f"{a}\x1f{b}"
+
+    def _shared_get(self, method: str, scorer: str, pairs: List[Pair]) -> Dict[Pair, float]:
+        db = self._db()
+        if db is None:
+            return {}
+        keys = {self._key(a, b): (a, b) for a, b in pairs}
+        klist = list(keys)
+        out = {}
+        try:
+            for i in range(0, len(klist), _CHUNK):
+                chunk = klist[i:i + _CHUNK]
+                rows = db.execute(
+                    f"SELECT k, score FROM pair_scores WHERE method = ? AND scorer = ? "
+                    f"AND k IN ({','.join('?' * len(chunk))})", [method, scorer] + chunk).fetchall()
+                for k, score in rows:
+                    out[keys[k]] = score
+        except sqlite3.Error as e:
+            logger.warning("Pair score cache lookup failed: %s", e)
+        return out
+
+    def flush(self) -> None:
+        """Write pending scores to the shared tier (existing rows win)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        db = self._db()
+        if db is None:
+            return
+        try:
+            db.execute("BEGIN")
+            db.executemany("INSERT OR IGNORE INTO pair_scores (method, scorer, k, score) VALUES (?, ?, ?, ?)",
+                           pending)
+            db.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning("Pair score cache write of %d scores failed: %s", len(pending), e)
+            try:
+                db.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return
+        with self._lock:
+            self.written += len(pending)
+
+    # ---------------------------
+    # lookups
+    # ---------------------------
+    def get_many(self, method: str, scorer: str, pairs: Iterable[Pair]) -> Dict[Pair, float]:
+        """Cached scores of the given (a, b) pairs; pairs missing from both tiers are left out."""
+        pairs = list(dict.fromkeys(pairs))
+        out: Dict[Pair, float] = {}
+        missing = []
+        with self._lock:
+            lru = self._lru
+            for p in pairs:
+                key = (method, scorer, p[0], p[1])
+                score = lru.get(key)
+                if score is None:
+                    missing.append(p)
+                else:
+                    lru.move_to_end(key)
+                    out[p] = score
+        lru_hits = len(out)
+        shared = self._shared_get(method, scorer, missing) if missing else {}
+        with self._lock:
+            for (a, b), score in shared.items():
+                self._lru_put((method, scorer, a, b), score)
+            out.update(shared)
+            m = self.by_method.setdefault(method, {"lru_hits": 0, "shared_hits": 0, "misses": 0})
+            m["lru_hits"] += lru_hits
+            m["shared_hits"] += len(shared)
+            m["misses"] += len(missing) - len(shared)
+            self.lru_hits += lru_hits
+            self.shared_hits += len(shared)
+            self.misses += len(missing) - len(shared)
+        return out
+
+    def _lru_put(self, key: Tuple[str, str, str, str], score: float) -> None:
+        self._lru[key] = score
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def put_many(self, method: str, scorer: str, scores: Dict[Pair, float]) -> None:
+        if not scores:
+            return
+        with self._lock:
+            for (a, b), score in scores.items():
+                self._lru_put((method, scorer, a, b), float(score))
+            if self._shared_ok:
+                self._pending.extend((method, scorer, self._key(a, b), float(s)) for (a, b), s in scores.items())
+            flush = len(self._pending) >= self.flush_every
+        if flush:
+            self.flush()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.lru_hits + self.shared_hits + self.misses
+            return {"lru_entries": len(self._lru), "lru_size": self.lru_size, "path": self.path,
+                    "shared": self._shared_ok, "lru_hits": self.lru_hits, "shared_hits": self.shared_hits,
+                    "misses": self.misses, "written": self.written, "pending": len(self._pending),
+                    "hit_rate": (self.lru_hits + self.shared_hits) / lookups if lookups else 0.0,
+                    "by_method": {k: dict(v) for k, v in self.by_method.items()}}
+
+
+_CACHES: Dict[Tuple, PairScoreCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+def get_pair_cache(lru_size: int = 200000, path: Optional[str] = None, flush_every: int = 512) -> PairScoreCache:
+    """Process-wide cache for these options, so a rebuilt matcher keeps the scores seen so far."""
+    key = (lru_size, path, flush_every)
+    cache = _CACHES.get(key)
+    if cache is None:
+        with _CACHES_LOCK:
+            cache = _CACHES.get(key)
+            if cache is None:
+                cache = _CACHES[key] = PairScoreCache(lru_size, path, flush_every)
+                atexit.register(cache.flush)
+    return cache
+
+def flush_pair_caches() -> None:
+    """Write every cache's pending scores (for processes that leave through os._exit)."""
+    for cache in list(_CACHES.values()):
+        cache.flush()
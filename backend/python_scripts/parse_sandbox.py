@@ -0,0 +1,285 @@
+# parse_sandbox.py
+"""
+Resume parsing in recyclable worker subprocesses.
+- pdfplumber / python-docx run in a small pool of `python parse_sandbox.py worker`
+  processes that only import text_extraction, so a malformed or huge document
+  can hang or bloat a worker but never a screening thread
+- Per file: a wall-clock timeout (PARSE_TIMEOUT) and a resident-memory ceiling
+  (PARSE_MAX_RSS_MB, read from /proc while waiting); a worker that trips either
+  is killed and replaced on next use
+- A worker is retired after PARSE_MAX_TASKS files, so slow leaks in the parsers
+  are reclaimed too
+- Failures raise ParseTimeout / ParseMemoryExceeded / ParseCrashed; their
+  `reject_reason` ("parse_timeout", "parse_memory", "parse_crashed") is what the
+  screening pipeline records
+
+Wire format (stdin / stdout of the worker): 4-byte big-endian length + JSON.
+
+Config (env):
+    PARSE_SANDBOX       "0" parses in-process instead (default "1")
+    PARSE_WORKERS       worker processes (default 4)
+    PARSE_TIMEOUT       seconds per file (default 20)
+    PARSE_MAX_RSS_MB    worker RSS ceiling in MB, 0 disables (default 1024)
+    PARSE_MAX_TASKS     files per worker before it is recycled (default 200)
+
+Usage:
+    from parse_sandbox import extract_text, ParseError
+    text = extract_text("resume.pdf", max_chars=3000)
+"""
+
+import json
+import logging
+import os
+import queue
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PARSE_SANDBOX = os.getenv("PARSE_SANDBOX", "1") == "1"
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 4))
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", 20))
+PARSE_MAX_RSS_MB = float(os.getenv("PARSE_MAX_RSS_MB", 1024))
+PARSE_MAX_TASKS = int(os.getenv("PARSE_MAX_TASKS", 200))
+
+# how often a waiting caller re-checks the deadline and the worker's RSS
+POLL_S = 0.05
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0) if hasattr(os, "sysconf") else 0.0
+
+
+class ParseError(Exception):
+    reject_reason = "parse_error"
+
+class ParseTimeout(ParseError):
+    reject_reason = "parse_timeout"
+
+class ParseMemoryExceeded(ParseError):
+    reject_reason = "parse_memory"
+
+class ParseCrashed(ParseError):
+    reject_reason = "parse_crashed"
+
+
+def _frame(obj: Dict) -> bytes:
+    data = json.dumps(obj).encode("utf-8")
+    return struct.pack(">I", len(data)) + data
+
+def _read_exact(fh, n: int) -> Optional[bytes]:
+    buf = b""
+    while len(buf) < n:
+        chunk = fh.read(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+# ---------------------------
+# worker process
+# ---------------------------
+def _worker_main() -> None:
+    # keep the protocol on a private fd; anything a parser prints goes to stderr
+    out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    from text_extraction import extract_text_from_file
+
+    inp = sys.stdin.buffer
+    while True:
+        head = _read_exact(inp, 4)
+        if head is None:
+            return
+        req = json.loads(_read_exact(inp, struct.unpack(">I", head)[0]) or b"{}")
+        if not req:
+            return
+        out.write(_frame({"text": extract_text_from_file(req["path"], req.get("max_chars"))}))
+        out.flush()
+
+
+# ---------------------------
+# parent side
+# ---------------------------
+class _Worker:
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "worker"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0,
+        )
+        self.tasks = 0
+
+    def rss_mb(self) -> float:
+        try:
+            with open(f"/proc/{self.proc.pid}/statm", "rb") as fh:
+                return int(fh.read().split()[1]) * _PAGE_MB
+        except (OSError, ValueError, IndexError):
+            return 0.0
+
+    def kill(self) -> None:
+        try:
+            self.proc.kill()
+        except OSError:
+            pass
+        self.proc.wait()
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+
+    def retire(self) -> None:
+        # an empty request ends the worker's loop; kill it if it does not go quietly
+        try:
+            self.proc.stdin.write(_frame({}))
+            self.proc.stdin.close()
+            self.proc.wait(timeout=2)
+            self.proc.stdout.close()
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class ParserPool:
+    def __init__(self, workers: int = PARSE_WORKERS, timeout: float = PARSE_TIMEOUT,
+                 max_rss_mb: float = PARSE_MAX_RSS_MB, max_tasks: int = PARSE_MAX_TASKS):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_rss_mb = max_rss_mb
+        self.max_tasks = max_tasks
+        # one slot per worker; None means "start one when needed"
+        self._slots: "queue.LifoQueue[Optional[_Worker]]" = queue.LifoQueue()
+        for _ in range(workers):
+            self._slots.put(None)
+        self._lock = threading.Lock()
+        self._live: Dict[int, _Worker] = {}     # pid -> running worker, busy or idle
+        self.tasks = 0
+        self.timeouts = 0
+        self.memory_kills = 0
+        self.crashes = 0
+        self.recycled = 0
+        self.started = 0
+        self.parse_s = 0.0
+        self.peak_rss_mb = 0.0
+
+    def _count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def extract_text(self, path: str, max_chars: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """Text of a PDF / DOCX parsed in a worker; raises a ParseError subclass when it has to be killed."""
+        w = self._slots.get()
+        try:
+            if w is None or w.proc.poll() is not None:
+                if w is not None:
+                    self._forget(w)
+                w = _Worker()
+                with self._lock:
+                    self._live[w.proc.pid] = w
+                self._count("started")
+            t0 = time.monotonic()
+            try:
+                w.proc.stdin.write(_frame({"path": os.path.abspath(path), "max_chars": max_chars}))
+                text = self._wait(w, path, t0 + (self.timeout if timeout is None else timeout))
+            except BaseException:
+                w.kill()
+                self._forget(w)
+                w = None
+                raise
+            w.tasks += 1
+            self._count("tasks")
+            self._count("parse_s", time.monotonic() - t0)
+            if w.tasks >= self.max_tasks:
+                w.retire()
+                self._forget(w)
+                w = None
+                self._count("recycled")
+            return text
+        finally:
+            self._slots.put(w)
+
+    def _wait(self, w: _Worker, path: str, deadline: float) -> str:
+        fd = w.proc.stdout.fileno()
+        buf = bytearray()
+        while True:
+            ready, _, _ = select.select([fd], [], [], POLL_S)
+            if ready:
+                chunk = os.read(fd, 1 << 16)
+                if not chunk:
+                    self._count("crashes")
+                    logger.warning("Parser worker died on %s (exit %s)", path, w.proc.wait())
+                    raise ParseCrashed(f"parser worker died on {path}")
+                buf += chunk
+                if len(buf) >= 4:
+                    n = struct.unpack(">I", buf[:4])[0]
+                    if len(buf) >= 4 + n:
+                        return json.loads(buf[4:4 + n])["text"]
+            if time.monotonic() > deadline:
+                self._count("timeouts")
+                logger.warning("Parsing %s timed out; killing worker %d", path, w.proc.pid)
+                raise ParseTimeout(f"parsing {path} did not finish in time")
+            if self.max_rss_mb:
+                rss = w.rss_mb()
+                if rss > self.peak_rss_mb:
+                    self.peak_rss_mb = rss
+                if rss > self.max_rss_mb:
+                    self._count("memory_kills")
+                    logger.warning("Parsing %s reached %.0f MB RSS; killing worker %d", path, rss, w.proc.pid)
+                    raise ParseMemoryExceeded(f"parsing {path} exceeded {self.max_rss_mb:.0f} MB")
+
+    def close(self) -> None:
+        """Stop idle workers (busy ones are stopped when their caller returns them)."""
+        for _ in range(self.workers):
+            try:
+                w = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            if w is not None:
+                w.retire()
+                self._forget(w)
+            self._slots.put(None)
+
+    def _forget(self, w: _Worker) -> None:
+        with self._lock:
+            self._live.pop(w.proc.pid, None)
+
+    def worker_pids(self) -> List[int]:
+        """Pids of the running workers (for callers accounting their CPU / memory)."""
+        with self._lock:
+            return list(self._live)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"workers": self.workers, "tasks": self.tasks, "timeouts": self.timeouts,
+                    "memory_kills": self.memory_kills, "crashes": self.crashes, "recycled": self.recycled,
+                    "started": self.started, "parse_ms_mean": self.parse_s / self.tasks * 1000.0 if self.tasks else 0.0,
+                    "peak_rss_mb": self.peak_rss_mb, "timeout_s": self.timeout, "max_rss_mb": self.max_rss_mb,
+                    "max_tasks": self.max_tasks}
+
+
+_POOL: Optional[ParserPool] = None
+_POOL_LOCK = threading.Lock()
+
+def get_parser_pool() -> ParserPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ParserPool()
+    return _POOL
+
+def reset_parser_pool(workers: Optional[int] = None) -> None:
+    """Forget this process's pool (a forked child must not share the parent's workers), optionally resized."""
+    global _POOL
+    with _POOL_LOCK:
+        _POOL = ParserPool(workers=workers) if workers else None
+
+def extract_text(path: str, max_chars: Optional[int] = None) -> str:
+    """Sandboxed text extraction (in-process when PARSE_SANDBOX=0)."""
+    if not PARSE_SANDBOX:
+        from text_extraction import extract_text_from_file
+        return extract_text_from_file(path, max_chars)
+    return get_parser_pool().extract_text(path, max_chars)
+
+
+if __name__ == "__main__" and sys.argv[1:] == ["worker"]:
+    _worker_main()
@@ -0,0 +1,336 @@
+# rematch.py
+"""
+Incremental re-matching after a skills_config.json vocabulary change.
+- The config last applied to the stored resumes is kept in vocabulary_snapshots:
+  a run over every company records one snapshot for all, a --company run one
+  per company it covered, so companies it skipped still diff against the
+  config they were last matched with
+- diff_configs() lists the aliases and families that changed and turns them into
+  index keys: the alias itself and its old/new targets, the family, its
+  added/removed engines and the aliases pointing at it. Keys are widened by the
+  stored keys within fuzzy distance of a changed one
+- Only resumes whose resume_features.index_keys overlap those keys are read
+  (GIN lookup) and re-matched against the company's current jobs, in batches,
+  from their stored tokens (no PDF/DOCX re-parsing); newly qualifying ones are
+  selected, and their canonical tokens / index keys are refreshed
+- Changes to thresholds, OOV, the semantic gate or the semantic model can move
+  any resume, so they re-match the whole corpus; so does --full
+
+Semantic neighbours of a changed key are not tracked; run with --full after an
+edit that relies on semantic matching to reach other resumes.
+
+Usage:
+    python rematch.py [--company Acme ...] [--since old_config.json] [--dry-run] [--full]
+    # or POST /rematch on email_api
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set
+
+from psycopg2 import sql
+
+from skill_matcher import SkillMatcher
+from tenant_store import list_jobs, selected_emails
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOTS_TABLE = "vocabulary_snapshots"
+
+# config sections that change outcomes without naming a token
+_GLOBAL_SECTIONS = ("thresholds", "oov", "stop_tokens", "semantic_gate")
+# semantic settings that only affect how embeddings are served, not what they are
+_SERVING_KEYS = {"service", "socket_path", "max_batch", "max_wait_ms", "batch_size", "threads"}
+
+_SNAPSHOTS_READY = False
+_SNAPSHOTS_LOCK = threading.Lock()
+
+def ensure_snapshots_table():
+    """Create the table (once per process, committed on a connection of its own)."""
+    global _SNAPSHOTS_READY
+    if _SNAPSHOTS_READY:
+        return
+    from extract_details import _get_db_connection
+
+    with _SNAPSHOTS_LOCK:
+        if _SNAPSHOTS_READY:
+            return
+        conn = _get_db_connection()
+        try:
+            cursor = conn.cursor()
+            _create_snapshots_table(cursor)
+            cursor.close()
+            conn.commit()
+        finally:
+            conn.close()
+        _SNAPSHOTS_READY = True
+
+def _create_snapshots_table(cursor):
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            id SERIAL PRIMARY KEY,
+            config_version VARCHAR(12) NOT NULL,
+            config TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """).format(sql.Identifier(SNAPSHOTS_TABLE)))
+    # NULL: applied to every company; tables created before per-company snapshots lack the column
+    cursor.execute(sql.SQL("ALTER TABLE {} ADD COLUMN IF NOT EXISTS company VARCHAR(255);").format(
+        sql.Identifier(SNAPSHOTS_TABLE)))
+
+def _snapshot_row(cursor, company: Optional[str]) -> Optional[tuple]:
+    ensure_snapshots_table()
+    cursor.execute(sql.SQL("SELECT id, config FROM {} WHERE company IS NULL OR company = %s "
+                           "ORDER BY id DESC LIMIT 1").format(sql.Identifier(SNAPSHOTS_TABLE)), (company,))
+    return cursor.fetchone()
+
+def last_snapshot(cursor, company: Optional[str] = None) -> Optional[Dict]:
+    """The config a company's stored resumes (all, by default) were last matched with (None before the first run)."""
+    row = _snapshot_row(cursor, company)
+    return json.loads(row[1]) if row else None
+
+def record_snapshot(cursor, config_version: str, cfg: Dict, company: Optional[str] = None) -> None:
+    ensure_snapshots_table()
+    cursor.execute(sql.SQL("INSERT INTO {} (config_version, config, company) VALUES (%s, %s, %s)").format(
+        sql.Identifier(SNAPSHOTS_TABLE)), (config_version, json.dumps(cfg, sort_keys=True), company))
+
+
+# ---------------------------
+# config diff
+# ---------------------------
+class VocabularyDiff:
+    def __init__(self):
+        self.aliases: Dict[str, tuple] = {}      # alias -> (old target, new target); None = absent
+        self.families: Dict[str, tuple] = {}     # family -> (old engines, new engines)
+        self.global_changes: List[str] = []      # sections that affect every resume
+        self.keys: Set[str] = set()
+
+    @property
+    def full(self) -> bool:
+        return bool(self.global_changes)
+
+    def __bool__(self) -> bool:
+        return bool(self.aliases or self.families or self.global_changes)
+
+    def as_dict(self) -> Dict:
+        return {"aliases": {a: list(v) for a, v in sorted(self.aliases.items())},
+                "families": {f: [sorted(v[0]), sorted(v[1])] for f, v in sorted(self.families.items())},
+                "global_changes": self.global_changes, "keys": sorted(self.keys)}
+
+
+def _lower_aliases(cfg: Dict) -> Dict[str, str]:
+    return {k.lower(): v.lower() for k, v in cfg.get("aliases", {}).items()}
+
+def _lower_families(cfg: Dict) -> Dict[str, Set[str]]:
+    return {k.lower(): {x.lower() for x in v} for k, v in cfg.get("families", {}).items()}
+
+def _semantic_outcome(cfg: Dict) -> Dict:
+    return {k: v for k, v in cfg.get("semantic", {}).items() if k not in _SERVING_KEYS}
+
+def diff_configs(old: Dict, new: Dict) -> VocabularyDiff:
+    """Which aliases / families changed between two skills configs, and the index keys they touch."""
+    d = VocabularyDiff()
+    old_a, new_a = _lower_aliases(old), _lower_aliases(new)
+    for alias in set(old_a) | set(new_a):
+        if old_a.get(alias) != new_a.get(alias):
+            d.aliases[alias] = (old_a.get(alias), new_a.get(alias))
+            # resumes spelling the alias, and those holding either target (JDs that use the alias move)
+            d.keys.update(k for k in (alias, old_a.get(alias), new_a.get(alias)) if k)
+
+    old_f, new_f = _lower_families(old), _lower_families(new)
+    for fam in set(old_f) | set(new_f):
+        before, after = old_f.get(fam, set()), new_f.get(fam, set())
+        if before != after:
+            d.families[fam] = (before, after)
+            d.keys.add(fam)
+            d.keys.update(before ^ after)
+            d.keys.update(a for a, t in list(old_a.items()) + list(new_a.items()) if t == fam)
+
+    for section in _GLOBAL_SECTIONS:
+        if old.get(section) != new.get(section):
+            d.global_changes.append(section)
+    if _semantic_outcome(old) != _semantic_outcome(new):
+        d.global_changes.append("semantic")
+    # index keys hold config values as written and tokens in surface form; look both up
+    d.keys = {f for k in d.keys for f in (k, SkillMatcher.surface_form(k)) if f}
+    return d
+
+def fuzzy_neighbours(keys: Iterable[str], stored: Iterable[str], ratio: float) -> Set[str]:
+    """Stored index keys within fuzzy-match distance of a changed key (they can flip too)."""
+    keys = list(keys)
+    out = set()
+    for s in stored:
+        if s in out:
+            continue
+        for k in keys:
+            sm = SequenceMatcher(None, k, s)
+            if sm.real_quick_ratio() >= ratio and sm.quick_ratio() >= ratio and sm.ratio() >= ratio:
+                out.add(s)
+                break
+    return out
+
+
+# ---------------------------
+# re-matching
+# ---------------------------
+def _best_job(matcher: SkillMatcher, tokens: List[str], jobs: List[tuple]) -> Optional[tuple]:
+    """(job_title, matched JD skills) of the job matching most skills, like the screening pipeline."""
+    best, best_count = None, 0
+    for job_title, jd_raw in jobs:
+        matches = matcher.match_resume_to_jd(tokens, jd_raw)
+        matched = [jd for jd, info in matches.items() if info[0]]
+        if len(matched) > best_count:
+            best, best_count = (job_title, matched), len(matched)
+    return best
+
+def rematch_company(conn, write_conn, matcher: SkillMatcher, company_name: str, keys: Optional[Set[str]],
+                    batch_size: int = 500, dry_run: bool = False) -> Dict:
+    """Re-match one company's affected resumes (all when keys is None); commits per batch."""
+    from resume_features import company_index_keys, iter_features, update_index
+    from saving import store_files_in_db
+
+    stats = {"scanned": 0, "matched": 0, "inserted": 0, "skipped_existing": 0, "no_longer_matching": 0,
+             "no_name": 0, "store_failed": 0}
+    cursor = write_conn.cursor()
+    try:
+        jobs = [(title, [s.strip() for s in (jd or "").split(",") if s.strip()])
+                for title, jd in list_jobs(cursor, company_name)]
+        already = selected_emails(cursor, company_name)
+        if keys is not None:
+            keys = keys | fuzzy_neighbours(keys, company_index_keys(cursor, company_name), matcher.fuzzy_ratio)
+            if not keys:
+                return stats
+        write_conn.commit()
+        for rows in iter_features(conn, company_name, batch_size, keys=None if keys is None else sorted(keys)):
+            refreshed = []
+            for fid, file_name, file_path, name, email, phone, raw_tokens in rows:
+                tokens = list(raw_tokens or [])
+                stats["scanned"] += 1
+                refreshed.append((fid, matcher.canonicalize_list(tokens), matcher.index_keys(tokens)))
+                best = _best_job(matcher, tokens, jobs)
+                if best is None:
+                    if email.lower() in already:
+                        stats["no_longer_matching"] += 1
+                    continue
+                stats["matched"] += 1
+                if email.lower() in already:
+                    stats["skipped_existing"] += 1
+                    continue
+                if not os.path.exists(file_path):
+                    logger.warning("Resume file '%s' is gone; cannot select it for '%s'.", file_path, best[0])
+                    continue
+                # the name stored with the features; no name is rejected like screening does
+                if not name:
+                    stats["no_name"] += 1
+                    logger.info("No stored name for '%s'; not selecting it.", file_name)
+                    continue
+                if not dry_run and not store_files_in_db(cursor, company_name, name, email, phone, best[1],
+                                                         file_name, file_path, matcher.canonicalize_list(best[1])):
+                    stats["store_failed"] += 1
+                    continue
+                stats["inserted"] += 1
+                already.add(email.lower())
+            if dry_run:
+                write_conn.rollback()
+            else:
+                update_index(cursor, refreshed)
+                write_conn.commit()
+    except Exception:
+        write_conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return stats
+
+def rematch_vocabulary(companies: Optional[List[str]] = None, since: Optional[Dict] = None,
+                       full: bool = False, batch_size: int = 500, dry_run: bool = False) -> Dict:
+    """
+    Re-match the resumes affected by the skills config change since each company's
+    last run (or since `since`) and record the current config as applied to the
+    companies covered (all of them when `companies` is not given).
+    """
+    from extract_details import _get_db_connection
+    from resume_features import feature_companies
+
+    t0 = time.perf_counter()
+    cfg_path = os.getenv("SKILLS_CONFIG", "skills_config.json")
+    with open(cfg_path, "r", encoding="utf-8") as fh:
+        new_cfg = json.load(fh)
+    matcher = SkillMatcher(cfg_path)
+
+    conn = _get_db_connection()
+    write_conn = _get_db_connection()
+    out: Dict = {"config_version": matcher.config_version, "companies": {}, "diffs": []}
+    partial = bool(companies)
+    try:
+        cursor = write_conn.cursor()
+        companies = companies or feature_companies(cursor)
+        # companies last matched with the same snapshot share one diff
+        groups: Dict[object, tuple] = {}
+        for company in companies:
+            row = None if since is not None else _snapshot_row(cursor, company)
+            key = "since" if since is not None else (row[0] if row else None)
+            old_cfg = since if since is not None else (json.loads(row[1]) if row else None)
+            groups.setdefault(key, (old_cfg, []))[1].append(company)
+        write_conn.commit()
+        cursor.close()
+        for old_cfg, members in groups.values():
+            if old_cfg is None and not full:
+                # nothing to diff against: the current config becomes the baseline
+                logger.info("No vocabulary snapshot yet for %d companies; recording config %s as the baseline.",
+                            len(members), matcher.config_version)
+                out["diffs"].append({"companies": members, "baseline": True})
+                continue
+            diff = diff_configs(old_cfg or {}, new_cfg)
+            out["diffs"].append(dict(diff.as_dict(), companies=members))
+            keys = None if (full or diff.full) else diff.keys
+            if keys is not None and not keys:
+                logger.info("Skills config %s changes no aliases or families for %d companies; nothing to re-match.",
+                            matcher.config_version, len(members))
+                continue
+            logger.info("Re-matching %s for %d companies (%s)", "all resumes" if keys is None
+                        else f"resumes with {len(keys)} changed keys", len(members),
+                        ", ".join(diff.global_changes) if diff.global_changes else "vocabulary change")
+            for company in members:
+                out["companies"][company] = rematch_company(conn, write_conn, matcher, company, keys,
+                                                            batch_size, dry_run)
+        if not dry_run:
+            cursor = write_conn.cursor()
+            # a partial run must not mark the companies it skipped as up to date
+            for company in (companies if partial else [None]):
+                record_snapshot(cursor, matcher.config_version, new_cfg, company)
+            write_conn.commit()
+            cursor.close()
+    finally:
+        write_conn.close()
+        conn.close()
+
+    out["seconds"] = time.perf_counter() - t0
+    totals = {k: sum(c[k] for c in out["companies"].values()) for k in ("scanned", "inserted", "no_longer_matching")}
+    out.update(totals)
+    logger.info("Re-matched %d resumes in %.1fs: %d newly selected, %d selected ones no longer match.",
+                totals["scanned"], out["seconds"], totals["inserted"], totals["no_longer_matching"])
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Re-match resumes affected by a skills_config.json change.")
+    ap.add_argument("--company", action="append", help="only this company (repeatable)")
+    ap.add_argument("--since", help="diff against this config file instead of the last applied snapshot")
+    ap.add_argument("--full", action="store_true", help="re-match every stored resume")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--dry-run", action="store_true", help="count, but store nothing")
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    since_cfg = None
+    if a.since:
+        with open(a.since, "r", encoding="utf-8") as fh:
+            since_cfg = json.load(fh)
+    result = rematch_vocabulary(a.company, since_cfg, a.full, a.batch_size, a.dry_run)
+    print(json.dumps({k: v for k, v in result.items() if k != "companies"}, indent=2, default=str))
@@ -0,0 +1,134 @@
+# rescreen.py
+"""
+Re-screen the existing candidate pool when a job is added.
+- Reads the persisted per-resume token records (resume_features) in batches
+- Matches them against the new JD in a process pool (no PDF/DOCX re-parsing)
+- Inserts newly qualifying candidates into selected_candidates
+
+Usage:
+    python rescreen.py MyCompany "Backend Engineer"
+    # or POST /rescreen {"company": ..., "job_title": ...} on email_api
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from skill_matcher import SkillMatcher
+from tenant_store import get_job_description, selected_emails
+
+logger = logging.getLogger(__name__)
+
+_WORKER_MATCHER = None
+
+def _init_worker(cfg_path: str):
+    global _WORKER_MATCHER
+    # one embedding model per worker process would not fit; fuzzy / alias matching only
+    _WORKER_MATCHER = SkillMatcher(cfg_path, use_semantic=False)
+
+def _match_batch(jd_raw: List[str], batch: List[Tuple[int, List[str]]]) -> List[Tuple[int, List[str]]]:
+    """Return (feature_id, matched_jd_skills) for every resume in the batch with at least one match."""
+    out = []
+    for fid, tokens in batch:
+        matches = _WORKER_MATCHER.match_resume_to_jd(tokens, jd_raw)
+        matched = [jd for jd, info in matches.items() if info[0]]
+        if matched:
+            out.append((fid, matched))
+    return out
+
+def rescreen_job(company_name: str, job_title: str, workers: Optional[int] = None,
+                 batch_size: int = 500, min_matched: int = 1) -> Dict:
+    """
+    Match every stored resume of `company_name` against job `job_title` and store
+    candidates matching at least `min_matched` JD skills that are not selected yet.
+    Returns counters: scanned, matched, inserted, seconds.
+    """
+    from extract_details import _get_db_connection
+    from resume_features import iter_features
+    from saving import store_files_in_db
+
+    t0 = time.perf_counter()
+    stats = {"scanned": 0, "matched": 0, "inserted": 0, "skipped_existing": 0, "no_name": 0,
+             "store_failed": 0}
+    conn = _get_db_connection()
+    write_conn = _get_db_connection()
+    cursor = write_conn.cursor()
+    try:
+        job_description = get_job_description(cursor, company_name, job_title)
+        if job_description is None:
+            logger.warning("Job '%s' not found for company: %s", job_title, company_name)
+            return stats
+        jd_raw = [s.strip() for s in job_description.split(",") if s.strip()]
+        already = selected_emails(cursor, company_name)
+        write_conn.commit()
+
+        cfg_path = os.getenv("SKILLS_CONFIG", "skills_config.json")
+        workers = workers or os.cpu_count() or 1
+        # only canonicalizes matched skills for the indexed skill_keys column
+        matcher = SkillMatcher(cfg_path, use_semantic=False)
+
+        def store(results, meta: Dict[int, Tuple]):
+            for fid, matched in results:
+                if len(matched) < min_matched:
+                    continue
+                stats["matched"] += 1
+                file_name, file_path, name, email, phone = meta[fid]
+                if email.lower() in already:
+                    stats["skipped_existing"] += 1
+                    continue
+                # the name stored with the features; no name is rejected like screening does
+                if not name:
+                    stats["no_name"] += 1
+                    logger.info("No stored name for '%s'; not selecting it.", file_name)
+                    continue
+                if not store_files_in_db(cursor, company_name, name, email, phone, matched, file_name, file_path,
+                                         matcher.canonicalize_list(matched)):
+                    stats["store_failed"] += 1
+                    continue
+                already.add(email.lower())
+                stats["inserted"] += 1
+
+        # spawned, not forked: this usually runs on a thread of the (multithreaded) API process
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(cfg_path,)) as pool:
+            pending: Dict = {}
+            for rows in iter_features(conn, company_name, batch_size):
+                batch = []
+                meta = {}
+                for fid, file_name, file_path, name, email, phone, raw_tokens in rows:
+                    meta[fid] = (file_name, file_path, name, email, phone)
+                    batch.append((fid, list(raw_tokens or [])))
+                stats["scanned"] += len(batch)
+                pending[pool.submit(_match_batch, jd_raw, batch)] = meta
+                # keep a bounded number of batches in flight
+                while len(pending) >= workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        store(fut.result(), pending.pop(fut))
+            for fut in list(pending):
+                store(fut.result(), pending.pop(fut))
+        write_conn.commit()
+    finally:
+        cursor.close()
+        write_conn.close()
+        conn.close()
+
+    stats["seconds"] = time.perf_counter() - t0
+    logger.info("Re-screened %d stored resumes for '%s' (%s): %d matched, %d newly selected in %.1fs.",
+                stats["scanned"], job_title, company_name, stats["matched"], stats["inserted"], stats["seconds"])
+    return stats
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Re-screen stored resumes against one job.")
+    ap.add_argument("company")
+    ap.add_argument("job_title")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--min-matched", type=int, default=1)
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    rescreen_job(a.company, a.job_title, a.workers, a.batch_size, a.min_matched)
@@ -0,0 +1,139 @@
+# resume_features.py
+"""
+Persisted per-resume feature records.
+- One row per (company, file_name): contact details plus the raw and canonical
+  skill tokens extracted at screening time. The name is the proximity-heuristic
+  one at first (NULL when it finds none) and is replaced by the screening name
+  once the resume is selected, so rescreen / rematch never re-open the document
+- Lets jobs added later be matched against earlier applicants without
+  re-parsing any PDF/DOCX (see rescreen.py)
+- index_keys (GIN-indexed) is the inverted index token -> resumes: surface,
+  canonical and family-expanded forms of the tokens, so a skills_config.json
+  edit only re-matches the resumes it can affect (see rematch.py)
+"""
+
+import threading
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from psycopg2 import sql
+
+FEATURES_TABLE = "resume_features"
+
+_FEATURES_READY = False
+_FEATURES_LOCK = threading.Lock()
+
+def ensure_features_table():
+    """Create the table (once per process, committed on a connection of its own)."""
+    global _FEATURES_READY
+    if _FEATURES_READY:
+        return
+    from extract_details import _get_db_connection
+
+    with _FEATURES_LOCK:
+        if _FEATURES_READY:
+            return
+        conn = _get_db_connection()
+        try:
+            cursor = conn.cursor()
+            _create_features_table(cursor)
+            cursor.close()
+            conn.commit()
+        finally:
+            conn.close()
+        _FEATURES_READY = True
+
+def _create_features_table(cursor):
+    table = sql.Identifier(FEATURES_TABLE)
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            id SERIAL PRIMARY KEY,
+            company VARCHAR(255) NOT NULL,
+            file_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            name VARCHAR(255),
+            email VARCHAR(255) NOT NULL,
+            phone_no VARCHAR(20) NOT NULL,
+            raw_tokens TEXT[] NOT NULL,
+            canonical_tokens TEXT[] NOT NULL,
+            index_keys TEXT[] NOT NULL DEFAULT '{{}}',
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            UNIQUE (company, file_name)
+        );
+    """).format(table))
+    # tables created before the inverted index; rows left empty are picked up by rematch.py
+    cursor.execute(sql.SQL("ALTER TABLE {} ADD COLUMN IF NOT EXISTS index_keys TEXT[] NOT NULL DEFAULT '{{}}'")
+                   .format(table))
+    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} USING GIN (index_keys);").format(
+        sql.Identifier(FEATURES_TABLE + "_index_keys_gin"), table))
+
+def save_features(cursor, company_name: str, file_name: str, file_path: str, name: str, email: str,
+                  phone_no: str, raw_tokens: List[str], canonical_tokens: List[str],
+                  index_keys: Sequence[str] = ()):
+    """Insert or refresh the feature record of one resume (caller commits)."""
+    ensure_features_table()
+    cursor.execute(sql.SQL("""
+        INSERT INTO {} (company, file_name, file_path, name, email, phone_no, raw_tokens, canonical_tokens,
+                        index_keys)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (company, file_name) DO UPDATE SET
+            file_path = EXCLUDED.file_path, name = COALESCE(EXCLUDED.name, {}.name), email = EXCLUDED.email,
+            phone_no = EXCLUDED.phone_no, raw_tokens = EXCLUDED.raw_tokens,
+            canonical_tokens = EXCLUDED.canonical_tokens, index_keys = EXCLUDED.index_keys, created_at = now();
+    """).format(sql.Identifier(FEATURES_TABLE), sql.Identifier(FEATURES_TABLE)),
+        (company_name, file_name, file_path, name, email, phone_no, list(raw_tokens), list(canonical_tokens),
+         list(index_keys)))
+
+def set_name(cursor, company_name: str, file_name: str, name: str) -> None:
+    """Record the name screening settled on (NER included) for a feature record (caller commits)."""
+    ensure_features_table()
+    cursor.execute(sql.SQL("UPDATE {} SET name = %s WHERE company = %s AND file_name = %s").format(
+        sql.Identifier(FEATURES_TABLE)), (name, company_name, file_name))
+
+def update_index(cursor, rows: Sequence[Tuple[int, List[str], List[str]]]) -> None:
+    """Refresh (id, canonical_tokens, index_keys) of re-matched resumes under the current config."""
+    ensure_features_table()
+    for fid, canonical_tokens, index_keys in rows:
+        cursor.execute(sql.SQL("UPDATE {} SET canonical_tokens = %s, index_keys = %s WHERE id = %s").format(
+            sql.Identifier(FEATURES_TABLE)), (list(canonical_tokens), list(index_keys), fid))
+
+def company_index_keys(cursor, company_name: str) -> List[str]:
+    """Distinct index keys of one company's resumes."""
+    ensure_features_table()
+    cursor.execute(sql.SQL("SELECT DISTINCT k FROM {}, unnest(index_keys) AS k WHERE company = %s").format(
+        sql.Identifier(FEATURES_TABLE)), (company_name,))
+    return [r[0] for r in cursor.fetchall()]
+
+def feature_companies(cursor) -> List[str]:
+    ensure_features_table()
+    cursor.execute(sql.SQL("SELECT DISTINCT company FROM {} ORDER BY company").format(sql.Identifier(FEATURES_TABLE)))
+    return [r[0] for r in cursor.fetchall()]
+
+FeatureRow = Tuple[int, str, str, str, str, str, List[str]]
+
+def iter_features(conn, company_name: str, batch_size: int = 2000,
+                  keys: Optional[Sequence[str]] = None) -> Iterator[List[FeatureRow]]:
+    """
+    Yield batches of (id, file_name, file_path, name, email, phone_no, raw_tokens)
+    for one company, streamed through a server-side cursor. With `keys`, only
+    resumes whose index_keys overlap them (or that were never indexed).
+    """
+    ensure_features_table()
+    cur = conn.cursor(name="resume_features_scan")
+    cur.itersize = batch_size
+    try:
+        if keys is None:
+            where, params = sql.SQL("company = %s"), (company_name,)
+        else:
+            where = sql.SQL("company = %s AND (index_keys && %s::TEXT[] OR cardinality(index_keys) = 0)")
+            params = (company_name, list(keys))
+        cur.execute(sql.SQL("""
+            SELECT id, file_name, file_path, name, email, phone_no, raw_tokens
+            FROM {} WHERE {} ORDER BY id
+        """).format(sql.Identifier(FEATURES_TABLE), where), params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
@@ -0,0 +1,201 @@
+# scoring_engine.py
+"""
+Sparse-matrix scoring of all candidates x all jobs.
+- Candidates and JD requirements are encoded as sparse vectors over one
+  vocabulary of canonical forms (SkillMatcher.canonical_form, families kept whole)
+- Family expansion is a sparse closure matrix E (family -> its engines), so a
+  resume listing "mern" satisfies a JD asking for "react" and vice versa
+- E @ E.T @ R is precomputed once; a candidate block is scored with one sparse
+  matmul, then summed per job; top-k candidates per job are kept streaming
+
+Only the exact_canonical / family_match stages of match_resume_to_jd are
+reproduced here; fuzzy and semantic matching stay per-resume.
+
+Usage:
+    engine = ScoringEngine(get_matcher())
+    engine.add_jobs([("Backend", ["python", "postgres", "aws"]), ...])
+    top = engine.top_k(candidate_token_lists, k=50)   # {job_index: [(cand_index, score), ...]}
+"""
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from skill_matcher import SkillMatcher
+
+
+class ScoringEngine:
+    def __init__(self, matcher: SkillMatcher):
+        self.matcher = matcher
+        self.vocab: Dict[str, int] = {}
+        # seed vocabulary with every canonical engine and family name
+        for canon in sorted(set(matcher.aliases.values())):
+            self._index(canon)
+        for fam, engines in matcher.families.items():
+            self._index(fam)
+            for e in engines:
+                self._index(e)
+        self.job_titles: List[str] = []
+        self._req_rows: List[List[int]] = []   # per requirement: vocab ids that satisfy it
+        self._req_job: List[int] = []          # per requirement: owning job index
+        self._closure = None
+        self._req = None
+        self._agg = None
+        # raw token -> vocab id (or None); skill tokens repeat heavily across resumes
+        self._token_ids: Dict[str, object] = {}
+
+    def _index(self, tok: str) -> int:
+        idx = self.vocab.get(tok)
+        if idx is None:
+            idx = self.vocab[tok] = len(self.vocab)
+            self._closure = None
+            self._token_ids = {}
+        return idx
+
+    # ---------------------------
+    # encoding
+    # ---------------------------
+    def add_jobs(self, jobs: Iterable[Tuple[str, Sequence[str]]]) -> None:
+        """Register (job_title, jd_tokens) pairs; each JD token becomes one requirement."""
+        for title, jd_tokens in jobs:
+            j = len(self.job_titles)
+            self.job_titles.append(title)
+            # match_resume_to_jd keys results by the JD string, so repeats count once
+            for jd in dict.fromkeys(jd_tokens):
+                if not jd:
+                    continue
+                self._req_rows.append([self._index(self.matcher.canonical_form(jd))])
+                self._req_job.append(j)
+        self._req = None
+
+    def _closure_matrix(self):
+        """V x V expansion E: every token covers itself, a family also covers its engines."""
+        if self._closure is None:
+            n = len(self.vocab)
+            rows, cols = list(range(n)), list(range(n))
+            for fam, engines in self.matcher.families.items():
+                f = self.vocab[fam]
+                for e in engines:
+                    rows.append(f)
+                    cols.append(self.vocab[e])
+            self._closure = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n, n))
+            self._closure.data[:] = 1.0
+        return self._closure
+
+    def _requirement_matrices(self):
+        """(E @ E.T @ R, job aggregation): candidate token t satisfies requirement r iff their expansions overlap."""
+        if self._req is None:
+            closure = self._closure_matrix()
+            n_req = len(self._req_rows)
+            rows, cols = [], []
+            for r, ids in enumerate(self._req_rows):
+                rows += ids
+                cols += [r] * len(ids)
+            req = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                    shape=(len(self.vocab), n_req))
+            self._req = (closure @ (closure.T @ req)).tocsr()
+            self._req.data[:] = 1.0
+            self._agg = sparse.csr_matrix((np.ones(n_req, dtype=np.float32), (np.arange(n_req), self._req_job)),
+                                          shape=(n_req, len(self.job_titles)))
+        return self._req, self._agg
+
+    def encode_candidates(self, token_lists: Sequence[Sequence[str]]):
+        """CSR (n_candidates x V) of canonical forms; tokens no JD asks for are ignored."""
+        indptr = [0]
+        indices: List[int] = []
+        vocab = self.vocab
+        form = self.matcher.canonical_form
+        cache = self._token_ids
+        for toks in token_lists:
+            ids = set()
+            for t in toks:
+                if not t:
+                    continue
+                if t in cache:
+                    i = cache[t]
+                else:
+                    i = cache[t] = vocab.get(form(t))
+                if i is not None:
+                    ids.add(i)
+            indices.extend(sorted(ids))
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                                 shape=(len(token_lists), len(vocab)))
+
+    # ---------------------------
+    # scoring
+    # ---------------------------
+    def score_matrix(self, cand):
+        """
+        Dense (n_candidates x n_jobs) count of matched JD skills for an encoded
+        candidate block: one matmul against the expanded requirements, summed per job.
+        """
+        req, agg = self._requirement_matrices()
+        # (C @ E E^T R) > 0 tells which requirements each candidate satisfies
+        hits = cand @ req
+        hits.data[:] = 1.0
+        return (hits @ agg).toarray()
+
+    def top_k(self, token_lists: Iterable[Sequence[str]], k: int = 50, block_size: int = 20000,
+              min_score: float = 1.0) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        Stream candidates in blocks and keep the best `k` per job.
+        Returns {job_index: [(candidate_index, score), ...]} sorted by score desc.
+        """
+        n_jobs = len(self.job_titles)
+        best_scores = np.full((0, n_jobs), -1.0, dtype=np.float32)
+        best_ids = np.zeros((0, n_jobs), dtype=np.int64)
+        offset = 0
+        for block in _blocks(token_lists, block_size):
+            scores = self.score_matrix(self.encode_candidates(block)).astype(np.float32)
+            ids = np.broadcast_to(np.arange(offset, offset + len(block))[:, None], scores.shape)
+            offset += len(block)
+            all_scores = np.vstack([best_scores, scores])
+            all_ids = np.vstack([best_ids, ids])
+            if all_scores.shape[0] > k:
+                part = np.argpartition(-all_scores, k - 1, axis=0)[:k]
+                best_scores = np.take_along_axis(all_scores, part, axis=0)
+                best_ids = np.take_along_axis(all_ids, part, axis=0)
+            else:
+                best_scores, best_ids = all_scores, all_ids
+
+        out: Dict[int, List[Tuple[int, float]]] = {}
+        for j in range(n_jobs):
+            order = np.lexsort((best_ids[:, j], -best_scores[:, j]))
+            out[j] = [(int(best_ids[i, j]), float(best_scores[i, j])) for i in order
+                      if best_scores[i, j] >= min_score]
+        return out
+
+
+def _blocks(items: Iterable, size: int):
+    block = []
+    for it in items:
+        block.append(it)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+if __name__ == "__main__":
+    # quick scale check on synthetic data: python scoring_engine.py 100000 500
+    import random
+    import sys
+    import time
+
+    from bench_matcher import Vocab, generate_tokens
+
+    n_cand = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    n_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(1)
+    vocab = Vocab("skills_config.json")
+    engine = ScoringEngine(SkillMatcher("skills_config.json", use_semantic=False))
+    engine.add_jobs((f"job{j}", generate_tokens(rng, vocab, 10, {"canonical": 0.8, "family": 0.2}))
+                    for j in range(n_jobs))
+    cands = [generate_tokens(rng, vocab, 25) for _ in range(n_cand)]
+    t0 = time.perf_counter()
+    top = engine.top_k(cands, k=20)
+    print(f"{n_cand} candidates x {n_jobs} jobs ranked in {time.perf_counter() - t0:.2f}s; "
+          f"job0 best: {top[0][:3]}")
@@ -0,0 +1,318 @@
+# screen_daemon.py
+"""
+Pre-fork screening daemon with copy-on-write model sharing.
+- The parent loads everything screening needs once: spaCy, the compiled
+  SkillMatcher (aliases, families, OOV index), the embedding backend and the
+  vocabulary embeddings. It then gc.freeze()s the heap, so the collector never
+  writes to those pages, and forks the workers, which share them copy-on-write
+- Starting or replacing a worker is a fork: no imports, no model loads
+- Workers accept on one Unix socket (the kernel hands each connection to an
+  idle worker) and screen one resume per request through screening_pipeline
+- A worker is replaced after DAEMON_MAX_REQUESTS requests or when it dies
+- Each worker still checks skills_config.json for changes (extract_details.get_matcher);
+  a reloaded matcher lives in that worker's private memory until it is replaced,
+  so restart the daemon after a config change to share it again
+- email_api hands its screening work to the daemon when SCREEN_DAEMON_SOCKET is
+  set (it keeps fair scheduling and falls back to in-process screening when the
+  daemon is down)
+- torch runs single-threaded in the parent (an OpenMP pool started before fork
+  hangs the children); workers use DAEMON_TORCH_THREADS each. onnxruntime
+  sessions, the embedding batcher and parse_sandbox workers are per process and
+  re-created in each worker on first use
+
+Wire format: 4-byte big-endian length + JSON, one request and one response per connection.
+
+Config (env):
+    SCREEN_DAEMON_SOCKET    socket path (default /tmp/resumexpert-screen.sock)
+    DAEMON_WORKERS          worker processes (default: CPU count)
+    DAEMON_MAX_REQUESTS     requests per worker before it is replaced (default 1000)
+    DAEMON_TORCH_THREADS    torch intra-op threads per worker (default 1)
+    DAEMON_TIMEOUT          client timeout per request in seconds (default 300)
+
+Usage:
+    python screen_daemon.py serve [--workers 4]
+    python screen_daemon.py screen resume.pdf Acme
+    python screen_daemon.py stats
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import struct
+import sys
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "/tmp/resumexpert-screen.sock"
+SCREEN_DAEMON_SOCKET = os.getenv("SCREEN_DAEMON_SOCKET", DEFAULT_SOCKET)
+DAEMON_WORKERS = int(os.getenv("DAEMON_WORKERS", os.cpu_count() or 2))
+DAEMON_MAX_REQUESTS = int(os.getenv("DAEMON_MAX_REQUESTS", 1000))
+DAEMON_TORCH_THREADS = int(os.getenv("DAEMON_TORCH_THREADS", 1))
+DAEMON_TIMEOUT = float(os.getenv("DAEMON_TIMEOUT", 300))
+
+
+def _send(sock: socket.socket, obj: Dict) -> None:
+    data = json.dumps(obj, default=str).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("screening daemon closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+def _recv(sock: socket.socket) -> Dict:
+    (n,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, n))
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """Rss, Pss (shared pages split between their users) and private MB of a process, from /proc."""
+    out = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as fh:
+            for line in fh:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                    out[key] = int(value.split()[0]) / 1024.0
+    except (OSError, ValueError):
+        return {}
+    return {"rss_mb": out.get("Rss", 0.0), "pss_mb": out.get("Pss", 0.0),
+            "private_mb": out.get("Private_Clean", 0.0) + out.get("Private_Dirty", 0.0)}
+
+
+# ---------------------------
+# parent
+# ---------------------------
+def warm() -> Dict:
+    """Load every model and table screening uses, then freeze the heap for copy-on-write sharing."""
+    t0 = time.perf_counter()
+    import extract_details as ed
+    from screening_pipeline import get_pipeline
+
+    matcher = ed.get_matcher()      # lexicon, OOV index, embedding backend + vocabulary embeddings
+    nlp = ed.get_nlp()
+    get_pipeline()
+    gc.collect()
+    gc.freeze()
+    return {"seconds": time.perf_counter() - t0, "config_version": matcher.config_version,
+            "semantic": matcher.semantic_enabled, "ner": nlp is not None, "frozen_objects": gc.get_freeze_count()}
+
+
+class PreforkServer:
+    def __init__(self, path: str = SCREEN_DAEMON_SOCKET, workers: int = DAEMON_WORKERS,
+                 max_requests: int = DAEMON_MAX_REQUESTS):
+        self.path = path
+        self.workers = workers
+        self.max_requests = max_requests
+        self.children: Dict[int, float] = {}     # pid -> monotonic start time
+        self.spawned = 0
+        self._stopping = False
+        self._listener: Optional[socket.socket] = None
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _worker_main(self._listener, self.max_requests)
+            except BaseException:
+                logger.exception("Screening worker %d failed", os.getpid())
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        self.spawned += 1
+
+    def _stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def serve(self) -> None:
+        # before torch is imported: a single-threaded parent never starts an OpenMP pool
+        os.environ["OMP_NUM_THREADS"] = "1"
+        info = warm()
+        logger.info("Warmed up in %.1fs (config %s, semantic %s, NER %s, %d objects frozen)", info["seconds"],
+                    info["config_version"], info["semantic"], info["ner"], info["frozen_objects"])
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        self._listener.listen(128)
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        t0 = time.perf_counter()
+        for _ in range(self.workers):
+            self._spawn()
+        logger.info("Serving on %s with %d workers (forked in %.0f ms, parent %.0f MB RSS)", self.path,
+                    self.workers, (time.perf_counter() - t0) * 1000.0, memory_mb(os.getpid()).get("rss_mb", 0.0))
+        try:
+            while not self._stopping:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    pid, status = 0, 0
+                if not pid:
+                    time.sleep(0.2)
+                    continue
+                started = self.children.pop(pid, None)
+                if started is None or self._stopping:
+                    continue
+                if os.waitstatus_to_exitcode(status) != 0:
+                    logger.warning("Screening worker %d exited with %d; replacing it", pid,
+                                   os.waitstatus_to_exitcode(status))
+                    if time.monotonic() - started < 1.0:
+                        time.sleep(1.0)      # a worker that dies at once would otherwise fork in a loop
+                self._spawn()
+        finally:
+            for pid in list(self.children):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            for pid in list(self.children):
+                try:
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+            self._listener.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            logger.info("Stopped after forking %d workers", self.spawned)
+
+
+# ---------------------------
+# worker
+# ---------------------------
+def _after_fork() -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    random.seed()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(DAEMON_TORCH_THREADS)
+    import parse_sandbox
+    # one request at a time per worker, so one parser subprocess is enough
+    parse_sandbox.reset_parser_pool(workers=1)
+
+
+def _screen(req: Dict) -> Dict:
+    from screening_pipeline import get_pipeline
+    from screening_records import record_screening
+
+    ctx = get_pipeline().run(req["file_name"], req["file_path"], req["company"], req.get("require_jd_match", True))
+    record_screening(ctx)
+    return {"selected": ctx.selected, "reject_reason": ctx.reject_reason, "rejected_at": ctx.rejected_at,
+            "config_version": ctx.config_version, "timings": ctx.timings}
+
+def _stats(served: int, started: float) -> Dict:
+    parent = os.getppid()
+    try:
+        with open(f"/proc/{parent}/task/{parent}/children", "r") as fh:
+            pids = [int(p) for p in fh.read().split()]
+    except OSError:
+        pids = [os.getpid()]
+    procs = {str(pid): memory_mb(pid) for pid in [parent] + pids}
+    return {"parent": parent, "worker": os.getpid(), "served": served, "uptime_s": time.monotonic() - started,
+            "processes": procs,
+            "total_rss_mb": sum(m.get("rss_mb", 0.0) for m in procs.values()),
+            "total_pss_mb": sum(m.get("pss_mb", 0.0) for m in procs.values())}
+
+def _worker_main(listener: socket.socket, max_requests: int) -> int:
+    _after_fork()
+    from pair_cache import flush_pair_caches
+    from screening_records import close_writer
+
+    started = time.monotonic()
+    served = 0
+    try:
+        while served < max_requests:
+            conn, _ = listener.accept()
+            with conn:
+                try:
+                    req = _recv(conn)
+                    cmd = req.get("cmd", "screen")
+                    if cmd == "screen":
+                        reply = _screen(req)
+                        served += 1
+                    elif cmd == "stats":
+                        reply = _stats(served, started)
+                    else:
+                        reply = {"error": f"unknown command: {cmd!r}"}
+                except (ConnectionError, OSError, ValueError) as e:
+                    logger.warning("Bad request on worker %d: %s", os.getpid(), e)
+                    continue
+                except Exception as e:
+                    logger.exception("Screening request failed on worker %d", os.getpid())
+                    reply = {"error": str(e)}
+                try:
+                    _send(conn, reply)
+                except OSError as e:
+                    logger.warning("Could not answer request on worker %d: %s", os.getpid(), e)
+    finally:
+        close_writer()
+        flush_pair_caches()
+    return 0
+
+
+# ---------------------------
+# client
+# ---------------------------
+class ScreenDaemonClient:
+    def __init__(self, path: str = SCREEN_DAEMON_SOCKET, timeout: float = DAEMON_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def request(self, req: Dict) -> Dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            _send(sock, req)
+            reply = _recv(sock)
+        if reply.get("error"):
+            raise RuntimeError(f"screening daemon: {reply['error']}")
+        return reply
+
+    def screen(self, file_name: str, file_path: str, company_name: str, require_jd_match: bool = True) -> Dict:
+        """Screen one resume in a daemon worker; file_path must be readable by the daemon."""
+        return self.request({"cmd": "screen", "file_name": file_name, "file_path": os.path.abspath(file_path),
+                             "company": company_name, "require_jd_match": require_jd_match})
+
+    def stats(self) -> Dict:
+        return self.request({"cmd": "stats"})
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pre-fork screening daemon.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--workers", type=int, default=DAEMON_WORKERS)
+    s.add_argument("--max-requests", type=int, default=DAEMON_MAX_REQUESTS)
+    c = sub.add_parser("screen")
+    c.add_argument("file_path")
+    c.add_argument("company")
+    sub.add_parser("stats")
+    ap.add_argument("--socket", default=SCREEN_DAEMON_SOCKET)
+    a = ap.parse_args()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s[%(process)d]: %(message)s")
+
+    if a.command == "serve":
+        PreforkServer(a.socket, a.workers, a.max_requests).serve()
+    else:
+        client = ScreenDaemonClient(a.socket)
+        if a.command == "screen":
+            result = client.screen(os.path.basename(a.file_path), a.file_path, a.company)
+        else:
+            result = client.stats()
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,437 @@
+# screening_pipeline.py
+"""
+Cost-ordered, staged resume screening.
+- Each Stage declares what it needs/provides on the ScreeningContext, a cost
+  estimate (ms, refined from observed timings) and may return a reject reason
+- The pipeline always runs the cheapest stage whose inputs are ready, so cheap
+  rejects (no contact details on the first page, no skill overlap with any of
+  the company's jobs) finish before full text extraction, matching or NER
+- Per-stage runs, rejects, time spent and estimated time saved are recorded
+- Each resume is screened with the matcher that was current when it started, so
+  a skills_config.json reload never mixes two config versions in one result
+- Text extraction runs in parse_sandbox workers; a document that times out or
+  blows the memory ceiling is rejected as "parse_timeout" / "parse_memory" /
+  "parse_crashed" by whichever stage asked for its text
+
+Usage:
+    from screening_pipeline import get_pipeline
+    result = get_pipeline().run(file_name, file_path, company_name)
+    result.selected, result.reject_reason, result.timings, result.config_version
+"""
+
+import logging
+import os
+import threading
+import time
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import extract_details as ed
+from saving import store_files_in_db
+from skill_matcher import norm_text
+from tenant_store import list_jobs
+
+logger = logging.getLogger(__name__)
+
+# characters read for the first-page contact scan of formats without pages (DOCX)
+HEAD_CHARS = int(os.getenv("SCREEN_HEAD_CHARS", 3000))
+# seconds a company's job list (and its skill union) is reused before re-reading the DB
+JD_CACHE_TTL = float(os.getenv("JD_CACHE_TTL", 60))
+# reject on "no lexical skill overlap" even though semantic matching could still match
+STRICT_SPOTTING = os.getenv("SCREEN_STRICT_SPOT", "0") == "1"
+
+
+class ScreeningContext:
+    """Per-resume state passed between stages."""
+
+    def __init__(self, file_name: str, file_path: str, company_name: str, require_jd_match: bool = True,
+                 matcher=None):
+        self.file_name = file_name
+        self.file_path = file_path
+        self.company_name = company_name
+        self.require_jd_match = require_jd_match
+        self.matcher = matcher if matcher is not None else ed.get_matcher()
+        self.head_text: Optional[str] = None
+        self.text: Optional[str] = None
+        self.emails: Optional[List[str]] = None
+        self.phones: Optional[List[str]] = None
+        self.head_scan = None                 # ed.ContactScan of head_text / text, shared by the extractors
+        self.text_scan = None
+        self.name: Optional[str] = None
+        self.name_checked = False
+        self.resume_tokens: Optional[List[str]] = None
+        self.jobs = None                      # JobSet
+        self.spotted: Optional[bool] = None
+        self.best_job: Optional[Tuple[str, List[str], Dict]] = None
+        self.job_matches: Dict[str, Dict] = {}   # job_title -> match_resume_to_jd result
+        self.matched_skills: Optional[List[str]] = None
+        self.stored = False
+        self.features_saved = False
+        self.timings: Dict[str, float] = {}
+        self.reject_reason: Optional[str] = None
+        self.rejected_at: Optional[str] = None
+
+    @property
+    def selected(self) -> bool:
+        return self.stored
+
+    @property
+    def config_version(self) -> str:
+        return self.matcher.config_version
+
+
+class Stage:
+    """
+    A pipeline step. `needs` / `provides` are ScreeningContext attribute names;
+    a stage is ready once none of its `needs` is None. `run` returns a reject
+    reason (str) or None. `cost` is the initial estimate in milliseconds.
+    Side-effect stages run as soon as they are ready (before any cheaper reject
+    can skip them) and their failures are logged, never rejected.
+    """
+
+    def __init__(self, name: str, fn: Callable[["ScreeningContext"], Optional[str]], cost: float,
+                 needs: Sequence[str] = (), provides: Sequence[str] = (), side_effect: bool = False):
+        self.name = name
+        self.fn = fn
+        self.cost = float(cost)
+        self.needs = tuple(needs)
+        self.provides = tuple(provides)
+        self.side_effect = side_effect
+
+    def ready(self, ctx: ScreeningContext) -> bool:
+        return all(getattr(ctx, n) is not None for n in self.needs)
+
+
+class StageStats:
+    def __init__(self):
+        self.runs = 0
+        self.rejects = 0
+        self.total_ms = 0.0
+        self.saved_ms = 0.0
+        self.reasons: Dict[str, int] = {}
+
+    def as_dict(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "rejects": self.rejects,
+            "avg_ms": self.total_ms / self.runs if self.runs else 0.0,
+            "total_ms": self.total_ms,
+            "saved_ms": self.saved_ms,
+            "reasons": dict(self.reasons),
+        }
+
+
+class ScreeningPipeline:
+    def __init__(self, stages: List[Stage], ewma: float = 0.2):
+        self.stages = list(stages)
+        self._ewma = ewma
+        self._lock = threading.Lock()
+        self.stats: Dict[str, StageStats] = {s.name: StageStats() for s in self.stages}
+
+    def add_stage(self, stage: Stage) -> None:
+        with self._lock:
+            self.stages.append(stage)
+            self.stats.setdefault(stage.name, StageStats())
+
+    def _record(self, stage: Stage, ms: float, reason: Optional[str], remaining: List[Stage]) -> None:
+        with self._lock:
+            st = self.stats[stage.name]
+            st.runs += 1
+            st.total_ms += ms
+            stage.cost = (1 - self._ewma) * stage.cost + self._ewma * ms
+            if reason:
+                st.rejects += 1
+                st.reasons[reason] = st.reasons.get(reason, 0) + 1
+                st.saved_ms += sum(s.cost for s in remaining)
+
+    def run(self, file_name: str, file_path: str, company_name: str, require_jd_match: bool = True) -> ScreeningContext:
+        ctx = ScreeningContext(file_name, file_path, company_name, require_jd_match)
+        pending = list(self.stages)
+        while pending:
+            ready = [s for s in pending if s.ready(ctx)]
+            if not ready:
+                break
+            stage = min(ready, key=lambda s: (not s.side_effect, s.cost))
+            pending.remove(stage)
+            t0 = time.perf_counter()
+            try:
+                reason = stage.fn(ctx)
+            except Exception as e:
+                # errors that carry their own reject reason (parse_sandbox timeouts etc.) are expected
+                reason = getattr(e, "reject_reason", None)
+                logger.warning("Stage '%s' failed for %s: %s", stage.name, file_name, e, exc_info=reason is None)
+                if stage.side_effect:
+                    reason = None
+                elif reason is None:
+                    reason = "error:" + stage.name
+            ms = (time.perf_counter() - t0) * 1000.0
+            ctx.timings[stage.name] = ms
+            self._record(stage, ms, reason, pending)
+            if reason:
+                ctx.reject_reason = reason
+                ctx.rejected_at = stage.name
+                break
+        return ctx
+
+    def report(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: st.as_dict() for name, st in self.stats.items()}
+
+
+# ---------------------------
+# cached job descriptions per company
+# ---------------------------
+class JobSet:
+    """A company's jobs with the canonical skill union used for cheap spotting."""
+
+    def __init__(self, jobs: List[Tuple[str, str]], matcher):
+        self.jobs: List[Tuple[str, List[str]]] = []
+        union: Dict[str, None] = {}
+        self.config_version = matcher.config_version
+        for job_title, job_description in jobs:
+            # JD parse: split on comma
+            jd_raw = [s.strip() for s in (job_description or "").split(",") if s.strip()]
+            self.jobs.append((job_title, jd_raw))
+            for jd in jd_raw:
+                for c in matcher._canonicalize_token(jd):
+                    union[c] = None
+        self.canonical_union: List[str] = list(union)
+        self.canonical_set = set(union)
+        self.loaded_at = time.time()
+
+
+_JD_CACHE: Dict[str, JobSet] = {}
+_JD_CACHE_LOCK = threading.Lock()
+
+def load_jobs(company_name: str, matcher=None) -> JobSet:
+    matcher = matcher if matcher is not None else ed.get_matcher()
+    with _JD_CACHE_LOCK:
+        js = _JD_CACHE.get(company_name)
+    # the skill union depends on aliases/families, so a config reload also refreshes it
+    if (js is not None and js.config_version == matcher.config_version
+            and time.time() - js.loaded_at < JD_CACHE_TTL):
+        return js
+    conn = ed._get_db_connection()
+    try:
+        cursor = conn.cursor()
+        js = JobSet(list_jobs(cursor, company_name), matcher)
+        cursor.close()
+    finally:
+        conn.close()
+    with _JD_CACHE_LOCK:
+        _JD_CACHE[company_name] = js
+    return js
+
+def invalidate_jobs(company_name: Optional[str] = None) -> None:
+    with _JD_CACHE_LOCK:
+        if company_name is None:
+            _JD_CACHE.clear()
+        else:
+            _JD_CACHE.pop(company_name, None)
+
+
+# ---------------------------
+# stages
+# ---------------------------
+def stage_head_text(ctx: ScreeningContext) -> Optional[str]:
+    # first page of a PDF (stops after the first page with text) / first HEAD_CHARS of a DOCX
+    limit = 1 if ctx.file_path.lower().endswith(".pdf") else HEAD_CHARS
+    ctx.head_text = ed.extract_text_from_file(ctx.file_path, max_chars=limit)
+    if not ctx.head_text:
+        logger.debug("Text extraction failed.")
+        return "no_text"
+    return None
+
+def stage_contact_scan(ctx: ScreeningContext) -> Optional[str]:
+    ctx.head_scan = ed.scan_contacts(ctx.head_text)
+    emails = ed.extract_emails(ctx.head_text, ctx.head_scan)
+    phones = ed.extract_phone_numbers(ctx.head_text, ctx.head_scan)
+    if not emails or not phones:
+        # contact details can sit on a later page; only then pay for the full text
+        text = ensure_full_text(ctx)
+        scan = full_text_scan(ctx)
+        emails = emails or ed.extract_emails(text, scan)
+        phones = phones or ed.extract_phone_numbers(text, scan)
+    ctx.emails, ctx.phones = emails, phones
+    logger.debug("extracted emails: %s, phones: %s", emails, phones)
+    if not emails:
+        logger.debug("Email missing. Rejecting.")
+        return "no_email"
+    if not phones:
+        logger.debug("Phone missing. Rejecting.")
+        return "no_phone"
+    return None
+
+def ensure_full_text(ctx: ScreeningContext) -> str:
+    if ctx.text is None:
+        ctx.text = ed.extract_text_from_file(ctx.file_path) or ctx.head_text or ""
+    return ctx.text
+
+def full_text_scan(ctx: ScreeningContext):
+    if ctx.text_scan is None:
+        text = ensure_full_text(ctx)
+        # the full text falls back to head_text when it cannot be read
+        ctx.text_scan = ctx.head_scan if ctx.head_scan is not None and text is ctx.head_text \
+            else ed.scan_contacts(text)
+    return ctx.text_scan
+
+def stage_load_jobs(ctx: ScreeningContext) -> Optional[str]:
+    ctx.jobs = load_jobs(ctx.company_name, ctx.matcher)
+    if not ctx.jobs.jobs:
+        logger.warning("No jobs found for company: %s", ctx.company_name)
+        return "no_jobs"
+    return None
+
+def stage_skill_tokens(ctx: ScreeningContext) -> Optional[str]:
+    text = ensure_full_text(ctx)
+    sec = ed.extract_skills_section_text(text)
+    tokens = ed.tokenize_skills(sec) if sec else []
+    if not tokens:
+        tokens = ed.fallback_extract_from_whole_text(text)
+    ctx.resume_tokens = tokens
+    if not tokens:
+        logger.debug("No skill tokens detected.")
+        if ctx.require_jd_match:
+            return "no_skill_tokens"
+    return None
+
+def stage_skill_spot(ctx: ScreeningContext) -> Optional[str]:
+    """
+    Necessary condition for any exact/family/fuzzy match: a resume canonical equal to
+    one in the JD union, or a pair whose SequenceMatcher upper bounds reach fuzzy_ratio.
+    """
+    matcher = ctx.matcher
+    res_canon = set(matcher.canonicalize_list(ctx.resume_tokens))
+    ctx.spotted = True
+    if res_canon & ctx.jobs.canonical_set:
+        return None
+    if matcher.semantic_enabled and not STRICT_SPOTTING:
+        return None
+    th = matcher.fuzzy_ratio
+    jd_norm = [norm_text(j) for j in ctx.jobs.canonical_union]
+    for rc in res_canon:
+        rn = norm_text(rc)
+        if not rn:
+            continue
+        for jn in jd_norm:
+            if not jn:
+                continue
+            sm = SequenceMatcher(None, jn, rn)
+            if sm.real_quick_ratio() >= th and sm.quick_ratio() >= th:
+                return None
+    logger.debug("No skill overlap with any job. Resume Rejected.")
+    return "no_skill_overlap"
+
+def stage_save_features(ctx: ScreeningContext) -> Optional[str]:
+    # persist tokens so jobs added later can re-screen this resume without re-parsing
+    from resume_features import save_features
+    if not ctx.resume_tokens:
+        return None
+    matcher = ctx.matcher
+    # the cheap proximity name (no NER) so later re-screens of unmatched resumes have one;
+    # stage_store records the final name of selected ones
+    name = ctx.name or ed.extract_name_by_proximity(ensure_full_text(ctx), ctx.emails, ctx.phones,
+                                                    use_ner=False, scan=full_text_scan(ctx))
+    conn = ed._get_db_connection()
+    try:
+        cursor = conn.cursor()
+        save_features(cursor, ctx.company_name, ctx.file_name, os.path.abspath(ctx.file_path), name,
+                      ctx.emails[0], ctx.phones[0], ctx.resume_tokens, matcher.canonicalize_list(ctx.resume_tokens),
+                      matcher.index_keys(ctx.resume_tokens))
+        conn.commit()
+        cursor.close()
+        ctx.features_saved = True
+    finally:
+        conn.close()
+    return None
+
+def stage_match_jobs(ctx: ScreeningContext) -> Optional[str]:
+    matcher = ctx.matcher
+    best_count = 0
+    for job_title, jd_raw in ctx.jobs.jobs:
+        matches = matcher.match_resume_to_jd(ctx.resume_tokens, jd_raw)
+        ctx.job_matches[job_title] = matches
+        matched = [jd for jd, info in matches.items() if info[0]]
+        logger.debug("Matched %d JD skills for job '%s': %s", len(matched), job_title, matched)
+        if len(matched) > best_count:
+            best_count = len(matched)
+            ctx.best_job = (job_title, jd_raw, matches)
+            ctx.matched_skills = matched
+    if not ctx.best_job:
+        logger.debug("No JD-matched skills found. Resume Rejected.")
+        return "no_jd_match"
+    return None
+
+def find_name(text: str, emails: List[str], phones: List[str], scan=None) -> Optional[str]:
+    # proximity heuristic first; spaCy NER only when it finds nothing
+    if not text:
+        return None
+    scan = scan or ed.scan_contacts(text)
+    return (ed.extract_name_by_proximity(text, emails, phones, use_ner=False, scan=scan)
+            or ed.extract_name_by_proximity(text, emails, phones, use_ner=True, scan=scan))
+
+def stage_name(ctx: ScreeningContext) -> Optional[str]:
+    ctx.name = find_name(ensure_full_text(ctx), ctx.emails, ctx.phones, full_text_scan(ctx))
+    ctx.name_checked = True
+    logger.debug("extracted name: %s", ctx.name)
+    if not ctx.name:
+        logger.debug("Name missing. Rejecting.")
+        return "no_name"
+    return None
+
+def stage_store(ctx: ScreeningContext) -> Optional[str]:
+    from resume_features import set_name
+    matcher = ctx.matcher
+    conn = ed._get_db_connection()
+    cursor = conn.cursor()
+    try:
+        skill_keys = matcher.canonicalize_list(ctx.matched_skills)
+        if not store_files_in_db(cursor, ctx.company_name, ctx.name, ctx.emails[0], ctx.phones[0],
+                                 ctx.matched_skills, ctx.file_name, ctx.file_path, skill_keys):
+            # already logged and rolled back; the record must not claim a selection
+            return "store_failed"
+        ctx.stored = True
+        # the feature record keeps the name rescreen / rematch select with (the selection stands either way)
+        try:
+            set_name(cursor, ctx.company_name, ctx.file_name, ctx.name)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning("Could not record the name of '%s' in its feature record: %s", ctx.file_name, e)
+        logger.info("File '%s' stored for company '%s' (matched job: %s, skills config %s).",
+                    ctx.file_name, ctx.company_name, ctx.best_job[0], ctx.config_version)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    return None
+
+
+def default_stages() -> List[Stage]:
+    """Initial cost estimates (ms) only seed the order; observed timings take over."""
+    return [
+        Stage("head_text", stage_head_text, 20, provides=("head_text",)),
+        Stage("contact_scan", stage_contact_scan, 1, needs=("head_text",), provides=("emails", "phones")),
+        Stage("load_jobs", stage_load_jobs, 5, needs=("emails",), provides=("jobs",)),
+        Stage("skill_tokens", stage_skill_tokens, 40, needs=("jobs",), provides=("resume_tokens",)),
+        Stage("save_features", stage_save_features, 10, needs=("resume_tokens",), side_effect=True),
+        Stage("skill_spot", stage_skill_spot, 2, needs=("resume_tokens", "jobs")),
+        Stage("match_jobs", stage_match_jobs, 50, needs=("resume_tokens", "jobs", "spotted"),
+              provides=("best_job", "matched_skills")),
+        Stage("name", stage_name, 200, needs=("best_job",), provides=("name",)),
+        Stage("store", stage_store, 30, needs=("name", "matched_skills")),
+    ]
+
+
+_PIPELINE = None
+_PIPELINE_LOCK = threading.Lock()
+
+def get_pipeline() -> ScreeningPipeline:
+    global _PIPELINE
+    if _PIPELINE is None:
+        with _PIPELINE_LOCK:
+            if _PIPELINE is None:
+                _PIPELINE = ScreeningPipeline(default_stages())
+    return _PIPELINE
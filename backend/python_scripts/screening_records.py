@@ -0,0 +1,262 @@
+# screening_records.py
+"""
+Structured, append-only record of every screening outcome.
+- One row per screened resume: resume hash, file name, selected / reject
+  reason and stage, per-job matched skills (method, resume token, score),
+  per-stage timings and the skills config version, plus the match
+  explanations of resumes the matcher sampled (JSON, usually null)
+- Rows are queued and written by a background thread as Parquet files,
+  partitioned hive-style by day and company:
+      <root>/day=2026-01-31/company=Acme/part-<time>-<id>.parquet
+  Files are never rewritten; each flush adds new ones
+- Screening never waits on the writer: a full queue drops the record (counted)
+
+Config (env):
+    SCREENING_RECORDS_DIR   output root (default "screening_records", empty disables)
+    SCREENING_RECORDS_FLUSH_ROWS / SCREENING_RECORDS_FLUSH_SECONDS
+
+Usage:
+    python screening_records.py summary --since 2026-01-01 [--company Acme]
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _HAS_ARROW = True
+except ImportError:
+    _HAS_ARROW = False
+
+logger = logging.getLogger(__name__)
+
+RECORDS_DIR = os.getenv("SCREENING_RECORDS_DIR", "screening_records")
+FLUSH_ROWS = int(os.getenv("SCREENING_RECORDS_FLUSH_ROWS", 2000))
+FLUSH_SECONDS = float(os.getenv("SCREENING_RECORDS_FLUSH_SECONDS", 30))
+
+if _HAS_ARROW:
+    MATCH_TYPE = pa.struct([
+        ("job_title", pa.string()),
+        ("jd_skill", pa.string()),
+        ("matched", pa.bool_()),
+        ("method", pa.string()),
+        ("resume_token", pa.string()),
+        ("score", pa.float64()),
+    ])
+    # day / company are partition columns (directory names), not stored in the files
+    SCHEMA = pa.schema([
+        ("screened_at", pa.timestamp("ms", tz="UTC")),
+        ("resume_sha256", pa.string()),
+        ("file_name", pa.string()),
+        ("selected", pa.bool_()),
+        ("reject_reason", pa.string()),
+        ("rejected_at", pa.string()),
+        ("best_job", pa.string()),
+        ("matched_count", pa.int32()),
+        ("config_version", pa.string()),
+        ("total_ms", pa.float64()),
+        ("stage_ms", pa.map_(pa.string(), pa.float64())),
+        ("matches", pa.list_(MATCH_TYPE)),
+        ("explanation", pa.string()),
+    ])
+
+
+def file_sha256(path: str) -> Optional[str]:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def build_record(ctx) -> Dict:
+    """Flatten a finished ScreeningContext into one row (plus its day/company partition keys)."""
+    now = datetime.now(timezone.utc)
+    matches = []
+    explanations = {}
+    for job_title, result in (ctx.job_matches or {}).items():
+        for jd_skill, (matched, method, resume_token, score) in result.items():
+            matches.append({"job_title": job_title, "jd_skill": jd_skill, "matched": bool(matched),
+                            "method": method, "resume_token": resume_token, "score": float(score)})
+        if getattr(result, "explanation", None) is not None:
+            explanations[job_title] = result.explanation.as_dict()
+    return {
+        "day": now.strftime("%Y-%m-%d"),
+        "company": ctx.company_name,
+        "screened_at": now,
+        "resume_sha256": file_sha256(ctx.file_path),
+        "file_name": ctx.file_name,
+        "selected": bool(ctx.selected),
+        "reject_reason": ctx.reject_reason,
+        "rejected_at": ctx.rejected_at,
+        "best_job": ctx.best_job[0] if ctx.best_job else None,
+        "matched_count": len(ctx.matched_skills or []),
+        "config_version": ctx.config_version,
+        "total_ms": float(sum(ctx.timings.values())),
+        "stage_ms": list(ctx.timings.items()),
+        "matches": matches,
+        "explanation": json.dumps(explanations) if explanations else None,
+    }
+
+
+class ScreeningRecordWriter:
+    def __init__(self, root: str, flush_rows: int = FLUSH_ROWS, flush_seconds: float = FLUSH_SECONDS,
+                 max_queue: int = 100000):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self.files = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="screening-records", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict) -> bool:
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Write everything submitted so far and wait for it."""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        if self._thread.is_alive():
+            self._queue.put(("stop", None))
+            self._thread.join(timeout)
+
+    def _run(self):
+        buffer: List[Dict] = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            control = item if isinstance(item, tuple) else None
+            if item is not None and control is None:
+                buffer.append(item)
+            if control or len(buffer) >= self.flush_rows or time.monotonic() >= deadline:
+                if buffer:
+                    try:
+                        self._write(buffer)
+                    except Exception as e:
+                        logger.error("Screening records write failed (%d rows dropped): %s", len(buffer), e)
+                        self.dropped += len(buffer)
+                    buffer = []
+                deadline = time.monotonic() + self.flush_seconds
+            if control:
+                kind, done = control
+                if done is not None:
+                    done.set()
+                if kind == "stop":
+                    return
+
+    def _write(self, rows: List[Dict]) -> None:
+        parts: Dict[tuple, List[Dict]] = {}
+        for r in rows:
+            parts.setdefault((r["day"], r["company"]), []).append(r)
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        for (day, company), part_rows in parts.items():
+            directory = os.path.join(self.root, f"day={day}", f"company={quote(company, safe='')}")
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet"
+            table = pa.Table.from_pylist(part_rows, schema=SCHEMA)
+            # write under a dot-name first so scans never see a half-written file
+            tmp = os.path.join(directory, "." + name)
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, os.path.join(directory, name))
+            self.files += 1
+            self.written += len(part_rows)
+
+
+_WRITER: Optional[ScreeningRecordWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+def get_writer() -> Optional[ScreeningRecordWriter]:
+    """Process-wide writer, or None when disabled / pyarrow is missing."""
+    global _WRITER
+    if _WRITER is None and RECORDS_DIR and _HAS_ARROW:
+        with _WRITER_LOCK:
+            if _WRITER is None:
+                _WRITER = ScreeningRecordWriter(RECORDS_DIR)
+                atexit.register(_WRITER.close)
+    return _WRITER
+
+def close_writer() -> None:
+    """Flush and stop the process-wide writer (for processes that leave through os._exit)."""
+    global _WRITER
+    with _WRITER_LOCK:
+        writer, _WRITER = _WRITER, None
+    if writer is not None:
+        writer.close()
+
+def record_screening(ctx) -> None:
+    writer = get_writer()
+    if writer is None:
+        return
+    try:
+        writer.submit(build_record(ctx))
+    except Exception as e:
+        logger.warning("Could not record screening of %s: %s", ctx.file_name, e)
+
+
+# ---------------------------
+# reporting
+# ---------------------------
+def summary(root: str, since: Optional[str] = None, company: Optional[str] = None):
+    """Screenings / selections / reject reasons per company, scanned from the Parquet files."""
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(root, format="parquet", partitioning="hive", ignore_prefixes=["."])
+    flt = None
+    if since:
+        flt = ds.field("day") >= since
+    if company:
+        cond = ds.field("company") == company
+        flt = cond if flt is None else flt & cond
+    table = dataset.to_table(columns=["company", "selected", "reject_reason", "total_ms"], filter=flt)
+    by_company = table.group_by("company").aggregate([("selected", "count"), ("selected", "sum"),
+                                                      ("total_ms", "mean")])
+    reasons = table.filter(pc.invert(table["selected"])).group_by(["company", "reject_reason"]).aggregate(
+        [("selected", "count")])
+    return by_company, reasons
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Summarize recorded screening outcomes.")
+    ap.add_argument("command", choices=["summary"])
+    ap.add_argument("--root", default=RECORDS_DIR or "screening_records")
+    ap.add_argument("--since", help="first day (YYYY-MM-DD)")
+    ap.add_argument("--company")
+    a = ap.parse_args()
+    by_company, reasons = summary(a.root, a.since, a.company)
+    print(f"{'company':24s} {'screened':>9s} {'selected':>9s} {'avg ms':>8s}")
+    for row in by_company.to_pylist():
+        print(f"{row['company']:24s} {row['selected_count']:9d} {row['selected_sum'] or 0:9d} "
+              f"{row['total_ms_mean'] or 0:8.1f}")
+    print("\nreject reasons:")
+    for row in sorted(reasons.to_pylist(), key=lambda r: (r["company"], -r["selected_count"])):
+        print(f"  {row['company']:22s} {str(row['reject_reason']):24s} {row['selected_count']:7d}")
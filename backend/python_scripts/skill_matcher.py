@@ -4,22 +4,56 @@ Robust SkillMatcher.
 - Loads skills_config.json
 - Canonicalizes tokens using aliases + family expansion
 - Matches by: exact canonical, family match, fuzzy (SequenceMatcher), semantic (optional)
-- Returns: dict jd_skill -> (matched_bool, method, resume_token, score)
+- Returns: dict jd_skill -> (matched_bool, method, resume_token, score),
+  tagged with the config_version of the skills_config.json that produced it
+  and, when requested or sampled, a structured MatchExplanation
+- Semantic scores come from a pluggable embedding backend (embedding_backends:
+  torch / torch_int8 / onnx / onnx_int8, chosen by "semantic.backend"); loaded
+  backends are cached per process, so rebuilding a matcher after a config
+  change does not reload them
+- Embeddings are requested through embedding_service ("semantic.service"):
+  micro-batched across threads in-process, or from a shared per-host socket
+  service; a match call embeds the resume tokens once and each JD token's
+  texts in one request
+- Tokens outside the vocabulary are mapped once to their nearest canonical
+  (oov_resolver.OOVResolver) when the "oov" config section enables it
+- The "semantic_gate" config section keeps junk out of the semantic stage:
+  tokens that are too short / long, stop_tokens or digits-only are never
+  embedded, resume tokens sharing no character trigram with the JD token are
+  skipped, the stage only runs when the best fuzzy score fell in the uncertain
+  band, and each match call has a budget of semantic comparisons. Skipped
+  pairs are counted per reason (gate_stats())
+- Fuzzy ratios and semantic cosines of token pairs are looked up in a
+  pair_cache.PairScoreCache ("pair_cache" config section) before they are
+  computed: in-process LRU, then a SQLite file shared by the host's workers
+- A built SkillMatcher is immutable: tables are read-only views, attributes
+  cannot be reassigned, and everything a match call needs while it runs lives
+  in its own MatchContext. One matcher can serve any number of threads (also
+  on free-threaded builds); a config change builds a new matcher. The only
+  shared writes are the lazily loaded embedder (once, under a lock) and the
+  locked gate counters
 """
 
+import hashlib
 import json
+import logging
 import os
+import random
 import re
+import threading
 from difflib import SequenceMatcher
+from types import MappingProxyType
 from typing import List, Dict, Tuple, Optional
-import threading
 
-# semantic imports (optional)
-try:
-    from sentence_transformers import SentenceTransformer, util
-    _HAS_ST = True
-except Exception:
-    _HAS_ST = False
+import numpy as np
+
+# semantic backends (optional; heavy modules are only imported when a backend loads)
+from embedding_backends import backend_options, missing_modules
+from embedding_service import get_embedder, service_options
+from oov_resolver import trigrams
+from pair_cache import cache_options, get_pair_cache
+
+logger = logging.getLogger(__name__)
 
 def norm_text(s: str) -> str:
     if s is None:
@@ -30,12 +64,123 @@ def norm_text(s: str) -> str:
     s = re.sub(r'\s+', ' ', s)
     return s
 
+# why the semantic stage skipped pairs (see SkillMatcher.gate_stats)
+GATE_REASONS = ("token", "band", "overlap", "budget")
+
+class MatchResult(dict):
+    """jd_skill -> (matched_bool, method, resume_token, score), plus the config version that produced it."""
+
+    def __init__(self, config_version: str):
+        super().__init__()
+        self.config_version = config_version
+        self.explanation: Optional["MatchExplanation"] = None
+
+class JDExplanation:
+    """How one JD token was evaluated: per stage, pairs compared and the best candidate seen."""
+    __slots__ = ("jd_token", "jd_canonical", "stages")
+
+    def __init__(self, jd_token: str, jd_canonical: List[str]):
+        self.jd_token = jd_token
+        self.jd_canonical = jd_canonical
+        self.stages: Dict[str, Dict] = {}
+
+    def stage(self, name: str, pairs: int, resume_token: Optional[str], score: float,
+              pair: Tuple[Optional[str], Optional[str]] = (None, None), gated: Optional[str] = None):
+        self.stages[name] = {"pairs": pairs, "best_resume_token": resume_token, "score": float(score),
+                             "best_pair": list(pair)}
+        if gated is not None:
+            self.stages[name]["gated"] = gated
+
+class MatchExplanation:
+    """Structured trace of one match_resume_to_jd call (only built when requested or sampled)."""
+
+    def __init__(self, config_version: str):
+        self.config_version = config_version
+        self.resume_map: List[Tuple[str, List[str]]] = []
+        self.jd: List[JDExplanation] = []
+        self.results: Dict = {}
+
+    def add_jd(self, jd_token: str, jd_canonical: List[str]) -> JDExplanation:
+        jx = JDExplanation(jd_token, jd_canonical)
+        self.jd.append(jx)
+        return jx
+
+    def as_dict(self) -> Dict:
+        return {
+            "config_version": self.config_version,
+            "resume_map": [[raw, list(rc)] for raw, rc in self.resume_map],
+            "jd": [{"jd_token": j.jd_token, "jd_canonical": list(j.jd_canonical), "stages": j.stages,
+                    "result": list(self.results.get(j.jd_token, (False, None, None, 0.0)))} for j in self.jd],
+        }
+
+    def format(self) -> str:
+        lines = [f"config {self.config_version}, resume tokens: "
+                 + ", ".join(f"{raw!r}->{rc}" for raw, rc in self.resume_map)]
+        for j in self.jd:
+            matched, method, raw, score = self.results.get(j.jd_token, (False, None, None, 0.0))
+            lines.append(f"  JD {j.jd_token!r} {j.jd_canonical}: matched={matched} method={method} "
+                         f"resume={raw!r} score={score:.4f}")
+            for name, st in j.stages.items():
+                lines.append(f"    {name:16s} pairs={st['pairs']:<5d} best={st['best_resume_token']!r} "
+                             f"score={st['score']:.4f} pair={st['best_pair']}"
+                             + (f" gated={st['gated']}" if "gated" in st else ""))
+        return "\n".join(lines)
+
+class MatchContext:
+    """State of one match_resume_to_jd call; never shared between calls or threads."""
+    __slots__ = ("resume_map", "n_resume_canon", "explanation", "resume_texts", "n_texts", "resume_grams",
+                 "resume_emb", "counts")
+
+    def __init__(self, resume_map: List[Tuple[str, List[str]]], explanation: Optional[MatchExplanation]):
+        self.resume_map = resume_map      # (raw resume token, [canonical forms]) in resume order
+        self.n_resume_canon = sum(len(rc_list) for _, rc_list in resume_map)
+        self.explanation = explanation
+        # resume (raw token, text) pairs the semantic stage may compare, their trigrams and
+        # embeddings; built when the first JD token reaches that stage
+        self.resume_texts: Optional[List[Tuple[str, str]]] = None
+        self.n_texts = 0
+        self.resume_grams: Dict[str, set] = {}
+        self.resume_emb: Optional[Dict[str, np.ndarray]] = None
+        self.counts = GateStats.empty()
+
+class GateStats:
+    """Semantic gate counters of a matcher, added to once per match call under a lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = self.empty()
+        self._counts["calls"] = 0
+
+    @staticmethod
+    def empty() -> Dict:
+        return {"calls": 1, "jd_tokens": 0, "pairs_possible": 0, "pairs_compared": 0, "budget_exhausted": 0,
+                "texts_skipped": 0, "jd_gated": dict.fromkeys(GATE_REASONS, 0),
+                "pairs_gated": dict.fromkeys(GATE_REASONS, 0)}
+
+    def add(self, counts: Dict) -> None:
+        with self._lock:
+            st = self._counts
+            for k, v in counts.items():
+                if isinstance(v, dict):
+                    for reason, n in v.items():
+                        st[k][reason] += n
+                else:
+                    st[k] += v
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {k: dict(v) if isinstance(v, dict) else v for k, v in self._counts.items()}
+
 class SkillMatcher:
     def __init__(self, config_path: str = "skills_config.json", use_semantic: Optional[bool] = None):
         if not os.path.exists(config_path):
             raise FileNotFoundError(f"skills config not found: {config_path}")
-        with open(config_path, "r", encoding="utf-8") as fh:
-            cfg = json.load(fh)
+        with open(config_path, "rb") as fh:
+            raw = fh.read()
+        cfg = json.loads(raw.decode("utf-8"))
+        # content hash: identifies which config produced a match result
+        self.config_path = config_path
+        self.config_version = hashlib.sha1(raw).hexdigest()[:12]
 
         # alias: alias -> canonical (lowercased)
         self.aliases: Dict[str, str] = {k.lower(): v.lower() for k, v in cfg.get("aliases", {}).items()}
@@ -58,39 +203,128 @@ class SkillMatcher:
         sem_cfg = cfg.get("semantic", {})
         self.semantic_enabled = bool(sem_cfg.get("enabled", False))
         self.semantic_model_name = sem_cfg.get("model_name", "sentence-transformers/all-MiniLM-L6-v2")
+        self.semantic_backend_options = backend_options(sem_cfg)
+        self.semantic_service_options = service_options(sem_cfg)
 
         # allow override param
         if use_semantic is not None:
             self.semantic_enabled = bool(use_semantic)
 
-        # lazy model loader
-        self._st_model = None
+        # semantic gate: cheap filters, uncertain fuzzy band and per-call budget (off unless configured)
+        self.stop_tokens = {norm_text(x) for x in cfg.get("stop_tokens", [])}
+        gate_cfg = cfg.get("semantic_gate", {})
+        self.gate_enabled = bool(gate_cfg.get("enabled", False))
+        self.gate_min_len = int(gate_cfg.get("min_len", 2))
+        self.gate_max_len = int(gate_cfg.get("max_len", 40))
+        self.gate_max_words = int(gate_cfg.get("max_words", 4))
+        self.gate_require_overlap = bool(gate_cfg.get("require_overlap", True))
+        band = gate_cfg.get("uncertain_band", [0.0, self.fuzzy_ratio])
+        self.gate_band = (float(band[0]), float(band[1]))
+        self.gate_budget = int(gate_cfg.get("budget", 0))     # semantic comparisons per call, 0 = unlimited
+        self._gate_stats = GateStats()
+
+        # pair score cache; semantic scores are keyed by the model that produced them
+        cache_opts = cache_options(cfg.get("pair_cache", {}))
+        self.pair_cache = get_pair_cache(**cache_opts) if cache_opts else None
+        bo = self.semantic_backend_options
+        self.semantic_scorer = f"{bo['kind']}:{bo['model_name']}:{bo['onnx_file'] or ''}"
+
+        # share of match_resume_to_jd calls that build a MatchExplanation (see "explain" config)
+        self.explain_sample_rate = float(os.getenv("MATCH_EXPLAIN_SAMPLE",
+                                                   cfg.get("explain", {}).get("sample_rate", 0.0)))
+
+        # lazy backend loader (backends themselves live in the process-wide cache)
+        self._embedder = None
         self._model_lock = threading.Lock()
-        if self.semantic_enabled and not _HAS_ST:
-            # disable semantic fallback if package missing
-            print("Warning: sentence-transformers not installed. Semantic fallback disabled.")
-            self.semantic_enabled = False
+        # a socket client needs no model packages; the service process loads the backend
+        if self.semantic_enabled and self.semantic_service_options["service"] != "socket":
+            missing = missing_modules(self.semantic_backend_options["kind"])
+            if missing:
+                # disable semantic fallback if packages missing
+                logger.warning("%s not installed for the '%s' embedding backend. Semantic fallback disabled.",
+                               ", ".join(missing), self.semantic_backend_options["kind"])
+                self.semantic_enabled = False
+
+        # vocabulary: canonical engines/families, and alias spellings of them (normalized like canonical_form)
+        self.vocabulary = set(self.aliases.values()) | set(self.families) | set(self.engine_to_families)
+        self.oov = None
+        oov_cfg = cfg.get("oov", {})
+        if oov_cfg.get("enabled", False):
+            from oov_resolver import OOVResolver
+            surfaces = {re.sub(r'[\-_]+', ' ', a).strip(): c for a, c in self.aliases.items()}
+            surfaces.update({v: v for v in self.vocabulary})
+            use_sem = self.semantic_enabled and oov_cfg.get("semantic", True)
+            self.oov = OOVResolver(
+                surfaces,
+                fuzzy_ratio=float(oov_cfg.get("fuzzy_ratio", self.fuzzy_ratio)),
+                fuzzy_candidates=int(oov_cfg.get("fuzzy_candidates", 8)),
+                encode=self._encode if use_sem else None,
+                semantic_cosine=float(oov_cfg.get("semantic_cosine", 0.85)),
+                cache_size=int(oov_cfg.get("cache_size", 50000)),
+                skip=self.stop_tokens,
+            )
+
+        # compiled: read-only tables, and no attribute changes from here on
+        self.aliases = MappingProxyType(self.aliases)
+        self.families = MappingProxyType({f: tuple(engines) for f, engines in self.families.items()})
+        self.engine_to_families = MappingProxyType({e: tuple(fams) for e, fams in self.engine_to_families.items()})
+        self.vocabulary = frozenset(self.vocabulary)
+        self.stop_tokens = frozenset(self.stop_tokens)
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(f"SkillMatcher is immutable once built (tried to set {name!r}); "
+                                 f"build a new one instead")
+        object.__setattr__(self, name, value)
 
     def _ensure_model(self):
-        """Lazy-load the sentence transformer model if needed."""
+        """Lazy-load the embedding backend (or connect to its service) if needed."""
         if not self.semantic_enabled:
             return
-        if self._st_model is None:
+        if self._embedder is None:
             with self._model_lock:
-                if self._st_model is None:
-                    self._st_model = SentenceTransformer(self.semantic_model_name)
+                if self._embedder is None:
+                    # the one write after construction: a process-wide embedder, set once
+                    object.__setattr__(self, "_embedder", get_embedder(self.semantic_backend_options,
+                                                                       **self.semantic_service_options))
 
-    def _canonicalize_token(self, tok: str) -> List[str]:
-        """Return list of canonical tokens for a given token."""
-        if not tok:
-            return []
+    def prepare(self):
+        """Load everything matching needs up front (a reloaded matcher is prepared before it is swapped in)."""
+        self._ensure_model()
+        if self.oov is not None:
+            self.oov.prepare()
+        return self
+
+    def _encode(self, texts: List[str]):
+        self._ensure_model()
+        return self._embedder.encode(texts)
+
+    @staticmethod
+    def surface_form(tok: str) -> str:
+        """Normalized, version-stripped form of a token before alias mapping (independent of the config)."""
         t = norm_text(tok)
         # remove common version markers 
         t = re.sub(r'\bv?\d+(\.\d+)*\b', '', t).strip()
-        t = re.sub(r'[\-_]+', ' ', t).strip()
+        return re.sub(r'[\-_]+', ' ', t).strip()
+
+    def canonical_form(self, tok: str) -> str:
+        """Normalized, version-stripped, alias-mapped form of a token (families not expanded)."""
+        t = self.surface_form(tok)
         # alias mapping
         if t in self.aliases:
             t = self.aliases[t]
+        elif self.oov is not None and t not in self.vocabulary:
+            hit = self.oov.resolve(t)
+            if hit is not None:
+                t = hit[0]
+        return t
+
+    def _canonicalize_token(self, tok: str) -> List[str]:
+        """Return list of canonical tokens for a given token."""
+        if not tok:
+            return []
+        t = self.canonical_form(tok)
         # if token is a family name -> expand
         if t in self.families:
             # return unique list preserving order
@@ -115,6 +349,24 @@ class SkillMatcher:
                     out.append(c)
         return out
 
+    def index_keys(self, toks: List[str]) -> List[str]:
+        """
+        Inverted-index keys of a resume (see rematch.py): the surface, canonical and
+        family-expanded forms of its tokens, so an alias or family edit can find it.
+        """
+        out = []
+        seen = set()
+        for tok in toks:
+            t = self.surface_form(tok)
+            if not t:
+                continue
+            c = self.canonical_form(tok)
+            for k in [t, c] + self._canonicalize_token(tok):
+                if k and k not in seen:
+                    seen.add(k)
+                    out.append(k)
+        return out
+
     def _safe_fuzzy(self, a: str, b: str) -> float:
         """Return SequenceMatcher ratio in 0..1"""
         if not a or not b:
@@ -123,27 +375,164 @@ class SkillMatcher:
         rb = norm_text(b)
         return SequenceMatcher(None, ra, rb).ratio()
 
-    def _semantic_score(self, a: str, b: str) -> float:
-        """Compute semantic cosine similarity using sentence-transformers (0..1)."""
-        if not self.semantic_enabled:
-            return 0.0
-        self._ensure_model()
-        if not self._st_model:
-            return 0.0
-        emb = self._st_model.encode([a, b], convert_to_tensor=True)
-        sim = float(util.cos_sim(emb[0], emb[1]).item())
-        return sim
+    def _fuzzy_scores(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        """_safe_fuzzy of each (a, b) pair, through the pair cache when one is configured."""
+        if self.pair_cache is None:
+            return {p: self._safe_fuzzy(*p) for p in dict.fromkeys(pairs)}
+        # the ratio only depends on the normalized strings
+        norm = {p: (norm_text(p[0]), norm_text(p[1])) for p in dict.fromkeys(pairs)}
+        scores = self.pair_cache.get_many("fuzzy", "difflib", norm.values())
+        new = {key: SequenceMatcher(None, key[0], key[1]).ratio() if key[0] and key[1] else 0.0
+               for key in set(norm.values()) if key not in scores}
+        self.pair_cache.put_many("fuzzy", "difflib", new)
+        scores.update(new)
+        return {p: scores[key] for p, key in norm.items()}
+
+    def _gate_token(self, tok: str) -> bool:
+        """Whether a token is worth embedding: not too short / long, not a stop token, not digits only."""
+        t = norm_text(tok)
+        if not self.gate_min_len <= len(t) <= self.gate_max_len or len(t.split()) > self.gate_max_words:
+            return False
+        return t not in self.stop_tokens and re.search(r'[^\W\d_]', t) is not None
+
+    def _embed_texts(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Embeddings of the resume texts the semantic stage may compare, in one request ({} on failure)."""
+        texts = list(dict.fromkeys(texts))
+        if not texts:
+            return {}
+        try:
+            emb = self._encode(texts)
+        except Exception:
+            return {}
+        return dict(zip(texts, emb))
+
+    def _semantic_scores(self, compare_jds: List[str], cands: List[Tuple[str, str]],
+                         resume_texts: List[Tuple[str, str]], resume_emb: Optional[Dict[str, np.ndarray]]):
+        """
+        Cosines of every (JD text, resume text) pair, as (scores or None on failure, resume_emb).
+        Cached pairs are not encoded again; the resume texts are embedded (once per call,
+        in one request) only when some pair is missing from the cache.
+        """
+        pairs = [(jtxt, rtxt) for _, rtxt in cands for jtxt in compare_jds]
+        scores = {}
+        if self.pair_cache is not None:
+            scores = self.pair_cache.get_many("semantic", self.semantic_scorer, pairs)
+            if len(scores) == len(set(pairs)):
+                return scores, resume_emb
+        if resume_emb is None:
+            resume_emb = self._embed_texts([t for _, t in resume_texts])
+        if not resume_emb:
+            return None, resume_emb
+        try:
+            jd_emb = self._encode(compare_jds)
+        except Exception:
+            return None, resume_emb
+        new = {}
+        for _, rtxt in cands:
+            for jtxt, sem in zip(compare_jds, jd_emb @ resume_emb[rtxt]):
+                if (jtxt, rtxt) not in scores:
+                    new[(jtxt, rtxt)] = float(sem)
+        if self.pair_cache is not None:
+            self.pair_cache.put_many("semantic", self.semantic_scorer, new)
+        scores.update(new)
+        return scores, resume_emb
+
+    def gate_stats(self) -> Dict:
+        """Semantic gate counters since this matcher was built: pairs compared vs gated out, per reason."""
+        st = self._gate_stats.snapshot()
+        st["enabled"] = self.gate_enabled
+        st["uncertain_band"] = list(self.gate_band)
+        st["budget"] = self.gate_budget
+        st["gated_share"] = (1.0 - st["pairs_compared"] / st["pairs_possible"]) if st["pairs_possible"] else 0.0
+        return st
+
+    def _semantic_stage(self, ctx: MatchContext, jd_orig: str, jd_cands: List[str], fuzzy_pairs: int,
+                        best_fuzzy: float) -> Tuple[float, Optional[str], Tuple, int, Optional[str]]:
+        """
+        Semantic fallback for one JD token: compare the JD original and canonical forms with
+        every resume raw token and canonical form the gate lets through.
+        Returns (best cosine, resume token, best pair, pairs compared, gate reason or None).
+        """
+        counts = ctx.counts
+        compare_jds = [jd_orig] + jd_cands
+        gate = self.gate_enabled
+        if ctx.resume_texts is None:
+            ctx.resume_texts = [(raw, t) for raw, rc_list in ctx.resume_map for t in [raw] + rc_list]
+            ctx.n_texts = len(ctx.resume_texts)
+            if gate:
+                ctx.resume_texts = [(raw, t) for raw, t in ctx.resume_texts if self._gate_token(t)]
+                counts["texts_skipped"] = ctx.n_texts - len(ctx.resume_texts)
+                if self.gate_require_overlap:
+                    ctx.resume_grams = {t: set(trigrams(norm_text(t))) for _, t in ctx.resume_texts}
+        resume_texts = ctx.resume_texts
+        possible = ctx.n_texts * len(compare_jds)
+        counts["jd_tokens"] += 1
+        counts["pairs_possible"] += possible
+        cands, gated = resume_texts, None
+        if gate:
+            # cheapest checks first; `possible` shrinks to what each later check would compare
+            compare_jds = [t for t in compare_jds if self._gate_token(t)]
+            kept = len(resume_texts) * len(compare_jds)
+            counts["pairs_gated"]["token"] += possible - kept
+            possible = kept
+            lo, hi = self.gate_band
+            if not kept:
+                gated = "token"
+            elif fuzzy_pairs and not lo <= best_fuzzy <= hi:
+                # only when the fuzzy stage compared something (with OOV on it may have had nothing to compare)
+                gated = "band"
+            elif self.gate_require_overlap:
+                jd_grams = set().union(*(trigrams(norm_text(t)) for t in compare_jds))
+                cands = [(raw, t) for raw, t in resume_texts if ctx.resume_grams[t] & jd_grams]
+                kept = len(cands) * len(compare_jds)
+                counts["pairs_gated"]["overlap"] += possible - kept
+                possible = kept
+                if not kept:
+                    gated = "overlap"
+            if gated is None and self.gate_budget and possible > self.gate_budget - counts["pairs_compared"]:
+                gated = "budget"
+                counts["budget_exhausted"] = 1
+            if gated is not None:
+                counts["jd_gated"][gated] += 1
+                if gated in ("band", "budget"):
+                    counts["pairs_gated"][gated] += possible
+                possible = 0
 
-    def match_resume_to_jd(self, resume_tokens: List[str], jd_tokens: List[str]) -> Dict[str, Tuple[bool, str, Optional[str], float]]:
+        best_sem = 0.0
+        best_raw_sem = None
+        best_sem_pair = (None, None)
+        sem_scores = None
+        if possible:
+            sem_scores, ctx.resume_emb = self._semantic_scores(compare_jds, cands, resume_texts, ctx.resume_emb)
+        if sem_scores is not None:
+            counts["pairs_compared"] += possible
+            # same visiting order (raw token, then its canonicals) and tie-breaking as pairwise scoring
+            for raw_res, rtxt in cands:
+                for jtxt in compare_jds:
+                    sem = sem_scores[(jtxt, rtxt)]
+                    if sem > best_sem:
+                        best_sem = float(sem)
+                        best_raw_sem = raw_res
+                        best_sem_pair = (jtxt, rtxt)
+        return best_sem, best_raw_sem, best_sem_pair, possible, gated
+
+    def match_resume_to_jd(self, resume_tokens: List[str], jd_tokens: List[str],
+                           explain: Optional[bool] = None) -> "MatchResult":
         """
         For each jd token (original string) return tuple:
             (matched_bool, method, matched_resume_token_or_None, score)
         method is one of: 'exact_canonical', 'family_match', 'fuzzy', 'semantic', or None
         score in 0..1 (1.0 exact)
 
-        Debugging: set `matcher.debug = True` to print per-JD matching details.
+        explain=True attaches a MatchExplanation (best candidate and pairs compared
+        per stage) as `result.explanation`; None samples at `explain_sample_rate`.
+        Nothing is built or logged for unexplained calls.
+        Safe to call from many threads at once: per-call state lives in a MatchContext.
         """
-        results: Dict[str, Tuple[bool, str, Optional[str], float]] = {}
+        results = MatchResult(self.config_version)
+        if explain is None:
+            explain = self.explain_sample_rate > 0 and random.random() < self.explain_sample_rate
+        exp = MatchExplanation(self.config_version) if explain else None
 
         # prepare resume canonical map: list of tuples (raw_resume_token, [canonical_forms...])
         resume_map: List[Tuple[str, List[str]]] = []
@@ -152,48 +541,38 @@ class SkillMatcher:
                 continue
             rc_list = self._canonicalize_token(rt)
             resume_map.append((rt, rc_list))
-
-        # print resume_map once if debugging
-        if getattr(self, "debug", False):
-            print("\nDEBUG: resume_map (raw -> canonical list):")
-            for raw, rc_list in resume_map:
-                print(f"  - {raw!r} -> {rc_list}")
-            print("END resume_map\n")
-
+        ctx = MatchContext(resume_map, exp)
+        # fuzzy-stage side of each canonical (see 3 below): vocabulary entry or unresolved token
+        vocab = self.vocabulary if self.oov is not None else None
+        res_sides = [(raw_res, [(rc, vocab is None or rc in vocab) for rc in rc_list])
+                     for raw_res, rc_list in resume_map]
+        if exp is not None:
+            exp.resume_map = resume_map
+            n_resume_canon = ctx.n_resume_canon
         # For each JD skill, attempt match
         for jd in jd_tokens:
             jd_orig = jd
             jd_cands = self._canonicalize_token(jd)
             matched = False
             match_info: Tuple[bool, str, Optional[str], float] = (False, None, None, 0.0)
-
-            if getattr(self, "debug", False):
-                print("="*60)
-                print("DEBUG: Evaluating JD token:", repr(jd_orig))
-                print("  Canonical JD candidates:", jd_cands)
+            jx = exp.add_jd(jd_orig, jd_cands) if exp is not None else None
 
             # 1) exact canonical match or resume canonical in JD canonical
-            if getattr(self, "debug", False):
-                print("  Step 1: exact canonical checks...")
             for raw_res, rc_list in resume_map:
                 for rc in rc_list:
                     if rc in jd_cands:
                         matched = True
                         match_info = (True, "exact_canonical", raw_res, 1.0)
-                        if getattr(self, "debug", False):
-                            print(f"    -> exact_canonical: resume token {raw_res!r} (canonical {rc!r})")
                         break
                 if matched:
                     break
+            if jx is not None:
+                jx.stage("exact_canonical", n_resume_canon, match_info[2], 1.0 if matched else 0.0)
             if matched:
                 results[jd_orig] = match_info
-                if getattr(self, "debug", False):
-                    print(f"  Result for JD token {jd_orig!r}: {match_info}")
                 continue
 
             # 2) family match (JD is a family) OR resume token is family that includes JD engine
-            if getattr(self, "debug", False):
-                print("  Step 2: family checks (both directions)...")
             for raw_res, rc_list in resume_map:
                 family_matched = False
                 for jd_c in jd_cands:
@@ -204,8 +583,6 @@ class SkillMatcher:
                                 matched = True
                                 match_info = (True, "family_match", raw_res, 0.98)
                                 family_matched = True
-                                if getattr(self, "debug", False):
-                                    print(f"    -> family_match: JD family {jd_c!r} matched resume canonical {rc!r} via raw {raw_res!r}")
                                 break
                     if family_matched:
                         break
@@ -216,100 +593,68 @@ class SkillMatcher:
                                 matched = True
                                 match_info = (True, "family_match", raw_res, 0.98)
                                 family_matched = True
-                                if getattr(self, "debug", False):
-                                    print(f"    -> family_match (reverse): resume family {rc!r} contains JD canonical {jd_c!r} via raw {raw_res!r}")
                                 break
                     if family_matched:
                         break
                 if matched:
                     break
+            if jx is not None:
+                jx.stage("family_match", n_resume_canon * len(jd_cands), match_info[2], 0.98 if matched else 0.0)
             if matched:
                 results[jd_orig] = match_info
-                if getattr(self, "debug", False):
-                    print(f"  Result for JD token {jd_orig!r}: {match_info}")
                 continue
 
             # 3) fuzzy match between jd canonical names and resume canonical names
-            if getattr(self, "debug", False):
-                print("  Step 3: fuzzy matching between canonicals...")
             best_score = 0.0
             best_raw = None
             best_pair = (None, None)  # (jd_c, rc) best canonical pair
-            for raw_res, rc_list in resume_map:
-                for rc in rc_list:
-                    for jd_c in jd_cands:
-                        try:
-                            score = self._safe_fuzzy(jd_c, rc)
-                        except Exception:
-                            score = 0.0
+            pairs = 0
+            # With the OOV resolver on, a token still unresolved had no vocabulary entry within
+            # fuzzy range among its trigram candidates, so pairs of one unresolved token and one
+            # vocabulary entry are skipped (a near entry outside the top candidates is missed).
+            # Two vocabulary entries (preact / react, css / scss) and two unresolved tokens are
+            # still compared.
+            jd_sides = [(jd_c, vocab is None or jd_c in vocab) for jd_c in jd_cands]
+            try:
+                fuzzy = self._fuzzy_scores([(jd_c, rc) for _, rcs in res_sides for rc, rs in rcs
+                                            for jd_c, js in jd_sides if js == rs])
+            except Exception:
+                fuzzy = {}
+            for raw_res, rcs in res_sides:
+                for rc, rs in rcs:
+                    for jd_c, js in jd_sides:
+                        if js != rs:
+                            continue
+                        pairs += 1
+                        score = fuzzy.get((jd_c, rc), 0.0)
                         if score > best_score:
                             best_score = score
                             best_raw = raw_res
                             best_pair = (jd_c, rc)
-            if getattr(self, "debug", False):
-                print(f"    best fuzzy candidate pair: jd_c={best_pair[0]!r}, resume_canonical={best_pair[1]!r}, score={best_score:.4f}")
+            if jx is not None:
+                jx.stage("fuzzy", pairs, best_raw, best_score, best_pair)
             if best_score >= self.fuzzy_ratio:
                 results[jd_orig] = (True, "fuzzy", best_raw, float(best_score))
-                if getattr(self, "debug", False):
-                    print(f"  -> fuzzy MATCH chosen for JD {jd_orig!r}: raw={best_raw!r}, score={best_score:.4f}")
                 continue
 
             # 4) semantic fallback (compare jd original & resume raw token and canonical forms)
             if self.semantic_enabled:
-                if getattr(self, "debug", False):
-                    print("  Step 4: semantic fallback (if enabled) ...")
-                best_sem = 0.0
-                best_raw_sem = None
-                best_sem_pair = (None, None)
-                compare_jds = [jd_orig] + jd_cands
-                for raw_res, rc_list in resume_map:
-                    for jtxt in compare_jds:
-                        try:
-                            sem = self._semantic_score(jtxt, raw_res)
-                        except Exception:
-                            sem = 0.0
-                        if sem > best_sem:
-                            best_sem = sem
-                            best_raw_sem = raw_res
-                            best_sem_pair = (jtxt, raw_res)
-                    for rc in rc_list:
-                        for jtxt in compare_jds:
-                            try:
-                                sem2 = self._semantic_score(jtxt, rc)
-                            except Exception:
-                                sem2 = 0.0
-                            if sem2 > best_sem:
-                                best_sem = sem2
-                                best_raw_sem = raw_res
-                                best_sem_pair = (jtxt, rc)
-                if getattr(self, "debug", False):
-                    print(f"    best semantic candidate: pair={best_sem_pair}, score={best_sem:.4f}")
+                best_sem, best_raw_sem, best_sem_pair, possible, gated = self._semantic_stage(
+                    ctx, jd_orig, jd_cands, pairs, best_score)
+                if jx is not None:
+                    jx.stage("semantic", possible, best_raw_sem, best_sem, best_sem_pair, gated)
                 if best_sem >= self.semantic_cosine:
                     results[jd_orig] = (True, "semantic", best_raw_sem, float(best_sem))
-                    if getattr(self, "debug", False):
-                        print(f"  -> semantic MATCH chosen for JD {jd_orig!r}: raw={best_raw_sem!r}, score={best_sem:.4f}")
                     continue
 
             # 5) no match
             results[jd_orig] = (False, None, None, 0.0)
-            if getattr(self, "debug", False):
-                print(f"  -> no match for JD token {jd_orig!r}.\n")
-
-        # optionally print a compact summary of results
-        if getattr(self, "debug", False):
-            print("\nDEBUG: match_resume_to_jd results summary:")
-            matched_list = []
-            for jd, info in results.items():
-                matched, method, raw, score = info
-                print(f"  JD token: {jd!r}  -> matched={matched}, method={method}, raw={raw!r}, score={score}")
-                if matched:
-                    matched_list.append((jd, method, raw, score))
-            print(f"\nTotal matched JD tokens: {len(matched_list)}")
-            if matched_list:
-                print("Matched tokens (jd_token, method, resume_token, score):")
-                for x in matched_list:
-                    print(" ", x)
-            print("="*60 + "\n")
 
+        if ctx.counts["jd_tokens"]:
+            self._gate_stats.add(ctx.counts)
+        if exp is not None:
+            exp.results = results
+            results.explanation = exp
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("match explanation:\n%s", exp.format())
         return results
-
@@ -0,0 +1,96 @@
+# skill_search.py
+"""
+Ranked skill search over a company's rows of selected_candidates.
+- Query skills are canonicalized with the same SkillMatcher used for screening
+- Candidate rows are pre-filtered through the GIN index on `skill_keys`
+  (`&&` for "any of", `@>` for "all of") and the company's id
+- Ranked by summed skill weight (default 1.0 per skill, i.e. matched-skill count)
+
+Usage:
+    from skill_search import search_candidates
+    rows = search_candidates(cursor, "Acme", ["React", "AWS"], match="all", limit=20)
+"""
+
+from typing import Dict, List, Optional
+
+from psycopg2 import sql
+
+from saving import normalize_skill_keys
+from tenant_store import SELECTED_TABLE, company_id
+
+MATCH_MODES = ("any", "all")
+
+
+def _query_keys(skills: List[str], weights: Optional[Dict[str, float]], canonicalize: bool):
+    """Return (keys, weights) aligned lists for the query, canonicalized when possible."""
+    keys: List[str] = []
+    key_weights: List[float] = []
+    seen = set()
+    matcher = None
+    if canonicalize:
+        from extract_details import get_matcher
+        matcher = get_matcher()
+    weights = {k.lower(): float(v) for k, v in (weights or {}).items()}
+    for s in skills:
+        w = weights.get(s.lower(), 1.0)
+        forms = matcher.canonicalize_list([s]) if matcher else [s]
+        for k in normalize_skill_keys(forms):
+            if k not in seen:
+                seen.add(k)
+                keys.append(k)
+                key_weights.append(w)
+    return keys, key_weights
+
+
+def search_candidates(cursor, company_name: str, skills: List[str],
+                      weights: Optional[Dict[str, float]] = None, match: str = "any",
+                      limit: int = 20, offset: int = 0, canonicalize: bool = True) -> List[Dict]:
+    """
+    Return selected candidates of `company_name` ranked by matched skills.
+    Each row: id, name, email, phone_no, skills, file_name, matched (count),
+    score (summed weights), matched_skills.
+    `weights` maps a query skill (as passed in) to its weight.
+    """
+    if match not in MATCH_MODES:
+        raise ValueError(f"match must be one of {MATCH_MODES}")
+    keys, key_weights = _query_keys(skills, weights, canonicalize)
+    cid = company_id(cursor, company_name, create=False)
+    if not keys or cid is None:
+        return []
+
+    table = sql.Identifier(SELECTED_TABLE)
+    filter_op = sql.SQL("@>" if match == "all" else "&&")
+    query = sql.SQL("""
+        SELECT c.id, c.name, c.email, c.phone_no, c.skills, c.file_name,
+               m.matched, m.score, m.matched_skills
+        FROM {} AS c
+        CROSS JOIN LATERAL (
+            SELECT count(*) AS matched,
+                   coalesce(sum(q.weight), 0) AS score,
+                   array_agg(q.skill ORDER BY q.weight DESC) AS matched_skills
+            FROM unnest(%s::text[], %s::float8[]) AS q(skill, weight)
+            WHERE q.skill = ANY(c.skill_keys)
+        ) AS m
+        WHERE c.company_id = %s AND c.skill_keys {} %s::text[]
+        ORDER BY m.score DESC, m.matched DESC, c.id
+        LIMIT %s OFFSET %s;
+    """).format(table, filter_op)
+    cursor.execute(query, (keys, key_weights, cid, keys, int(limit), int(offset)))
+    cols = [d[0] for d in cursor.description]
+    return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+
+def count_candidates(cursor, company_name: str, skills: List[str], match: str = "any",
+                     canonicalize: bool = True) -> int:
+    """Total rows matching the filter, for pagination."""
+    if match not in MATCH_MODES:
+        raise ValueError(f"match must be one of {MATCH_MODES}")
+    keys, _ = _query_keys(skills, None, canonicalize)
+    cid = company_id(cursor, company_name, create=False)
+    if not keys or cid is None:
+        return 0
+    filter_op = sql.SQL("@>" if match == "all" else "&&")
+    query = sql.SQL("SELECT count(*) FROM {} WHERE company_id = %s AND skill_keys {} %s::text[];").format(
+        sql.Identifier(SELECTED_TABLE), filter_op)
+    cursor.execute(query, (cid, keys))
+    return int(cursor.fetchone()[0])
@@ -0,0 +1,277 @@
+# tenant_store.py
+"""
+Data access for the shared multi-tenant tables.
+- companies:            one row per tenant (id, name); every other row is keyed by company_id
+- jobs:                 (company_id, job_title) unique, replaces the per-company "<company>" tables
+- selected_candidates:  replaces "<company>_selected"; btree on (company_id, id) for
+                        listings and downloads, GIN on skill_keys for skill_search.
+                        One row per candidate: unique on (company_id, email_key), and
+                        a selection with a known email - or a known phone under another
+                        address - merges its skills and file into that row
+- With TENANT_PARTITIONED=1 the two data tables are created LIST-partitioned by
+  company_id with a default partition; large tenants can be split into their own
+  partition later (python migrate_tenants.py partition Acme)
+- Per-company legacy tables are copied across by migrate_tenants.py
+
+Every function takes a psycopg2 cursor; the caller owns the transaction. The
+tables themselves are created once per process on a connection of their own and
+committed there, so a caller rolling back cannot undo them.
+
+Config (env):
+    TENANT_PARTITIONED      "1" creates jobs / selected_candidates partitioned (only
+                            when the tables do not exist yet)
+
+Usage:
+    cid = company_id(cursor, "Acme")
+    add_job(cursor, "Acme", "Backend Engineer", "python, sql, aws")
+    jobs = list_jobs(cursor, "Acme")
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+COMPANIES_TABLE = "companies"
+JOBS_TABLE = "jobs"
+SELECTED_TABLE = "selected_candidates"
+
+TENANT_PARTITIONED = os.getenv("TENANT_PARTITIONED", "0") == "1"
+
+_TABLES_READY = False
+_TABLES_LOCK = threading.Lock()
+# company name -> id of committed rows; company rows are never deleted, so entries cannot go stale
+_COMPANY_IDS: Dict[str, int] = {}
+_COMPANY_IDS_LOCK = threading.Lock()
+
+def ensure_tenant_tables(partitioned: Optional[bool] = None):
+    """Create the shared tables (once per process, committed on a connection of their own)."""
+    global _TABLES_READY
+    if _TABLES_READY:
+        return
+    from extract_details import _get_db_connection
+
+    with _TABLES_LOCK:
+        if _TABLES_READY:
+            return
+        conn = _get_db_connection()
+        try:
+            cursor = conn.cursor()
+            _create_tenant_tables(cursor, TENANT_PARTITIONED if partitioned is None else partitioned)
+            cursor.close()
+            conn.commit()
+        finally:
+            conn.close()
+        _TABLES_READY = True
+
+def _create_tenant_tables(cursor, partitioned: bool):
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) UNIQUE NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """).format(sql.Identifier(COMPANIES_TABLE)))
+
+    # a partitioned table's primary key has to include the partition key
+    if partitioned:
+        key = sql.SQL("id BIGSERIAL, company_id INTEGER NOT NULL, ")
+        pk = sql.SQL(", PRIMARY KEY (company_id, id)")
+        tail = sql.SQL(" PARTITION BY LIST (company_id)")
+    else:
+        key = sql.SQL("id BIGSERIAL PRIMARY KEY, company_id INTEGER NOT NULL, ")
+        pk = sql.SQL("")
+        tail = sql.SQL("")
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            {}
+            job_title VARCHAR(255) NOT NULL,
+            job_description TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            UNIQUE (company_id, job_title){}
+        ){};
+    """).format(sql.Identifier(JOBS_TABLE), key, pk, tail))
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {} (
+            {}
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            phone_no VARCHAR(20) NOT NULL,
+            skills TEXT[] NOT NULL,
+            skill_keys TEXT[] NOT NULL DEFAULT '{{}}',
+            file_name TEXT NOT NULL,
+            file_data BYTEA NOT NULL,
+            selected_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            email_key VARCHAR(255) NOT NULL DEFAULT '',
+            phone_key VARCHAR(20) NOT NULL DEFAULT '',
+            submissions INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(){}
+        ){};
+    """).format(sql.Identifier(SELECTED_TABLE), key, pk, tail))
+    # tables created before candidate identity resolution
+    cursor.execute(sql.SQL("""
+        ALTER TABLE {} ADD COLUMN IF NOT EXISTS email_key VARCHAR(255) NOT NULL DEFAULT '',
+            ADD COLUMN IF NOT EXISTS phone_key VARCHAR(20) NOT NULL DEFAULT '',
+            ADD COLUMN IF NOT EXISTS submissions INTEGER NOT NULL DEFAULT 1,
+            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+    """).format(sql.Identifier(SELECTED_TABLE)))
+    if partitioned:
+        for table in (JOBS_TABLE, SELECTED_TABLE):
+            cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT;").format(
+                sql.Identifier(table + "_default"), sql.Identifier(table)))
+    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (company_id, id);").format(
+        sql.Identifier(SELECTED_TABLE + "_company_idx"), sql.Identifier(SELECTED_TABLE)))
+    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (company_id, lower(email));").format(
+        sql.Identifier(SELECTED_TABLE + "_email_idx"), sql.Identifier(SELECTED_TABLE)))
+    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} USING GIN (skill_keys);").format(
+        sql.Identifier(SELECTED_TABLE + "_skill_keys_gin"), sql.Identifier(SELECTED_TABLE)))
+    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} (company_id, phone_key);").format(
+        sql.Identifier(SELECTED_TABLE + "_phone_key_idx"), sql.Identifier(SELECTED_TABLE)))
+    # rows selected before identity resolution may hold duplicates; they are merged by
+    # `python migrate_tenants.py dedup`, which creates the index afterwards
+    cursor.execute("SAVEPOINT tenant_identity")
+    try:
+        create_identity_index(cursor)
+        cursor.execute("RELEASE SAVEPOINT tenant_identity")
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT tenant_identity")
+        logger.warning("Unique candidate index not created (%s); run `python migrate_tenants.py dedup`.", e)
+
+def create_identity_index(cursor):
+    cursor.execute(sql.SQL("CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} (company_id, email_key);").format(
+        sql.Identifier(SELECTED_TABLE + "_identity_idx"), sql.Identifier(SELECTED_TABLE)))
+
+
+def company_id(cursor, company_name: str, create: bool = True) -> Optional[int]:
+    """Id of a company, registering it on first use (None if unknown and not `create`)."""
+    cid = _COMPANY_IDS.get(company_name)
+    if cid is not None:
+        return cid
+    ensure_tenant_tables()
+    cursor.execute(sql.SQL("SELECT id FROM {} WHERE name = %s").format(sql.Identifier(COMPANIES_TABLE)),
+                   (company_name,))
+    row = cursor.fetchone()
+    if row is not None:
+        with _COMPANY_IDS_LOCK:
+            _COMPANY_IDS[company_name] = row[0]
+        return row[0]
+    if not create:
+        return None
+    # not cached: the caller's transaction may still roll the new row back
+    # (DO UPDATE rather than NOTHING so RETURNING also covers a concurrent insert)
+    cursor.execute(sql.SQL("""
+        INSERT INTO {} (name) VALUES (%s)
+        ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id;
+    """).format(sql.Identifier(COMPANIES_TABLE)), (company_name,))
+    return cursor.fetchone()[0]
+
+
+# ---------------------------
+# jobs
+# ---------------------------
+def list_jobs(cursor, company_name: str) -> List[Tuple[str, str]]:
+    """(job_title, job_description) of every job of a company, oldest first."""
+    cid = company_id(cursor, company_name, create=False)
+    if cid is None:
+        return []
+    cursor.execute(sql.SQL("SELECT job_title, job_description FROM {} WHERE company_id = %s ORDER BY id")
+                   .format(sql.Identifier(JOBS_TABLE)), (cid,))
+    return cursor.fetchall()
+
+def get_job_description(cursor, company_name: str, job_title: str) -> Optional[str]:
+    cid = company_id(cursor, company_name, create=False)
+    if cid is None:
+        return None
+    cursor.execute(sql.SQL("SELECT job_description FROM {} WHERE company_id = %s AND job_title = %s")
+                   .format(sql.Identifier(JOBS_TABLE)), (cid, job_title))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def add_job(cursor, company_name: str, job_title: str, job_description: str) -> bool:
+    """Insert a job; False if the company already has one with this title."""
+    cid = company_id(cursor, company_name)
+    cursor.execute(sql.SQL("""
+        INSERT INTO {} (company_id, job_title, job_description) VALUES (%s, %s, %s)
+        ON CONFLICT (company_id, job_title) DO NOTHING
+        RETURNING id;
+    """).format(sql.Identifier(JOBS_TABLE)), (cid, job_title, job_description))
+    return cursor.fetchone() is not None
+
+def remove_job(cursor, company_name: str, job_title: str) -> bool:
+    cid = company_id(cursor, company_name, create=False)
+    if cid is None:
+        return False
+    cursor.execute(sql.SQL("DELETE FROM {} WHERE company_id = %s AND job_title = %s RETURNING id")
+                   .format(sql.Identifier(JOBS_TABLE)), (cid, job_title))
+    return cursor.fetchone() is not None
+
+
+# ---------------------------
+# selected candidates
+# ---------------------------
+def candidate_keys(email: str, phone_no: str) -> Tuple[str, str]:
+    """Identity keys of a candidate: trimmed lowercase email, phone as digits (and a leading +)."""
+    return " ".join((email or "").lower().split()), re.sub(r"[^\d+]", "", phone_no or "")
+
+def _merge(old: Sequence[str], new: Sequence[str]) -> List[str]:
+    out = list(old or [])
+    seen = set(out)
+    for s in new:
+        if s not in seen:
+            seen.add(s)
+            out.append(s)
+    return out
+
+def upsert_selected(cursor, company_name: str, name: str, email: str, phone_no: str, skills: Sequence[str],
+                    skill_keys: Sequence[str], file_name: str, file_data: bytes) -> bool:
+    """
+    Record a selected candidate. A candidate already selected under the same email
+    (or the same phone) keeps one row: skills are merged, the file, phone and
+    submission count refreshed. Returns True if a new row was inserted.
+    """
+    cid = company_id(cursor, company_name)
+    email_key, phone_key = candidate_keys(email, phone_no)
+    table = sql.Identifier(SELECTED_TABLE)
+    for _ in range(2):
+        cursor.execute(sql.SQL("""
+            SELECT id, skills, skill_keys FROM {}
+            WHERE company_id = %s AND (email_key = %s OR (phone_key = %s AND phone_key <> ''))
+            ORDER BY CASE WHEN email_key = %s THEN 0 ELSE 1 END, id
+            LIMIT 1 FOR UPDATE;
+        """).format(table), (cid, email_key, phone_key, email_key))
+        row = cursor.fetchone()
+        if row is not None:
+            cursor.execute(sql.SQL("""
+                UPDATE {} SET phone_no = %s, phone_key = %s, skills = %s, skill_keys = %s, file_name = %s,
+                    file_data = %s, submissions = submissions + 1, updated_at = now()
+                WHERE id = %s;
+            """).format(table), (phone_no, phone_key, _merge(row[1], skills), _merge(row[2], skill_keys),
+                                 file_name, file_data, row[0]))
+            return False
+        cursor.execute(sql.SQL("""
+            INSERT INTO {} (company_id, name, email, phone_no, skills, skill_keys, file_name, file_data,
+                            email_key, phone_key)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+            RETURNING id;
+        """).format(table), (cid, name, email, phone_no, list(skills), list(skill_keys), file_name, file_data,
+                             email_key, phone_key))
+        if cursor.fetchone() is not None:
+            return True
+        # a concurrent selection of the same candidate committed first: merge into its row
+    return False
+
+def selected_emails(cursor, company_name: str) -> set:
+    """Lowercased emails of a company's selected candidates."""
+    cid = company_id(cursor, company_name, create=False)
+    if cid is None:
+        return set()
+    cursor.execute(sql.SQL("SELECT lower(email) FROM {} WHERE company_id = %s").format(
+        sql.Identifier(SELECTED_TABLE)), (cid,))
+    return {r[0] for r in cursor.fetchall()}
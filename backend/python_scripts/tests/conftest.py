@@ -0,0 +1,45 @@
+# conftest.py
+"""
+Shared fixtures. The modules under test live flat in backend/python_scripts and
+import each other by bare name, so that directory goes on sys.path.
+
+Run from backend/python_scripts:
+    python -m pytest -q
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# a small skills config: aliases, two families sharing engines, no semantic backend
+SKILLS_CONFIG = {
+    "aliases": {
+        "py": "python", "python3": "python",
+        "reactjs": "react", "react.js": "react",
+        "node": "nodejs", "node.js": "nodejs",
+        "postgresql": "postgres", "k8s": "kubernetes",
+        "mongo": "mongodb",
+    },
+    "families": {
+        "mern": ["mongodb", "express", "react", "nodejs"],
+        "mean": ["mongodb", "express", "angular", "nodejs"],
+    },
+    "thresholds": {"fuzzy_ratio": 0.85},
+    "semantic": {"enabled": False},
+    "stop_tokens": ["team player"],
+}
+
+
+@pytest.fixture
+def skills_config(tmp_path):
+    """Factory: writes SKILLS_CONFIG (top-level sections replaced by `overrides`) and returns its path."""
+    def write(**overrides):
+        cfg = dict(SKILLS_CONFIG, **overrides)
+        path = tmp_path / "skills_config.json"
+        path.write_text(json.dumps(cfg), encoding="utf-8")
+        return str(path)
+    return write
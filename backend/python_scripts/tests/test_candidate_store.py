@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+import candidate_store
+from candidate_store import CandidateStore, skill_digest
+
+DIM = 16
+
+
+def unit(m):
+    m = np.asarray(m, dtype=np.float32)
+    return m / np.linalg.norm(m, axis=-1, keepdims=True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CandidateStore(str(tmp_path / "store"), block_rows=7)
+
+
+def fill(store, n, companies=(1, 2), seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = unit(rng.normal(size=(n, DIM)))
+    ids = list(range(1, n + 1))
+    comps = [companies[i % len(companies)] for i in range(n)]
+    store.upsert(ids, comps, [0] * n, vectors, scorer="test")
+    return ids, comps, vectors
+
+
+def brute_force(vectors, ids, q, k, keep=None):
+    scores = vectors @ q
+    order = [i for i in np.argsort(-scores) if keep is None or keep(i)]
+    return [ids[i] for i in order[:k]]
+
+
+def test_skill_digest_ignores_order_and_repeats():
+    assert skill_digest(["react", "aws", "react"]) == skill_digest(["aws", "react"])
+    assert skill_digest(["react"]) != skill_digest(["reactjs"])
+
+
+def test_exact_search_matches_brute_force(store):
+    ids, _, vectors = fill(store, 100)
+    q = unit(np.random.default_rng(1).normal(size=DIM))
+    got = store.search(q, k=10, exact=True)
+    assert [c for c, _ in got] == brute_force(vectors, ids, q, 10)
+    assert all(a[1] >= b[1] for a, b in zip(got, got[1:]))
+
+
+def test_company_filter(store):
+    ids, comps, vectors = fill(store, 100, companies=(1, 2, 3, 4, 5))
+    q = unit(np.random.default_rng(2).normal(size=DIM))
+    # a sparse filter (1 in 5 rows) takes the gathered-rows path
+    got = store.search(q, k=5, company=3)
+    assert [c for c, _ in got] == brute_force(vectors, ids, q, 5, keep=lambda i: comps[i] == 3)
+    assert store.search(q, k=5, company=99) == []
+
+
+def test_upsert_replaces_and_remove_tombstones(store):
+    ids, comps, vectors = fill(store, 20)
+    target = unit(np.ones(DIM))
+    # candidate 5 moves next to the query: its old row is tombstoned, the new one found
+    store.upsert([5], [comps[4]], [42], target[None, :], scorer="test")
+    assert store.search(target, k=1, exact=True)[0][0] == 5
+    assert store.digest_of(5) == 42
+    assert store.stats()["tombstoned"] == 1
+    assert [c for c, _ in store.search(target, k=30, exact=True)].count(5) == 1
+
+    assert store.remove([5]) == 1
+    assert 5 not in [c for c, _ in store.search(target, k=30, exact=True)]
+    assert store.digest_of(5) is None
+    assert sorted(store.live_candidates()) == [c for c in ids if c != 5]
+
+
+def test_zero_vector_only_tombstones(store):
+    fill(store, 10)
+    assert store.upsert([3], [1], [0], np.zeros((1, DIM), dtype=np.float32), scorer="test") == 0
+    assert 3 not in store.live_candidates()
+
+
+def test_store_is_bound_to_its_model(store):
+    fill(store, 4)
+    with pytest.raises(ValueError):
+        store.upsert([9], [1], [0], unit(np.ones((1, DIM + 1))), scorer="test")
+    with pytest.raises(ValueError):
+        store.upsert([9], [1], [0], unit(np.ones((1, DIM))), scorer="other-model")
+
+
+def test_another_instance_sees_appended_rows(store):
+    fill(store, 10)
+    reader = CandidateStore(store.root)
+    assert reader.stats()["rows"] == 10
+    store.upsert([11], [1], [0], unit(np.ones((1, DIM))), scorer="test")
+    assert reader.search(unit(np.ones(DIM)), k=1)[0][0] == 11
+
+
+def clustered(n, lists, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = unit(rng.normal(size=(lists, DIM)))
+    labels = rng.integers(0, lists, size=n)
+    return unit(centers[labels] + 0.05 * rng.normal(size=(n, DIM))), centers
+
+
+def test_ivf_search(store, monkeypatch):
+    vectors, centers = clustered(600, 8)
+    ids = list(range(1, 601))
+    store.upsert(ids, [1] * 600, [0] * 600, vectors, scorer="test")
+    info = store.train_ivf(lists=8, sample=600, iters=5)
+    assert info["lists"] == 8 and store.meta["ivf_lists"] == 8
+    monkeypatch.setattr(candidate_store, "IVF_MIN_ROWS", 0)
+
+    q = vectors[17]
+    # probing every list is exact; a stored vector finds itself with one probe
+    exact = store.search(q, k=10, exact=True)
+    probed = store.search(q, k=10, nprobe=8)
+    assert [c for c, _ in probed] == [c for c, _ in exact]
+    assert [s for _, s in probed] == pytest.approx([s for _, s in exact])
+    assert store.search(q, k=1, nprobe=1)[0][0] == 18
+
+    # rows added after training are assigned to a list and found through it
+    new = unit(centers[3] + 0.01)
+    store.upsert([1000], [1], [0], new[None, :], scorer="test")
+    assert store.search(new, k=1, nprobe=2)[0][0] == 1000
+
+
+def test_ivf_needs_enough_live_rows(store):
+    fill(store, 5)
+    with pytest.raises(ValueError):
+        store.train_ivf(lists=8)
@@ -0,0 +1,74 @@
+import zipfile
+
+import pytest
+
+from docx_stream import extract_docx_text, iter_docx_lines
+
+NS = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+      'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+
+def para(*runs):
+    return "<w:p>" + "".join(f"<w:r>{r}</w:r>" for r in runs) + "</w:p>"
+
+
+def t(text):
+    return f"<w:t>{text}</w:t>"
+
+
+def part(body):
+    return f'<?xml version="1.0" encoding="UTF-8"?><w:document {NS}><w:body>{body}</w:body></w:document>'
+
+
+def header(body):
+    return f'<?xml version="1.0" encoding="UTF-8"?><w:hdr {NS}>{body}</w:hdr>'
+
+
+@pytest.fixture
+def make_docx(tmp_path):
+    def make(document, headers=()):
+        path = tmp_path / "resume.docx"
+        with zipfile.ZipFile(path, "w") as zf:
+            zf.writestr("word/document.xml", part(document))
+            for i, body in enumerate(headers, start=1):
+                zf.writestr(f"word/header{i}.xml", header(body))
+        return str(path)
+    return make
+
+
+def test_paragraphs_tabs_and_breaks(make_docx):
+    path = make_docx(para(t("Asha"), t(" Rao")) + para() + para(t("Skills"), "<w:tab/>", t("Python"),
+                                                                    "<w:br/>", t("SQL")))
+    assert list(iter_docx_lines(path)) == ["Asha Rao", "Skills\tPython\nSQL"]
+
+
+def test_table_cells_are_read_in_order(make_docx):
+    table = ("<w:tbl><w:tr>"
+             f"<w:tc>{para(t('Email'))}</w:tc><w:tc>{para(t('asha@example.com'))}</w:tc>"
+             "</w:tr></w:tbl>")
+    path = make_docx(para(t("Contact")) + table + para(t("Experience")))
+    assert list(iter_docx_lines(path)) == ["Contact", "Email", "asha@example.com", "Experience"]
+
+
+def test_text_box_is_read_once(make_docx):
+    # a text box sits inside a run of its anchor paragraph; mc:Fallback repeats it for old readers
+    box = para(t("+91 98765 43210"))
+    anchored = ("<w:p><w:r>" + t("Name") + "</w:r><w:r><mc:AlternateContent>"
+                f"<mc:Choice><w:drawing><w:txbxContent>{box}</w:txbxContent></w:drawing></mc:Choice>"
+                f"<mc:Fallback><w:pict><w:txbxContent>{box}</w:txbxContent></w:pict></mc:Fallback>"
+                "</mc:AlternateContent></w:r></w:p>")
+    path = make_docx(anchored + para(t("After")))
+    assert list(iter_docx_lines(path)) == ["+91 98765 43210", "Name", "After"]
+
+
+def test_headers_come_first_and_repeats_are_dropped(make_docx):
+    path = make_docx(para(t("Body")), headers=[para(t("Asha Rao")), para(t("Asha Rao")) + para(t("Page 2"))])
+    assert list(iter_docx_lines(path)) == ["Asha Rao", "Page 2", "Body"]
+    assert list(iter_docx_lines(path, include_headers=False)) == ["Body"]
+
+
+def test_max_chars_stops_early(make_docx):
+    path = make_docx("".join(para(t(f"line {i}")) for i in range(100)))
+    text = extract_docx_text(path, max_chars=20)
+    assert text == "line 0\nline 1\nline 2"
+    assert extract_docx_text(path).count("\n") == 99
@@ -0,0 +1,124 @@
+from collections import Counter
+
+import pytest
+
+from fair_scheduler import FairScheduler
+
+
+def noop():
+    pass
+
+
+def drain(sched, n, done=True):
+    """Dispatch up to n tasks (marking each done unless `done` is False); returns them in order."""
+    out = []
+    for _ in range(n):
+        task = sched.next_task(timeout=0)
+        if task is None:
+            break
+        out.append(task)
+        if done:
+            sched.task_done(task)
+    return out
+
+
+def test_weighted_shares_while_both_tenants_have_work():
+    sched = FairScheduler(weights={"acme": 3}, default_max_concurrency=10)
+    for _ in range(40):
+        sched.submit("acme", noop)
+        sched.submit("globex", noop)
+    served = Counter(t.tenant for t in drain(sched, 40))
+    assert served == {"acme": 30, "globex": 10}
+
+
+def test_equal_weights_alternate():
+    sched = FairScheduler()
+    for _ in range(3):
+        sched.submit("a", noop)
+        sched.submit("b", noop)
+    assert [t.tenant for t in drain(sched, 6)] == ["a", "b", "a", "b", "a", "b"]
+
+
+def test_a_campaign_does_not_starve_a_late_tenant():
+    sched = FairScheduler()
+    for _ in range(2000):
+        sched.submit("bulk-co", noop)
+    drain(sched, 5)
+    sched.submit("small-co", noop)
+    first = [t.tenant for t in drain(sched, 2)]
+    assert "small-co" in first
+
+
+def test_lanes_are_served_in_priority_order():
+    sched = FairScheduler(default_max_concurrency=10)
+    sched.submit("a", noop, lane="bulk")
+    sched.submit("a", noop, lane="mail")
+    sched.submit("b", noop, lane="interactive")
+    assert [t.lane for t in drain(sched, 3)] == ["interactive", "mail", "bulk"]
+
+
+def test_capped_tenant_is_skipped_until_a_task_finishes():
+    sched = FairScheduler(caps={"a": 1})
+    sched.submit("a", noop)
+    sched.submit("a", noop)
+    sched.submit("b", noop)
+    first = sched.next_task(timeout=0)
+    assert first.tenant == "a"
+    # a is at its cap: b goes next, then nothing is dispatchable
+    assert sched.next_task(timeout=0).tenant == "b"
+    assert sched.next_task(timeout=0) is None
+    sched.task_done(first)
+    assert sched.next_task(timeout=0).tenant == "a"
+
+
+def test_task_costlier_than_a_turn_is_still_dispatched():
+    sched = FairScheduler(quantum=1.0)
+    sched.submit("a", noop, cost=5.0)
+    sched.submit("b", noop)
+    tenants = [t.tenant for t in drain(sched, 2)]
+    assert sorted(tenants) == ["a", "b"]
+
+
+def test_report_counts():
+    sched = FairScheduler()
+    sched.submit("a", noop)
+    sched.submit("a", noop, lane="bulk")
+    task = sched.next_task(timeout=0)
+    sched.task_done(task, ok=False)
+    rep = sched.report()
+    assert rep["queued"] == 1 and rep["inflight"] == 0
+    a = rep["tenants"]["a"]
+    assert (a["submitted"], a["dispatched"], a["failed"]) == (2, 1, 1)
+    assert a["queued"] == {"interactive": 0, "mail": 0, "bulk": 1}
+
+
+def test_workers_run_every_task():
+    sched = FairScheduler()
+    ran = []
+    for i in range(20):
+        sched.submit("a" if i % 2 else "b", ran.append, (i,))
+    sched.start(workers=2)
+    try:
+        assert sched.wait_idle(timeout=10)
+    finally:
+        sched.stop()
+    assert sorted(ran) == list(range(20))
+
+
+@pytest.mark.parametrize("kwargs", [{"weights": {"a": 0}}, {"caps": {"a": 0}}, {"default_weight": -1},
+                                    {"default_max_concurrency": 0}])
+def test_invalid_settings_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        FairScheduler(**kwargs)
+
+
+def test_set_tenant_validates_before_changing_anything():
+    sched = FairScheduler()
+    with pytest.raises(ValueError):
+        sched.set_tenant("a", weight=2, max_concurrency=0)
+    assert "a" not in sched.weights and "a" not in sched.caps
+
+
+def test_unknown_lane_is_rejected():
+    with pytest.raises(ValueError):
+        FairScheduler().submit("a", noop, lane="urgent")
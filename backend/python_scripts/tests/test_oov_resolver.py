@@ -0,0 +1,82 @@
+import numpy as np
+
+from oov_resolver import OOVResolver, trigrams
+from skill_matcher import SkillMatcher
+
+SURFACES = {
+    "python": "python", "kubernetes": "kubernetes", "postgres": "postgres", "react": "react",
+    "postgresql": "postgres", "react js": "react",
+}
+
+
+def test_trigrams_are_padded():
+    assert trigrams("go") == ["  g", " go", "go "]
+
+
+def test_fuzzy_resolves_misspellings_to_the_canonical():
+    res = OOVResolver(SURFACES)
+    assert res.resolve("kubernets")[:2] == ("kubernetes", "fuzzy")
+    # an alias spelling resolves to the canonical it stands for
+    assert res.resolve("postgressql")[0] == "postgres"
+    assert res.resolve("cobol") is None
+
+
+def test_fuzzy_nearest_respects_the_ratio():
+    res = OOVResolver(SURFACES, fuzzy_ratio=0.99)
+    assert res.fuzzy_nearest("kubernets") == []
+    assert res.resolve("kubernets") is None
+
+
+def test_skipped_tokens_and_empty_strings_are_not_resolved():
+    res = OOVResolver(SURFACES, skip={"pythn"})
+    assert res.resolve("pythn") is None
+    assert res.resolve("") is None
+
+
+def test_resolutions_are_memoized():
+    res = OOVResolver(SURFACES)
+    for _ in range(3):
+        res.resolve("kubernets")
+    info = res.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
+
+
+def fake_encoder(table):
+    """Encoder returning fixed vectors per string (unknown strings get a zero vector)."""
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([table.get(t, [0.0, 0.0, 0.0]) for t in texts], dtype=np.float32)
+    return encode, calls
+
+
+def test_semantic_fallback_when_fuzzy_finds_nothing():
+    encode, calls = fake_encoder({"python": [1, 0, 0], "kubernetes": [0, 1, 0], "postgres": [0, 0, 1],
+                                  "react": [1, 1, 0], "k8s cluster": [0.1, 2.0, 0.0]})
+    res = OOVResolver(SURFACES, encode=encode, semantic_cosine=0.9)
+    hit = res.resolve("k8s cluster")
+    assert hit[:2] == ("kubernetes", "semantic") and hit[2] > 0.9
+    # below the cosine threshold: unresolved
+    assert res.resolve("mystery") is None
+    # the vocabulary is embedded once, then one call per looked-up token
+    assert calls[0] == sorted(set(SURFACES.values()))
+    assert len(calls) == 3
+
+
+def test_semantic_nearest_ranks_by_cosine():
+    encode, _ = fake_encoder({"python": [1, 0, 0], "kubernetes": [0, 1, 0], "postgres": [0, 0, 1],
+                              "react": [1, 1, 0], "q": [1, 0.2, 0]})
+    top = OOVResolver(SURFACES, encode=encode).semantic_nearest("q", k=2)
+    assert [c for c, _ in top] == ["python", "react"]
+    assert top[0][1] > top[1][1]
+
+
+def test_matcher_canonicalizes_through_the_resolver(skills_config):
+    path = skills_config(oov={"enabled": True})
+    matcher = SkillMatcher(path, use_semantic=False)
+    assert matcher.canonical_form("kubernets") == "kubernetes"
+    assert matcher.canonical_form("reactjss") == "react"
+    # stop tokens are never resolved to a skill
+    assert matcher.canonical_form("team player") == "team player"
+    assert SkillMatcher(skills_config(), use_semantic=False).canonical_form("kubernets") == "kubernets"
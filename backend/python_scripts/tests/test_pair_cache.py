@@ -0,0 +1,64 @@
+from pair_cache import PairScoreCache, cache_options
+
+
+def test_cache_options():
+    assert cache_options({}) is None
+    assert cache_options({"enabled": True, "path": "", "lru_size": 10}) == {
+        "lru_size": 10, "path": None, "flush_every": 512}
+
+
+def test_in_process_tier():
+    cache = PairScoreCache(lru_size=100)
+    cache.put_many("fuzzy", "difflib", {("reactjs", "react"): 0.9})
+    assert cache.get_many("fuzzy", "difflib", [("reactjs", "react"), ("vue", "react")]) == {
+        ("reactjs", "react"): 0.9}
+    # pairs are ordered, and the scorer / method are part of the key
+    assert cache.get_many("fuzzy", "difflib", [("react", "reactjs")]) == {}
+    assert cache.get_many("semantic", "difflib", [("reactjs", "react")]) == {}
+    st = cache.stats()
+    assert (st["lru_hits"], st["misses"], st["shared"]) == (1, 3, False)
+    assert st["by_method"]["fuzzy"] == {"lru_hits": 1, "shared_hits": 0, "misses": 2}
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = PairScoreCache(lru_size=2)
+    cache.put_many("fuzzy", "difflib", {("a", "x"): 0.1, ("b", "x"): 0.2})
+    cache.get_many("fuzzy", "difflib", [("a", "x")])
+    cache.put_many("fuzzy", "difflib", {("c", "x"): 0.3})
+    got = cache.get_many("fuzzy", "difflib", [("a", "x"), ("b", "x"), ("c", "x")])
+    assert got == {("a", "x"): 0.1, ("c", "x"): 0.3}
+
+
+def test_shared_tier_between_caches(tmp_path):
+    path = str(tmp_path / "pairs.sqlite3")
+    writer = PairScoreCache(path=path, flush_every=2)
+    writer.put_many("fuzzy", "difflib", {("k8s", "kubernetes"): 0.5})
+    assert writer.stats()["pending"] == 1
+    # written behind once flush_every scores are pending
+    writer.put_many("fuzzy", "difflib", {("pg", "postgres"): 0.4})
+    assert writer.stats()["written"] == 2
+
+    reader = PairScoreCache(path=path)
+    assert reader.get_many("fuzzy", "difflib", [("k8s", "kubernetes"), ("pg", "postgres"), ("x", "y")]) == {
+        ("k8s", "kubernetes"): 0.5, ("pg", "postgres"): 0.4}
+    # shared hits are promoted to the reader's LRU
+    reader.get_many("fuzzy", "difflib", [("k8s", "kubernetes")])
+    st = reader.stats()
+    assert (st["shared_hits"], st["lru_hits"], st["misses"]) == (2, 1, 1)
+
+
+def test_existing_shared_scores_win(tmp_path):
+    path = str(tmp_path / "pairs.sqlite3")
+    first, second = PairScoreCache(path=path), PairScoreCache(path=path)
+    first.put_many("fuzzy", "difflib", {("a", "b"): 0.1})
+    first.flush()
+    second.put_many("fuzzy", "difflib", {("a", "b"): 0.9})
+    second.flush()
+    assert PairScoreCache(path=path).get_many("fuzzy", "difflib", [("a", "b")]) == {("a", "b"): 0.1}
+
+
+def test_unusable_path_falls_back_to_in_process(tmp_path):
+    cache = PairScoreCache(path=str(tmp_path / "missing" / "pairs.sqlite3"), flush_every=1)
+    cache.put_many("fuzzy", "difflib", {("a", "b"): 0.5})
+    assert cache.get_many("fuzzy", "difflib", [("a", "b")]) == {("a", "b"): 0.5}
+    assert cache.stats()["shared"] is False
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from scoring_engine import ScoringEngine
+from skill_matcher import SkillMatcher
+
+
+@pytest.fixture
+def matcher(skills_config):
+    return SkillMatcher(skills_config(), use_semantic=False)
+
+
+@pytest.fixture
+def engine(matcher):
+    engine = ScoringEngine(matcher)
+    engine.add_jobs([
+        ("frontend", ["react", "nodejs", "python"]),
+        ("fullstack", ["mern"]),
+        ("ops", ["kubernetes", "postgres"]),
+    ])
+    return engine
+
+
+def scores(engine, token_lists):
+    return engine.score_matrix(engine.encode_candidates(token_lists)).tolist()
+
+
+def test_aliases_and_exact_forms(engine):
+    assert scores(engine, [["ReactJS", "py"], ["k8s", "postgresql", "python"]]) == [
+        [2.0, 1.0, 0.0],
+        [1.0, 0.0, 2.0],
+    ]
+
+
+def test_family_closure_works_both_ways(engine):
+    # a "mern" resume covers react and nodejs; an "express" resume satisfies a JD asking for mern
+    assert scores(engine, [["mern"]]) == [[2.0, 1.0, 0.0]]
+    assert scores(engine, [["express"]]) == [[0.0, 1.0, 0.0]]
+    # engines of another family sharing mongodb / express reach mern through them
+    assert scores(engine, [["mean"]])[0][1] == 1.0
+
+
+def test_repeated_jd_tokens_count_once(matcher):
+    engine = ScoringEngine(matcher)
+    engine.add_jobs([("dup", ["react", "react", "reactjs"])])
+    # "react" and "reactjs" stay separate requirements, like match_resume_to_jd's JD-keyed results
+    assert scores(engine, [["react"]]) == [[2.0]]
+
+
+def test_unknown_tokens_are_ignored(engine):
+    assert scores(engine, [["cobol", "", "team player"]]) == [[0.0, 0.0, 0.0]]
+
+
+def test_agrees_with_match_resume_to_jd(matcher):
+    vocab = sorted(set(matcher.aliases) | set(matcher.aliases.values()) | set(matcher.families)
+                   | {e for engines in matcher.families.values() for e in engines})
+    rng = random.Random(7)
+    jobs = [(f"job{j}", rng.sample(vocab, 4)) for j in range(6)]
+    cands = [rng.sample(vocab, rng.randint(0, 6)) for _ in range(50)]
+    engine = ScoringEngine(matcher)
+    engine.add_jobs(jobs)
+    got = scores(engine, cands)
+    for i, toks in enumerate(cands):
+        for j, (_, jd) in enumerate(jobs):
+            res = matcher.match_resume_to_jd(toks, jd)
+            want = sum(1 for m, method, _, _ in res.values() if m and method in ("exact_canonical", "family_match"))
+            assert got[i][j] == want, (toks, jd, res)
+
+
+def test_top_k_streams_blocks(engine):
+    cands = [["python"], ["react", "nodejs", "python"], [], ["mern"], ["react"]]
+    top = engine.top_k(cands, k=2, block_size=2)
+    assert top[0] == [(1, 3.0), (3, 2.0)]
+    # three candidates tie for the mern job: any two of them, lower ids first
+    assert [s for _, s in top[1]] == [1.0, 1.0]
+    assert {c for c, _ in top[1]} <= {1, 3, 4} and top[1][0][0] < top[1][1][0]
+    assert top[2] == []
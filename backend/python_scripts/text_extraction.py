@@ -0,0 +1,63 @@
+# text_extraction.py
+"""
+In-process PDF / DOCX text extraction.
+- Kept free of spaCy, the DB driver and the matcher, so parse_sandbox worker
+  processes start quickly and stay small
+- Errors are logged and yield "" (the screening pipeline rejects with "no_text")
+
+Usage:
+    from text_extraction import extract_text_from_file
+    text = extract_text_from_file("resume.pdf", max_chars=3000)
+"""
+
+import logging
+from typing import Optional
+
+import pdfplumber
+from docx import Document
+
+from docx_stream import extract_docx_text
+
+logger = logging.getLogger(__name__)
+
+
+def extract_text_from_pdf(path: str, max_chars: Optional[int] = None) -> str:
+    try:
+        text = ""
+        with pdfplumber.open(path) as pdf:
+            for page in pdf.pages:
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
+                if max_chars is not None and len(text) >= max_chars:
+                    break
+        logger.debug("PDF %s: %d chars extracted", path, len(text))
+        return text
+    except Exception as e:
+        logger.warning("PDF text extraction error (%s): %s", path, e)
+        return ""
+
+def extract_text_from_docx(path: str, max_chars: Optional[int] = None) -> str:
+    # streaming XML path (includes tables, text boxes and headers); python-docx as fallback
+    try:
+        text = extract_docx_text(path, max_chars)
+        logger.debug("DOCX %s: %d chars extracted", path, len(text))
+        return text
+    except Exception as e:
+        logger.warning("DOCX stream extraction error (%s), falling back to python-docx: %s", path, e)
+    try:
+        doc = Document(path)
+        text = "\n".join([p.text for p in doc.paragraphs if p.text])
+        logger.debug("DOCX %s: %d chars extracted (python-docx)", path, len(text))
+        return text
+    except Exception as e:
+        logger.warning("DOCX extraction error (%s): %s", path, e)
+        return ""
+
+def extract_text_from_file(path: str, max_chars: Optional[int] = None) -> str:
+    p = path.lower()
+    if p.endswith(".pdf"):
+        return extract_text_from_pdf(path, max_chars)
+    if p.endswith(".docx") or p.endswith(".doc"):
+        return extract_text_from_docx(path, max_chars)
+    return ""
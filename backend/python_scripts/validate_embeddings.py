@@ -0,0 +1,169 @@
+# validate_embeddings.py
+"""
+Compare embedding backends against the reference on our skill vocabulary.
+- Vocabulary: every canonical engine / family and alias spelling in skills_config.json
+- Each backend runs in a fresh (spawned) process, so load time, peak RSS and
+  imported modules (torch or not) are measured in isolation
+- Agreement with the reference backend:
+    cosine      per-token cosine between the two embeddings of the same token
+    top1        share of tokens whose nearest vocabulary neighbour is unchanged
+    decision    share of sampled token pairs on the same side of semantic_cosine
+- Throughput: vocabulary tokens encoded per second (best of --repeat runs)
+
+Usage:
+    python validate_embeddings.py
+    python validate_embeddings.py --backends torch onnx_int8 --json embeddings_report.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from embedding_backends import BACKENDS, backend_options, missing_modules
+
+DEFAULT_CONFIG = os.getenv("SKILLS_CONFIG", "skills_config.json")
+
+
+def load_vocabulary(config_path: str) -> List[str]:
+    with open(config_path, "r", encoding="utf-8") as fh:
+        cfg = json.load(fh)
+    vocab = {k.lower() for k in cfg.get("aliases", {})} | {v.lower() for v in cfg.get("aliases", {}).values()}
+    for fam, engines in cfg.get("families", {}).items():
+        vocab.add(fam.lower())
+        vocab.update(e.lower() for e in engines)
+    return sorted(v for v in vocab if v)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _measure(opts: Dict, texts: List[str], repeat: int, out_path: str) -> Dict:
+    """Runs in a spawned child: load one backend, encode the vocabulary, report timings."""
+    from embedding_backends import get_backend
+
+    rss_start = _peak_rss_mb()
+    t0 = time.perf_counter()
+    backend = get_backend(**opts)
+    backend.encode(texts[:8])   # first call allocates buffers / lazy graph init
+    load_s = time.perf_counter() - t0
+    best = float("inf")
+    emb = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        emb = backend.encode(texts)
+        best = min(best, time.perf_counter() - t0)
+    np.save(out_path, emb)
+    return {
+        "backend": backend.describe(),
+        "load_s": load_s,
+        "tokens_per_s": len(texts) / best if best > 0 else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_start_mb": rss_start,
+        "torch_imported": "torch" in sys.modules,
+    }
+
+
+def agreement(ref: np.ndarray, emb: np.ndarray, threshold: float, pairs: int, seed: int) -> Dict:
+    if ref.shape != emb.shape:
+        return {"cosine_mean": None, "cosine_min": None, "top1": None, "decision": None}
+    cos = np.sum(ref * emb, axis=1)
+
+    # nearest neighbour (excluding the token itself) in each space
+    def nn(x):
+        sims = x @ x.T
+        np.fill_diagonal(sims, -np.inf)
+        return sims.argmax(axis=1)
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, len(ref), pairs)
+    b = rng.integers(0, len(ref), pairs)
+    ref_pair = np.sum(ref[a] * ref[b], axis=1) >= threshold
+    emb_pair = np.sum(emb[a] * emb[b], axis=1) >= threshold
+    return {
+        "cosine_mean": float(cos.mean()),
+        "cosine_min": float(cos.min()),
+        "cosine_p01": float(np.percentile(cos, 1)),
+        "top1": float(np.mean(nn(ref) == nn(emb))),
+        "decision": float(np.mean(ref_pair == emb_pair)),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--config", default=DEFAULT_CONFIG)
+    ap.add_argument("--backends", nargs="*", default=list(BACKENDS), choices=BACKENDS)
+    ap.add_argument("--reference", default="torch", choices=BACKENDS)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--pairs", type=int, default=20000, help="sampled token pairs for decision agreement")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as fh:
+        cfg = json.load(fh)
+    threshold = float(cfg.get("thresholds", {}).get("semantic_cosine", 0.75))
+    base_opts = backend_options(cfg.get("semantic", {}))
+    texts = load_vocabulary(args.config)
+    print(f"{len(texts)} vocabulary tokens, model {base_opts['model_name']}, threshold {threshold}")
+
+    kinds = [args.reference] + [k for k in args.backends if k != args.reference]
+    ctx = mp.get_context("spawn")
+    report: Dict[str, Dict] = {}
+    embeddings: Dict[str, np.ndarray] = {}
+    for kind in kinds:
+        missing = missing_modules(kind)
+        if missing:
+            print(f"{kind:11s} skipped: {', '.join(missing)} not installed")
+            continue
+        opts = dict(base_opts, kind=kind)
+        # the configured onnx_file belongs to the configured backend only
+        if kind != base_opts["kind"]:
+            opts["onnx_file"] = None
+        out_path = os.path.join(os.getenv("TMPDIR", "/tmp"), f"embeddings_{os.getpid()}_{kind}.npy")
+        try:
+            with ctx.Pool(1) as pool:
+                report[kind] = pool.apply(_measure, (opts, texts, args.repeat, out_path))
+            embeddings[kind] = np.load(out_path)
+        except Exception as e:
+            print(f"{kind:11s} failed: {e}")
+            continue
+        finally:
+            if os.path.exists(out_path):
+                os.remove(out_path)
+
+    ref = embeddings.get(args.reference)
+    if ref is None:
+        print(f"Reference backend '{args.reference}' unavailable; reporting speed/RSS only.")
+    print(f"\n{'backend':11s} {'load s':>7s} {'tok/s':>9s} {'RSS MB':>7s} {'torch':>5s} "
+          f"{'cos mean':>8s} {'cos min':>8s} {'top1':>6s} {'decide':>7s}")
+    for kind, r in report.items():
+        if ref is not None:
+            r.update(agreement(ref, embeddings[kind], threshold, args.pairs, args.seed))
+
+        def fmt(v, f):
+            return format(v, f) if v is not None else "n/a"
+        print(f"{kind:11s} {r['load_s']:7.2f} {r['tokens_per_s']:9.0f} {r['peak_rss_mb']:7.0f} "
+              f"{'yes' if r['torch_imported'] else 'no':>5s} "
+              f"{fmt(r.get('cosine_mean'), '8.4f'):>8s} {fmt(r.get('cosine_min'), '8.4f'):>8s} "
+              f"{fmt(r.get('top1'), '6.3f'):>6s} {fmt(r.get('decision'), '7.4f'):>7s}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"reference": args.reference, "threshold": threshold, "tokens": len(texts),
+                       "backends": report}, fh, indent=2)
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,6 @@ const express = require('express');
 const cors = require('cors');
 const axios = require('axios');
 const { Pool } = require('pg');
-const format = require('pg-format');
 const imap = require('imap-simple');
 const jwt = require('jsonwebtoken');
 const cookieParser = require('cookie-parser');
@@ -75,6 +74,54 @@ pool.query(createUsersTableQuery)
   .then(() => console.log('Users table ready'))
   .catch(err => console.error('Error creating users table:', err));
 
+// Shared tenant tables (same DDL as python_scripts/tenant_store.py); jobs and
+// selected candidates of every company live here, keyed by company_id
+const createTenantTablesQuery = `
+CREATE TABLE IF NOT EXISTS companies (
+  id SERIAL PRIMARY KEY,
+  name VARCHAR(255) UNIQUE NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS jobs (
+  id BIGSERIAL PRIMARY KEY,
+  company_id INTEGER NOT NULL,
+  job_title VARCHAR(255) NOT NULL,
+  job_description TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  UNIQUE (company_id, job_title)
+);
+CREATE TABLE IF NOT EXISTS selected_candidates (
+  id BIGSERIAL PRIMARY KEY,
+  company_id INTEGER NOT NULL,
+  name VARCHAR(255) NOT NULL,
+  email VARCHAR(255) NOT NULL,
+  phone_no VARCHAR(20) NOT NULL,
+  skills TEXT[] NOT NULL,
+  skill_keys TEXT[] NOT NULL DEFAULT '{}',
+  file_name TEXT NOT NULL,
+  file_data BYTEA NOT NULL,
+  selected_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  email_key VARCHAR(255) NOT NULL DEFAULT '',
+  phone_key VARCHAR(20) NOT NULL DEFAULT '',
+  submissions INTEGER NOT NULL DEFAULT 1,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+ALTER TABLE selected_candidates ADD COLUMN IF NOT EXISTS email_key VARCHAR(255) NOT NULL DEFAULT '',
+  ADD COLUMN IF NOT EXISTS phone_key VARCHAR(20) NOT NULL DEFAULT '',
+  ADD COLUMN IF NOT EXISTS submissions INTEGER NOT NULL DEFAULT 1,
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();
+CREATE INDEX IF NOT EXISTS selected_candidates_company_idx ON selected_candidates (company_id, id);
+CREATE INDEX IF NOT EXISTS selected_candidates_email_idx ON selected_candidates (company_id, lower(email));
+CREATE INDEX IF NOT EXISTS selected_candidates_skill_keys_gin ON selected_candidates USING GIN (skill_keys);
+CREATE INDEX IF NOT EXISTS selected_candidates_phone_key_idx ON selected_candidates (company_id, phone_key);
+`;
+// The unique (company_id, email_key) index is created by the Python side once
+// older duplicates are merged (python_scripts/migrate_tenants.py dedup).
+
+pool.query(createTenantTablesQuery)
+  .then(() => console.log('Tenant tables ready'))
+  .catch(err => console.error('Error creating tenant tables:', err));
+
 // Start email listener if users exist
 async function checkUsersAndStartListener() {
   const checkQuery = `SELECT * FROM users`;
@@ -244,7 +291,6 @@ app.delete('/deleteAccount', async (req, res) => {
   }
 
   const company = userResult.rows[0].company;
-  const tableName = company  // Ensure correct table format
 
   // Delete the user first
   let deleteResult;
@@ -260,22 +306,22 @@ app.delete('/deleteAccount', async (req, res) => {
     return res.status(404).json({ message: 'User not found' });
   }
 
-  // Drop the company table after deleting the user
+  // Delete the company's jobs and selected candidates after deleting the user
+  // (the companies row stays: the Python workers cache company ids)
   try {
-    const dropTableQuery = format(`DROP TABLE IF EXISTS %I CASCADE;`, tableName);
-    await pool.query(dropTableQuery);
+    await pool.query(
+      'DELETE FROM jobs USING companies c WHERE jobs.company_id = c.id AND c.name = $1', [company]);
   } catch (error) {
-    console.error('Error deleting table:', error);
-    return res.status(500).json({ error: 'Failed to delete company table.' });
+    console.error('Error deleting jobs:', error);
+    return res.status(500).json({ error: 'Failed to delete company jobs.' });
   }
-  selectedTableName = company + '_selected';
-  // Drop the company_selected table after deleting the user
   try {
-    const dropTableQuery = format(`DROP TABLE IF EXISTS %I CASCADE;`, selectedTableName);
-    await pool.query(dropTableQuery);
+    await pool.query(
+      'DELETE FROM selected_candidates USING companies c WHERE selected_candidates.company_id = c.id AND c.name = $1',
+      [company]);
   } catch (error) {
-    console.error('Error deleting table:', error);
-    return res.status(500).json({ error: 'Failed to delete company_selected table.' });
+    console.error('Error deleting selected candidates:', error);
+    return res.status(500).json({ error: 'Failed to delete selected candidates.' });
   }
   return res.status(200).json({ message: `Account and all the data deleted successfully` });
 });
@@ -296,11 +342,15 @@ app.get('/getJobs', async (req, res) => {
       return res.status(404).json({ error: 'User not found.' });
     }
     const company = userResult.rows[0].company;
-    const tableName = company;
     
-    // Retrieve all jobs from the company table
-    const jobsQuery = `SELECT * FROM "${tableName}";`;
-    const jobsResult = await pool.query(jobsQuery);
+    // Retrieve all jobs of the company
+    const jobsQuery = `
+      SELECT j.id, j.job_title, j.job_description
+      FROM jobs j JOIN companies c ON c.id = j.company_id
+      WHERE c.name = $1
+      ORDER BY j.id;
+    `;
+    const jobsResult = await pool.query(jobsQuery, [company]);
     return res.status(200).json({ jobs: jobsResult.rows });
     
   } catch (error) {
@@ -323,10 +373,14 @@ app.get('/api/download/:id', async (req, res) => {
     return res.status(404).json({ error: 'User not found.' });
   }
   const company = userResult.rows[0].company;
-  const tableName = format(company + '_selected');
   try {
-    const query = format('SELECT file_name, file_data FROM %I WHERE id = $1', tableName);
-    const result = await pool.query(query, [fileId]);
+    // scoped to the user's company, so ids of other tenants are not downloadable
+    const query = `
+      SELECT s.file_name, s.file_data
+      FROM selected_candidates s JOIN companies c ON c.id = s.company_id
+      WHERE c.name = $1 AND s.id = $2;
+    `;
+    const result = await pool.query(query, [company, fileId]);
     if (result.rows.length === 0) {
       return res.status(404).json({ error: 'File not found' });
     }
@@ -372,11 +426,16 @@ app.get('/getSelected', async (req, res) => {
       return res.status(404).json({ error: 'User not found.' });
     }
     const company = userResult.rows[0].company;
-    const tableName = format(company + '_selected');
     
-    // Retrieve all selected from the company table
-    const selectedQuery = `SELECT * FROM "${tableName}";`;
-    const selectedResult = await pool.query(selectedQuery);
+    // Retrieve all selected candidates of the company (files are fetched through /api/download)
+    const selectedQuery = `
+      SELECT s.id, s.name, s.email, s.phone_no, s.skills, s.skill_keys, s.file_name, s.selected_at,
+             s.submissions, s.updated_at
+      FROM selected_candidates s JOIN companies c ON c.id = s.company_id
+      WHERE c.name = $1
+      ORDER BY s.id;
+    `;
+    const selectedResult = await pool.query(selectedQuery, [company]);
     
     return res.status(200).json({ selected: selectedResult.rows });
     
@@ -402,25 +461,24 @@ app.post('/addJob', async (req, res) => {
       return res.status(404).json({ error: 'User not found.' });
     }
     const company = userResult.rows[0].company;
-    const tableName = company;
-    
-    // Create a table for the company if it does not exist
-    const createTableQuery = `
-      CREATE TABLE IF NOT EXISTS "${tableName}" (
-        id SERIAL PRIMARY KEY,
-        job_title VARCHAR(255) UNIQUE NOT NULL,
-        job_description TEXT NOT NULL
-      );
-    `;
-    await pool.query(createTableQuery);
     
-    // Insert the new job into the company table
+    // Insert the new job, registering the company on its first job
     const insertJobQuery = `
-      INSERT INTO "${tableName}" (job_title, job_description)
-      VALUES ($1, $2)
-      RETURNING *;
+      WITH c AS (
+        INSERT INTO companies (name) VALUES ($1)
+        ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+        RETURNING id
+      )
+      INSERT INTO jobs (company_id, job_title, job_description)
+      SELECT id, $2, $3 FROM c
+      RETURNING id, job_title, job_description;
     `;
-    const jobResult = await pool.query(insertJobQuery, [jobTitle, jobDescription]);
+    const jobResult = await pool.query(insertJobQuery, [company, jobTitle, jobDescription]);
+
+    // Match earlier applicants against the new job (fire-and-forget)
+    axios.post(`${PYTHON_API}/rescreen`, { company, job_title: jobTitle })
+      .catch(err => console.error('Error triggering re-screen:', err.message));
+
     return res.status(201).json({ job: jobResult.rows[0] });
     
   } catch (error) {
@@ -445,15 +503,14 @@ app.post('/removeJob', async (req, res) => {
       return res.status(404).json({ error: 'User not found.' });
     }
     const company = userResult.rows[0].company;
-    const tableName = company;
     
     // Delete the job with the matching job title
     const deleteJobQuery = `
-      DELETE FROM "${tableName}"
-      WHERE job_title = $1
-      RETURNING *;
+      DELETE FROM jobs USING companies c
+      WHERE jobs.company_id = c.id AND c.name = $1 AND jobs.job_title = $2
+      RETURNING jobs.id;
     `;
-    const deleteResult = await pool.query(deleteJobQuery, [jobTitle]);
+    const deleteResult = await pool.query(deleteJobQuery, [company, jobTitle]);
     if (deleteResult.rows.length === 0) {
       return res.status(404).json({ error: 'Job not found.' });
     }
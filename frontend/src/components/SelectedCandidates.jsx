@@ -4,6 +4,7 @@ import '../App.css';
 
 function parsePgArray(pgArrayStr) {
   if (!pgArrayStr) return [];
+  if (Array.isArray(pgArrayStr)) return pgArrayStr;
   const trimmed = pgArrayStr.replace(/^\{|\}$/g, '');
   return trimmed.split(',').map(item => item.replace(/^"(.*)"$/, '$1').trim());
 }